@@ -26,7 +26,9 @@ def run_migrations_online():
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            # some migrations build indexes CONCURRENTLY in autocommit blocks
+            transaction_per_migration=True,
         )
 
         with context.begin_transaction():
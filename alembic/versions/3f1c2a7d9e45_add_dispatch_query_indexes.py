@@ -0,0 +1,47 @@
+"""Add composite and partial indexes for dispatch queries
+
+Revision ID: 3f1c2a7d9e45
+Revises: 9c169442039e
+Create Date: 2026-10-17 09:12:04.118233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a7d9e45'
+down_revision: Union[str, None] = '9c169442039e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PENDING_ONLY = sa.text("status = 'PENDING'")
+
+INDEXES = [
+    ('ix_dispatches_owner_id_id', ['owner_id', 'id'], {}),
+    ('ix_dispatches_status_area_id', ['status', 'area', 'id'], {}),
+    ('ix_dispatches_status_area_date', ['status', 'area', 'date'], {}),
+    ('ix_dispatches_pending_area_id', ['area', 'id'],
+     {'postgresql_where': PENDING_ONLY, 'sqlite_where': PENDING_ONLY}),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, columns, kwargs in INDEXES:
+            op.create_index(
+                name, 'dispatches', columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True, **kwargs
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name='dispatches',
+                postgresql_concurrently=True, if_exists=True
+            )
@@ -0,0 +1,44 @@
+"""Add dispatch_counts table with per-(status, area) totals
+
+Revision ID: 5b8e0d4c7a21
+Revises: 3f1c2a7d9e45
+Create Date: 2026-10-17 10:41:37.502114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e0d4c7a21'
+down_revision: Union[str, None] = '3f1c2a7d9e45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The dispatches table already owns the enum type on PostgreSQL
+    status_type = sa.Enum(
+        'IN_PROGRESS', 'PENDING', 'ACCEPTED', 'STARTED', 'COMPLETED', name='dispatchstatusenum'
+    ).with_variant(
+        postgresql.ENUM(name='dispatchstatusenum', create_type=False), 'postgresql'
+    )
+    op.create_table('dispatch_counts',
+    sa.Column('status', status_type, nullable=False),
+    sa.Column('area', sa.String(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('status', 'area')
+    )
+    op.execute(
+        "INSERT INTO dispatch_counts (status, area, count) "
+        "SELECT status, area, count(*) FROM dispatches "
+        "WHERE status IS NOT NULL AND area IS NOT NULL "
+        "GROUP BY status, area"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('dispatch_counts')
@@ -0,0 +1,107 @@
+"""Range-partition dispatches by month of created_at (PostgreSQL only)
+
+Revision ID: 7d2a9c4e1b60
+Revises: 5b8e0d4c7a21
+Create Date: 2026-10-17 14:03:52.640918
+
+The table is rebuilt: the existing rows are copied into monthly partitions,
+so the upgrade holds an exclusive lock on dispatches for the duration of the
+copy. Run it in a maintenance window on large tables.
+
+A partitioned table's primary key must contain the partition key, so the
+primary key becomes (id, created_at); ids still come from the same sequence
+and stay unique. created_at becomes NOT NULL, with missing values backfilled
+from date. Existing secondary indexes are recreated on the partitioned table.
+
+"""
+import re
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+import partitions
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2a9c4e1b60'
+down_revision: Union[str, None] = '5b8e0d4c7a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def secondary_indexes(conn, table: str):
+    """Returns (name, definition) of the non-primary-key indexes of `table`."""
+    return conn.execute(sa.text(
+        "SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x "
+        "JOIN pg_class i ON i.oid = x.indexrelid "
+        "WHERE x.indrelid = to_regclass(:table) AND NOT x.indisprimary"
+    ), {"table": table}).fetchall()
+
+
+def rebuild(conn, old: str, partitioned: bool):
+    """
+    Moves the rows of `old` into a new dispatches table and drops `old`.
+    """
+    indexes = secondary_indexes(conn, old)
+    sequence = conn.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"),
+                            {"table": old}).scalar()
+
+    if partitioned:
+        op.execute(f"CREATE TABLE dispatches (LIKE {old} INCLUDING DEFAULTS) "
+                   f"PARTITION BY RANGE (created_at)")
+        op.execute("ALTER TABLE dispatches ALTER COLUMN created_at SET NOT NULL")
+        first = conn.execute(sa.text(f"SELECT min(created_at) FROM {old}")).scalar()
+        partitions.ensure_partitions(
+            conn, partitions.month_start(first or datetime.utcnow())
+        )
+        partitions.create_default_partition(conn)
+    else:
+        op.execute(f"CREATE TABLE dispatches (LIKE {old} INCLUDING DEFAULTS)")
+    op.execute(f"INSERT INTO dispatches SELECT * FROM {old}")
+
+    # The id sequence belongs to the old table and would be dropped with it
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY dispatches.id")
+    op.execute(f"DROP TABLE {old} CASCADE")
+
+    primary_key = "id, created_at" if partitioned else "id"
+    op.execute(f"ALTER TABLE dispatches ADD CONSTRAINT dispatches_pkey PRIMARY KEY ({primary_key})")
+    op.create_foreign_key('dispatches_owner_id_fkey', 'dispatches', 'users', ['owner_id'], ['id'])
+    for _, definition in indexes:
+        op.execute(re.sub(rf"ON (ONLY )?\S*\b{old}\b", "ON dispatches", definition, count=1))
+
+
+def check_no_references(conn):
+    referencing = conn.execute(sa.text(
+        "SELECT conrelid::regclass::text FROM pg_constraint "
+        "WHERE contype = 'f' AND confrelid = to_regclass('dispatches')"
+    )).scalars().all()
+    if referencing:
+        raise RuntimeError(
+            "Cannot rebuild dispatches while foreign keys reference it from: "
+            + ", ".join(referencing)
+        )
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql' or partitions.is_partitioned(conn):
+        return
+    check_no_references(conn)
+    op.execute("LOCK TABLE dispatches IN ACCESS EXCLUSIVE MODE")
+    op.execute("UPDATE dispatches SET created_at = coalesce(date, now() AT TIME ZONE 'utc') "
+               "WHERE created_at IS NULL")
+    op.execute("ALTER TABLE dispatches RENAME TO dispatches_unpartitioned")
+    rebuild(conn, 'dispatches_unpartitioned', partitioned=True)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql' or not partitions.is_partitioned(conn):
+        return
+    check_no_references(conn)
+    op.execute("LOCK TABLE dispatches IN ACCESS EXCLUSIVE MODE")
+    op.execute("ALTER TABLE dispatches RENAME TO dispatches_partitioned")
+    rebuild(conn, 'dispatches_partitioned', partitioned=False)
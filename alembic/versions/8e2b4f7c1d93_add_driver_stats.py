@@ -0,0 +1,47 @@
+"""Add driver_stats with per-driver counts and delivery durations
+
+Revision ID: 8e2b4f7c1d93
+Revises: f6c1b8d4a259
+Create Date: 2026-10-18 00:14:52.708341
+
+The statistics are backfilled with one GROUP BY owner_id over dispatches and
+archived_dispatches (see rollups.py), which reads both tables once.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+import rollups
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2b4f7c1d93'
+down_revision: Union[str, None] = 'f6c1b8d4a259'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('driver_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('accepted_count', sa.Integer(), nullable=False),
+    sa.Column('started_count', sa.Integer(), nullable=False),
+    sa.Column('completed_count', sa.Integer(), nullable=False),
+    sa.Column('duration_total', sa.Float(), nullable=False),
+    sa.Column('duration_count', sa.Integer(), nullable=False),
+    sa.Column('avg_duration', sa.Float(), nullable=True),
+    sa.Column('last_activity_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_driver_stats_completed_count', 'driver_stats', ['completed_count', 'user_id'], unique=False)
+    op.create_index('ix_driver_stats_avg_duration', 'driver_stats', ['avg_duration', 'user_id'], unique=False)
+    rollups.rebuild_driver_stats(op.get_bind())
+
+
+def downgrade() -> None:
+    op.drop_index('ix_driver_stats_avg_duration', table_name='driver_stats')
+    op.drop_index('ix_driver_stats_completed_count', table_name='driver_stats')
+    op.drop_table('driver_stats')
@@ -0,0 +1,40 @@
+"""Add archived_dispatches index of dispatches moved to Parquet
+
+Revision ID: a4f7c1e9d352
+Revises: 7d2a9c4e1b60
+Create Date: 2026-10-17 15:22:08.417305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4f7c1e9d352'
+down_revision: Union[str, None] = '7d2a9c4e1b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('archived_dispatches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=True),
+    sa.Column('area', sa.String(), nullable=True),
+    sa.Column('date', sa.DateTime(), nullable=True),
+    sa.Column('file', sa.String(), nullable=False),
+    sa.Column('row_group', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_archived_dispatches_owner_id'), 'archived_dispatches', ['owner_id'], unique=False)
+    op.create_index(op.f('ix_archived_dispatches_date'), 'archived_dispatches', ['date'], unique=False)
+    op.create_index('ix_archived_dispatches_area_id', 'archived_dispatches', ['area', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_archived_dispatches_area_id', table_name='archived_dispatches')
+    op.drop_index(op.f('ix_archived_dispatches_date'), table_name='archived_dispatches')
+    op.drop_index(op.f('ix_archived_dispatches_owner_id'), table_name='archived_dispatches')
+    op.drop_table('archived_dispatches')
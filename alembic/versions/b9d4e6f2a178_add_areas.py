@@ -0,0 +1,82 @@
+"""Add areas and dispatches.area_id, and filter dispatches on it
+
+Revision ID: b9d4e6f2a178
+Revises: e5a3d7b2c914
+Create Date: 2026-10-17 20:41:17.583204
+
+Every distinct dispatches.area becomes a row of areas, and area_id is
+backfilled with a single UPDATE, which rewrites every row of dispatches: run
+it in a maintenance window on large tables. The status/area indexes are then
+rebuilt on area_id, and the index on the area names is dropped. The names stay
+in dispatches.area for the API and the derived tables.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d4e6f2a178'
+down_revision: Union[str, None] = 'e5a3d7b2c914'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PENDING_ONLY = sa.text("status = 'PENDING'")
+
+NAME_INDEXES = [
+    ('ix_dispatches_area', ['area'], {}),
+    ('ix_dispatches_status_area_id', ['status', 'area', 'id'], {}),
+    ('ix_dispatches_status_area_date', ['status', 'area', 'date'], {}),
+    ('ix_dispatches_pending_area_id', ['area', 'id'],
+     {'postgresql_where': PENDING_ONLY, 'sqlite_where': PENDING_ONLY}),
+]
+
+KEY_INDEXES = [
+    ('ix_dispatches_area_id', ['area_id'], {}),
+    ('ix_dispatches_status_areaid_id', ['status', 'area_id', 'id'], {}),
+    ('ix_dispatches_status_areaid_date', ['status', 'area_id', 'date'], {}),
+    ('ix_dispatches_pending_areaid_id', ['area_id', 'id'],
+     {'postgresql_where': PENDING_ONLY, 'sqlite_where': PENDING_ONLY}),
+]
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    op.create_table('areas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.add_column('dispatches', sa.Column('area_id', sa.Integer(), nullable=True))
+
+    op.execute("INSERT INTO areas (name) SELECT DISTINCT area FROM dispatches "
+               "WHERE area IS NOT NULL ORDER BY area")
+    if conn.dialect.name == 'postgresql':
+        op.execute("UPDATE dispatches SET area_id = areas.id FROM areas WHERE areas.name = dispatches.area")
+    else:
+        op.execute("UPDATE dispatches SET area_id = "
+                   "(SELECT areas.id FROM areas WHERE areas.name = dispatches.area) "
+                   "WHERE area IS NOT NULL")
+
+    # SQLite cannot add a constraint to an existing table; new databases get it from the model
+    if conn.dialect.name != 'sqlite':
+        op.create_foreign_key('dispatches_area_id_fkey', 'dispatches', 'areas', ['area_id'], ['id'])
+    for name, _, _ in NAME_INDEXES:
+        op.drop_index(name, table_name='dispatches', if_exists=True)
+    for name, columns, kwargs in KEY_INDEXES:
+        op.create_index(name, 'dispatches', columns, unique=False, **kwargs)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    for name, _, _ in reversed(KEY_INDEXES):
+        op.drop_index(name, table_name='dispatches', if_exists=True)
+    for name, columns, kwargs in NAME_INDEXES:
+        op.create_index(name, 'dispatches', columns, unique=False, **kwargs)
+    if conn.dialect.name != 'sqlite':
+        op.drop_constraint('dispatches_area_id_fkey', 'dispatches', type_='foreignkey')
+    op.drop_column('dispatches', 'area_id')
+    op.drop_table('areas')
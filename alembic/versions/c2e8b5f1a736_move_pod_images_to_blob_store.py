@@ -0,0 +1,86 @@
+"""Move inline proof-of-delivery images into the blob store
+
+Revision ID: c2e8b5f1a736
+Revises: a4f7c1e9d352
+Create Date: 2026-10-17 16:48:13.905227
+
+Every pod_image value that is not already a blob key is decoded (base64, with
+or without a `data:` URI prefix) and written to the content-addressed store
+under BLOB_DIR, and the column is set to the key. Values that are not base64,
+such as URLs, are stored as their UTF-8 text. Run the migration where the
+application's BLOB_DIR is mounted.
+
+The downgrade writes the images back inline as base64; the blobs are kept.
+
+"""
+import base64
+import binascii
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+import blobstore
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e8b5f1a736'
+down_revision: Union[str, None] = 'a4f7c1e9d352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def decode_inline(value: str) -> bytes:
+    """Returns the image bytes of an inline pod_image value."""
+    payload = value.split(",", 1)[1] if value.startswith("data:") and "," in value else value
+    try:
+        return base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return value.encode()
+
+
+def rewrite(conn, convert, select_where: str):
+    """
+    Rewrites pod_image with `convert(value)` for the matching rows, in id order
+    and batches of BATCH_SIZE.
+    """
+    last_id = 0
+    while True:
+        rows = conn.execute(sa.text(
+            f"SELECT id, pod_image FROM dispatches WHERE id > :last_id AND {select_where} "
+            f"ORDER BY id LIMIT {BATCH_SIZE}"
+        ), {"last_id": last_id}).fetchall()
+        if not rows:
+            return
+        updates = [
+            {"row_id": row_id, "pod_image": new_value}
+            for row_id, value in rows
+            if (new_value := convert(value)) != value
+        ]
+        if updates:
+            conn.execute(
+                sa.text("UPDATE dispatches SET pod_image = :pod_image WHERE id = :row_id"),
+                updates,
+            )
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    rewrite(
+        op.get_bind(),
+        lambda value: value if blobstore.is_key(value) else blobstore.put_bytes(decode_inline(value)),
+        "pod_image IS NOT NULL AND pod_image <> ''",
+    )
+
+
+def downgrade() -> None:
+    rewrite(
+        op.get_bind(),
+        lambda value: (
+            base64.b64encode(blobstore.read_bytes(value)).decode()
+            if blobstore.exists(value) else value
+        ),
+        "length(pod_image) = 64",
+    )
@@ -0,0 +1,40 @@
+"""Add full-text search of dispatch description, notes and recipient name
+
+Revision ID: d3f8a1c6b047
+Revises: b9d4e6f2a178
+Create Date: 2026-10-17 22:16:08.904517
+
+On PostgreSQL this adds the stored generated column dispatches.search_vector,
+which rewrites the table, and builds its GIN index without CONCURRENTLY (not
+supported on partitioned tables): run it in a maintenance window on large
+tables. On SQLite it creates the dispatch_search FTS5 table and its triggers,
+and indexes the existing rows. See search.py.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+import search
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f8a1c6b047'
+down_revision: Union[str, None] = 'b9d4e6f2a178'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    search.install(op.get_bind())
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_dispatches_search_vector")
+        op.execute("ALTER TABLE dispatches DROP COLUMN IF EXISTS search_vector")
+    elif conn.dialect.name == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            op.execute(f"DROP TRIGGER IF EXISTS {search.SEARCH_TABLE}_{trigger}")
+        op.execute(f"DROP TABLE IF EXISTS {search.SEARCH_TABLE}")
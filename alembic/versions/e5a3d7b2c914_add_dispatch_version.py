@@ -0,0 +1,29 @@
+"""Add dispatches.version for ETags and conditional GETs
+
+Revision ID: e5a3d7b2c914
+Revises: c2e8b5f1a736
+Create Date: 2026-10-17 18:05:41.226390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a3d7b2c914'
+down_revision: Union[str, None] = 'c2e8b5f1a736'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A constant server default lets PostgreSQL add the column without rewriting the table
+    op.add_column('dispatches', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.create_index('ix_dispatches_id_version', 'dispatches', ['id', 'version'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dispatches_id_version', table_name='dispatches')
+    op.drop_column('dispatches', 'version')
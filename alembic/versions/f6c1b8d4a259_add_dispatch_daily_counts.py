@@ -0,0 +1,49 @@
+"""Add dispatch_daily_counts with per-(day, area, status) rollups, and index dispatches.date
+
+Revision ID: f6c1b8d4a259
+Revises: d3f8a1c6b047
+Create Date: 2026-10-17 23:02:41.316870
+
+The rollups are backfilled with one GROUP BY over dispatches and
+archived_dispatches (see rollups.py), which reads both tables once. The index
+on dispatches.date, for date ranges without a status filter, is built without
+CONCURRENTLY (not supported on partitioned tables) and blocks writes meanwhile.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+import rollups
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c1b8d4a259'
+down_revision: Union[str, None] = 'd3f8a1c6b047'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The dispatches table already owns the enum type on PostgreSQL
+    status_type = sa.Enum(
+        'IN_PROGRESS', 'PENDING', 'ACCEPTED', 'STARTED', 'COMPLETED', name='dispatchstatusenum'
+    ).with_variant(
+        postgresql.ENUM(name='dispatchstatusenum', create_type=False), 'postgresql'
+    )
+    op.create_table('dispatch_daily_counts',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('area', sa.String(), nullable=False),
+    sa.Column('status', status_type, nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'area', 'status')
+    )
+    rollups.rebuild(op.get_bind())
+    op.create_index('ix_dispatches_date', 'dispatches', ['date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dispatches_date', table_name='dispatches')
+    op.drop_table('dispatch_daily_counts')
@@ -0,0 +1,238 @@
+"""
+Archive of old completed dispatches in compressed Parquet files.
+
+Completed dispatches older than a cutoff are moved out of `dispatches` in
+batches by `crud.archive_completed_dispatches`, which this module's command
+line runs:
+
+    python archive.py --older-than-days 180
+    python archive.py --older-than-days 90 --batch-size 50000 --max-batches 10
+
+Files are laid out by month of `created_at` under ARCHIVE_DIR (default:
+`archive/`), one zstd-compressed file per month and batch:
+
+    archive/2025-03/dispatches-1200001-1250000.parquet
+
+Every archived dispatch keeps a row in the `archived_dispatches` table with its
+file and row group, plus the columns the list filters use, so lookups read a
+single row group instead of scanning files.
+"""
+import argparse
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Boolean, DateTime, Enum, Integer
+from sqlalchemy.orm import Session
+
+import models
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ROW_GROUP_SIZE = 10_000
+COMPRESSION = "zstd"
+
+
+def arrow_schema() -> pa.Schema:
+    """
+    Builds the Parquet schema from the current columns of the dispatches table.
+
+    Enums are stored by name, as in the database.
+    """
+    fields = []
+    for column in models.Dispatch.__table__.columns:
+        if isinstance(column.type, Enum):
+            arrow_type = pa.string()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        elif isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def month_of(dispatch: models.Dispatch) -> str:
+    created_at = dispatch.created_at or dispatch.date or datetime.utcnow()
+    return created_at.strftime("%Y-%m")
+
+
+def write_batch(dispatches: List[models.Dispatch]) -> List[dict]:
+    """
+    Writes dispatches to one Parquet file per month.
+
+    Parameters:
+    - dispatches (List[models.Dispatch]): The dispatches to archive.
+
+    Returns:
+    - List[dict]: One `archived_dispatches` row per dispatch. The `file` values
+      are relative to ARCHIVE_DIR.
+    """
+    schema = arrow_schema()
+    by_month: Dict[str, List[models.Dispatch]] = defaultdict(list)
+    for dispatch in dispatches:
+        by_month[month_of(dispatch)].append(dispatch)
+
+    entries = []
+    for month, batch in sorted(by_month.items()):
+        batch.sort(key=lambda dispatch: dispatch.id)
+        relative = f"{month}/dispatches-{batch[0].id}-{batch[-1].id}.parquet"
+        path = os.path.join(ARCHIVE_DIR, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        columns = {
+            field.name: [
+                value.name if isinstance(value, models.DispatchStatusEnum) else value
+                for value in (getattr(dispatch, field.name) for dispatch in batch)
+            ]
+            for field in schema
+        }
+        pq.write_table(
+            pa.Table.from_pydict(columns, schema=schema), path,
+            compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE,
+        )
+        entries.extend(
+            {
+                "id": dispatch.id,
+                "owner_id": dispatch.owner_id,
+                "area": dispatch.area,
+                "date": dispatch.date,
+                "file": relative,
+                "row_group": index // ROW_GROUP_SIZE,
+            }
+            for index, dispatch in enumerate(batch)
+        )
+    return entries
+
+
+def remove_files(entries: Iterable[dict]):
+    """
+    Deletes the files written for a batch whose transaction was rolled back.
+    """
+    for relative in {entry["file"] for entry in entries}:
+        try:
+            os.remove(os.path.join(ARCHIVE_DIR, relative))
+        except FileNotFoundError:
+            pass
+
+
+def find_entries(db: Session, dispatch_ids: List[int]) -> List[models.ArchivedDispatch]:
+    """
+    Looks up where the given dispatches are archived.
+    """
+    return (
+        db.query(models.ArchivedDispatch)
+        .filter(models.ArchivedDispatch.id.in_(dispatch_ids))
+        .all()
+    )
+
+
+def filter_entries(
+        db: Session,
+        status: Optional[str],
+        date: Optional[datetime],
+        area: Optional[str],
+        limit: int,
+        after_id: Optional[int] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+) -> List[models.ArchivedDispatch]:
+    """
+    Returns the first `limit` archived dispatches matching the list filters, by id.
+
+    Only completed dispatches are archived, so any other status matches nothing.
+    `date_from` and `date_to` bound the dispatch date, from <= date < to.
+    """
+    completed = models.DispatchStatusEnum.COMPLETED
+    if status and status not in (completed.value, completed.name):
+        return []
+    query = db.query(models.ArchivedDispatch)
+    if date:
+        query = query.filter(models.ArchivedDispatch.date == date)
+    if date_from is not None:
+        query = query.filter(models.ArchivedDispatch.date >= date_from)
+    if date_to is not None:
+        query = query.filter(models.ArchivedDispatch.date < date_to)
+    if area:
+        query = query.filter(models.ArchivedDispatch.area == area)
+    if after_id is not None:
+        query = query.filter(models.ArchivedDispatch.id > after_id)
+    return query.order_by(models.ArchivedDispatch.id).limit(limit).all()
+
+
+def load_rows(entries: List[models.ArchivedDispatch]) -> List[dict]:
+    """
+    Reads archived dispatches from their files, one row group read per group.
+
+    This does blocking file I/O; async callers should run it in a thread.
+
+    Returns:
+    - List[dict]: The archived column values, ordered by id, with the status
+      converted back to DispatchStatusEnum.
+    """
+    groups: Dict[tuple, set] = defaultdict(set)
+    for entry in entries:
+        groups[(entry.file, entry.row_group)].add(entry.id)
+
+    rows = []
+    for (relative, row_group), ids in groups.items():
+        table = pq.ParquetFile(os.path.join(ARCHIVE_DIR, relative)).read_row_group(row_group)
+        for row in table.to_pylist():
+            if row["id"] in ids:
+                row["status"] = models.DispatchStatusEnum[row["status"]]
+                rows.append(row)
+    rows.sort(key=lambda row: row["id"])
+    return rows
+
+
+def to_dispatch(row: dict) -> models.Dispatch:
+    """
+    Builds a transient Dispatch from an archived row, ignoring columns that no
+    longer exist on the model and using the column default for columns added
+    after the row was archived.
+    """
+    values = {}
+    for column in models.Dispatch.__table__.columns:
+        if column.name in row:
+            values[column.name] = row[column.name]
+        elif column.default is not None and column.default.is_scalar:
+            values[column.name] = column.default.arg
+    return models.Dispatch(**values)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Archive old completed dispatches to Parquet.")
+    arg_parser.add_argument("--older-than-days", type=int, required=True,
+                            help="Archive dispatches completed more than this many days ago")
+    arg_parser.add_argument("--batch-size", type=int, default=10_000, help="Dispatches per transaction")
+    arg_parser.add_argument("--max-batches", type=int, help="Stop after this many batches")
+    args = arg_parser.parse_args(argv)
+
+    # Imported here because crud imports this module
+    import crud
+    from database import SessionLocal
+
+    cutoff = datetime.utcnow() - timedelta(days=args.older_than_days)
+    db = SessionLocal()
+    total = batches = 0
+    try:
+        while args.max_batches is None or batches < args.max_batches:
+            archived = crud.archive_completed_dispatches(db, cutoff, args.batch_size)
+            if not archived:
+                break
+            total += archived
+            batches += 1
+            print(f"archived {total} dispatches", file=sys.stderr)
+    finally:
+        db.close()
+    print(f"archived={total} batches={batches} dir={ARCHIVE_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+In-memory index of the `areas` table for area lookups and autocomplete.
+
+Areas are only ever added, so each worker keeps every area in memory and
+refreshes incrementally by loading the rows with an id above the highest one it
+has seen: at most every AREA_REFRESH_SECONDS (default: 30) when searching,
+right away when a name is not found, and on the next search after this process
+added areas.
+
+`AreaIndex.search` ranks names that start with the query first, then names
+that share enough trigrams with it (as pg_trgm does), so typos and partial
+names still find the area.
+"""
+import bisect
+import itertools
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import models
+
+AREA_REFRESH_SECONDS = float(os.getenv("AREA_REFRESH_SECONDS", "30"))
+# Minimum trigram similarity of a fuzzy match, as pg_trgm's default threshold
+AREA_SIMILARITY = float(os.getenv("AREA_SIMILARITY", "0.3"))
+
+
+def normalize(name: str) -> str:
+    """
+    Returns the form names are compared in: lowercase, single spaces.
+    """
+    return " ".join(name.lower().split())
+
+
+def trigrams(name: str) -> Set[str]:
+    """
+    Returns the trigrams of a normalized name, padded like pg_trgm's.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class AreaIndex:
+    """
+    The areas of the database, by id and name, with prefix and trigram indexes.
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.names: Dict[int, str] = {}
+        # (normalized name, id), sorted for prefix range scans
+        self.sorted_names: List[Tuple[str, int]] = []
+        self.grams: Dict[int, Set[str]] = {}
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+        self.max_id = 0
+        self.refreshed_at = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, areas: Iterable[Tuple[int, str]]):
+        with self.lock:
+            for area_id, name in areas:
+                if area_id in self.names:
+                    continue
+                key = normalize(name)
+                self.ids[name] = area_id
+                self.names[area_id] = name
+                bisect.insort(self.sorted_names, (key, area_id))
+                self.grams[area_id] = trigrams(key)
+                for gram in self.grams[area_id]:
+                    self.postings[gram].add(area_id)
+                self.max_id = max(self.max_id, area_id)
+
+    def refresh(self, db: Session):
+        """
+        Loads the areas added since the last refresh.
+        """
+        rows = db.execute(
+            select(models.Area.id, models.Area.name)
+            .where(models.Area.id > self.max_id)
+            .order_by(models.Area.id)
+        ).all()
+        self.add(rows)
+        self.refreshed_at = time.monotonic()
+
+    def mark_stale(self):
+        """
+        Makes the next search refresh, e.g. after this process added areas.
+        """
+        self.refreshed_at = 0.0
+
+    def refresh_if_stale(self, db: Session):
+        if time.monotonic() - self.refreshed_at >= AREA_REFRESH_SECONDS:
+            self.refresh(db)
+
+    def lookup(self, db: Session, name: str) -> Optional[int]:
+        """
+        Returns the id of the area with exactly this name, or None.
+        """
+        area_id = self.ids.get(name)
+        if area_id is None:
+            self.refresh(db)
+            area_id = self.ids.get(name)
+        return area_id
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, str, float]]:
+        """
+        Returns up to `limit` areas matching `query` as (id, name, score).
+
+        Prefix matches come first, alphabetically, with a score of 1; the
+        remaining slots go to the most similar names by trigrams.
+        """
+        key = normalize(query)
+        if not key:
+            return []
+        results: List[Tuple[int, str, float]] = []
+        seen: Set[int] = set()
+        start = bisect.bisect_left(self.sorted_names, (key, 0))
+        for name, area_id in itertools.islice(self.sorted_names, start, None):
+            if not name.startswith(key) or len(results) >= limit:
+                break
+            results.append((area_id, self.names[area_id], 1.0))
+            seen.add(area_id)
+        if len(results) >= limit:
+            return results
+
+        query_grams = trigrams(key)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in query_grams:
+            for area_id in self.postings.get(gram, ()):
+                shared[area_id] += 1
+        scored = []
+        for area_id, common in shared.items():
+            if area_id in seen:
+                continue
+            similarity = common / (len(query_grams) + len(self.grams[area_id]) - common)
+            if similarity >= AREA_SIMILARITY:
+                scored.append((-similarity, self.names[area_id], area_id))
+        scored.sort()
+        results.extend(
+            (area_id, name, round(-score, 3)) for score, name, area_id in scored[:limit - len(results)]
+        )
+        return results
+
+
+area_index = AreaIndex()
@@ -0,0 +1,582 @@
+"""
+Async counterparts of the functions in `crud`.
+
+Each function runs the matching `crud` function through `AsyncSession.run_sync`,
+so the query logic lives in one place while the database round trips are
+awaited on the async driver instead of blocking the event loop.
+"""
+import asyncio
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import archive
+import crud
+import passwords
+import schemas
+
+# Serializes claims on backends without SKIP LOCKED (see claim_dispatches)
+claim_lock = asyncio.Lock()
+
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    """
+    Retrieves a user from the database by their username.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - username (str): The username of the user to retrieve.
+
+    Returns:
+    - models.User: The user object if found, else None.
+    """
+    return await db.run_sync(crud.get_user_by_username, username)
+
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    """
+    Retrieves a user from the database by their email.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - email (str): The email of the user to retrieve.
+
+    Returns:
+    - models.User: The user object if found, else None.
+    """
+    return await db.run_sync(crud.get_user_by_email, email)
+
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    """
+    Creates a new user in the database.
+
+    The password is hashed on the password hashing pool before the INSERT.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - user (schemas.UserCreate): The user creation schema containing user details.
+
+    Returns:
+    - models.User: The newly created user object, or None if the email or
+      username is already registered.
+    """
+    hashed_password = await passwords.hash_password(user.password)
+    return await db.run_sync(crud.create_user, user, hashed_password)
+
+
+async def deactivate_user(db: AsyncSession, user_id: int):
+    """
+    Marks a user as inactive and drops any cached sessions for them.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - user_id (int): The ID of the user to deactivate.
+
+    Returns:
+    - models.User: The deactivated user object if found, else None.
+    """
+    return await db.run_sync(crud.deactivate_user, user_id)
+
+
+async def get_dispatches(
+        db: AsyncSession, skip: int = 0, limit: int = 10, after_id: Optional[int] = None
+):
+    """
+    Retrieves a list of dispatches from the database with pagination.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - skip (int): Number of records to skip (for pagination).
+    - limit (int): Number of records to retrieve.
+    - after_id (Optional[int]): Return rows after this ID instead of skipping.
+
+    Returns:
+    - list[models.Dispatch]: A list of dispatch objects.
+    """
+    return await db.run_sync(crud.get_dispatches, skip, limit, after_id)
+
+
+async def create_dispatch(db: AsyncSession, area: str, created_at: datetime, user_id: int):
+    """
+    Creates a new dispatch in the database.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - area (str): The area where the dispatch is to be created.
+    - created_at (datetime): The timestamp when the dispatch is created.
+    - user_id (int): The ID of the user creating the dispatch.
+
+    Returns:
+    - models.Dispatch: The newly created dispatch object.
+    """
+    return await db.run_sync(crud.create_dispatch, area, created_at, user_id)
+
+
+async def bulk_create_dispatches(db: AsyncSession, rows: List[dict]) -> int:
+    """
+    Inserts a batch of dispatches and commits them as one transaction.
+
+    On PostgreSQL (asyncpg) the batch is streamed with COPY; other backends
+    use a single executemany INSERT.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - rows (List[dict]): Column values built with `crud.new_dispatch_values`.
+
+    Returns:
+    - int: The number of inserted dispatches.
+    """
+    if not rows:
+        return 0
+    connection = await db.connection()
+    if connection.dialect.driver != "asyncpg":
+        return await db.run_sync(crud.bulk_create_dispatches, rows)
+    await db.run_sync(crud.assign_area_ids, rows)
+    await db.run_sync(crud.assign_dispatch_ids, rows)
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        "dispatches",
+        columns=crud.BULK_DISPATCH_COLUMNS,
+        records=crud.copy_records(rows),
+    )
+    await db.run_sync(crud.record_created, rows)
+    await db.commit()
+    return len(rows)
+
+
+async def count_dispatches(
+        db: AsyncSession,
+        status: Optional[str],
+        date: Optional[datetime],
+        area: Optional[str],
+        exact: bool = False,
+        ranges: Optional[crud.DateRanges] = None,
+) -> int:
+    """
+    Returns the number of dispatches matching the filters of `get_filtered_dispatches`.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - status (Optional[str]): Optional filter for dispatch status.
+    - date (Optional[datetime]): Optional filter for dispatch date.
+    - area (Optional[str]): Optional filter for dispatch area.
+    - exact (bool): Count the dispatches table instead of using the counters.
+    - ranges (Optional[crud.DateRanges]): Optional date range filters.
+
+    Returns:
+    - int: The number of matching dispatches.
+    """
+    return await db.run_sync(crud.count_dispatches, status, date, area, exact, ranges)
+
+
+async def get_daily_counts(
+        db: AsyncSession,
+        date_from: date,
+        date_to: date,
+        area: Optional[str] = None,
+        status: Optional[str] = None,
+) -> List[dict]:
+    """
+    Returns the dispatch rollups by day, area and status; see `crud.get_daily_counts`.
+    """
+    return await db.run_sync(crud.get_daily_counts, date_from, date_to, area, status)
+
+
+async def count_owned_dispatches(db: AsyncSession, user_id: int) -> int:
+    """
+    Returns the number of dispatches owned by a user.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - user_id (int): The ID of the owning user.
+
+    Returns:
+    - int: The number of dispatches owned by the user.
+    """
+    return await db.run_sync(crud.count_owned_dispatches, user_id)
+
+
+async def get_dispatch_by_id(db: AsyncSession, dispatch_id: int, include_archived: bool = False):
+    """
+    Retrieves a dispatch from the database by its ID.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - dispatch_id (int): The ID of the dispatch to retrieve.
+    - include_archived (bool): Fall back to the archive if the dispatch is not in
+      the dispatches table.
+
+    Returns:
+    - models.Dispatch: The dispatch object if found, else None.
+    """
+    dispatch = await db.run_sync(crud.get_dispatch_by_id, dispatch_id)
+    if dispatch is None and include_archived:
+        entries = await db.run_sync(archive.find_entries, [dispatch_id])
+        # The Parquet read is blocking file I/O, so it runs off the event loop
+        rows = await asyncio.to_thread(archive.load_rows, entries)
+        if rows:
+            return archive.to_dispatch(rows[0])
+    return dispatch
+
+
+async def get_dispatch_version(db: AsyncSession, dispatch_id: int) -> Optional[int]:
+    """
+    Retrieves only the version of a dispatch; see `crud.get_dispatch_version`.
+    """
+    return await db.run_sync(crud.get_dispatch_version, dispatch_id)
+
+
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    """
+    Authenticates a user based on email and password.
+
+    The password is checked on the password hashing pool. Hashes made with
+    outdated settings are transparently replaced on a successful login.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - email (str): The email of the user to authenticate.
+    - password (str): The password of the user to authenticate.
+
+    Returns:
+    - models.User: The authenticated user object if credentials are valid, else None.
+    """
+    user = await get_user_by_email(db, email)
+    if not user:
+        return None
+    valid, new_hash = await passwords.verify_password(password, user.hashed_password)
+    if not valid:
+        return None
+    if new_hash:
+        await db.run_sync(crud.update_password_hash, user.id, new_hash)
+    return user
+
+
+async def get_current_user(db: AsyncSession, token: str):
+    """
+    Retrieves the current user based on the JWT token.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - token (str): The JWT token containing user information.
+
+    Returns:
+    - models.User: The user object if the token is valid, else None.
+    """
+    return await db.run_sync(crud.get_current_user, token)
+
+
+async def get_driver_stats(db: AsyncSession, user_id: int) -> Optional[dict]:
+    """
+    Retrieves the performance statistics of a user; see `crud.get_driver_stats`.
+    """
+    return await db.run_sync(crud.get_driver_stats, user_id)
+
+
+async def get_driver_leaderboard(
+        db: AsyncSession, order: str, limit: int, min_completed: int = 1
+) -> List[dict]:
+    """
+    Ranks drivers by completed dispatches or average delivery duration; see
+    `crud.get_driver_leaderboard`.
+    """
+    return await db.run_sync(crud.get_driver_leaderboard, order, limit, min_completed)
+
+
+async def get_filtered_dispatches(
+        db: AsyncSession,
+        status: Optional[str],
+        date: Optional[datetime],
+        area: Optional[str],
+        skip: int,
+        limit: int,
+        after_id: Optional[int] = None,
+        ranges: Optional[crud.DateRanges] = None,
+):
+    """
+    Retrieves a list of dispatches from the database with optional filters and pagination.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - status (Optional[str]): Optional filter for dispatch status.
+    - date (Optional[datetime]): Optional filter for dispatch date.
+    - area (Optional[str]): Optional filter for dispatch area.
+    - skip (int): Number of records to skip (for pagination).
+    - limit (int): Number of records to retrieve.
+    - after_id (Optional[int]): Return rows after this ID instead of skipping.
+    - ranges (Optional[crud.DateRanges]): Optional date range filters.
+
+    Returns:
+    - list[models.Dispatch]: A list of filtered dispatch objects.
+    """
+    return await db.run_sync(
+        crud.get_filtered_dispatches, status, date, area, skip, limit, after_id, ranges
+    )
+
+
+async def get_dispatch_rows(
+        db: AsyncSession, skip: int, limit: int, after_id: Optional[int] = None
+) -> List[dict]:
+    """
+    Retrieves a page of dispatches as plain dicts; see `crud.dispatch_rows`.
+    """
+    return await db.run_sync(crud.get_dispatch_rows, skip, limit, after_id)
+
+
+async def get_filtered_dispatch_rows(
+        db: AsyncSession,
+        status: Optional[str],
+        date: Optional[datetime],
+        area: Optional[str],
+        skip: int,
+        limit: int,
+        after_id: Optional[int] = None,
+        include_archived: bool = False,
+        ranges: Optional[crud.DateRanges] = None,
+) -> List[dict]:
+    """
+    Retrieves a page of filtered dispatches as plain dicts; see `crud.dispatch_rows`
+    and, with `include_archived`, `crud.get_filtered_dispatch_page`.
+    """
+    if not include_archived:
+        return await db.run_sync(
+            crud.get_filtered_dispatch_rows, status, date, area, skip, limit, after_id,
+            False, ranges,
+        )
+    live, entries = await db.run_sync(
+        crud.get_filtered_dispatch_page, status, date, area, skip, limit, after_id, ranges
+    )
+    archived = await asyncio.to_thread(archive.load_rows, entries)
+    return crud.merge_archived_rows(live, archived)
+
+
+async def search_dispatch_rows(
+        db: AsyncSession,
+        query: str,
+        status: Optional[str],
+        date: Optional[datetime],
+        area: Optional[str],
+        skip: int,
+        limit: int,
+        after: Optional[dict] = None,
+        ranges: Optional[crud.DateRanges] = None,
+) -> Tuple[List[dict], Optional[dict]]:
+    """
+    Full-text searches dispatches; see `crud.search_dispatch_rows`.
+    """
+    return await db.run_sync(
+        crud.search_dispatch_rows, query, status, date, area, skip, limit, after, ranges
+    )
+
+
+async def count_search_matches(
+        db: AsyncSession,
+        query: str,
+        status: Optional[str],
+        date: Optional[datetime],
+        area: Optional[str],
+        ranges: Optional[crud.DateRanges] = None,
+) -> int:
+    """
+    Returns the number of dispatches matching a full-text search; see
+    `crud.count_search_matches`.
+    """
+    return await db.run_sync(crud.count_search_matches, query, status, date, area, ranges)
+
+
+async def get_accepted_dispatch_rows(
+        db: AsyncSession, user_id: int, skip: int, limit: int, after_id: Optional[int] = None
+) -> List[dict]:
+    """
+    Retrieves a page of a user's dispatches as plain dicts; see `crud.dispatch_rows`.
+    """
+    return await db.run_sync(
+        crud.get_accepted_dispatch_rows, user_id, skip, limit, after_id
+    )
+
+
+async def accept_dispatch(db: AsyncSession, dispatch_id: int, user_id: int):
+    """
+    Marks a dispatch as accepted by a user.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - dispatch_id (int): The ID of the dispatch to be accepted.
+    - user_id (int): The ID of the user accepting the dispatch.
+
+    Returns:
+    - models.Dispatch: The updated dispatch object if successful, else None.
+
+    Raises:
+    - crud.DispatchConflictError: If the dispatch is no longer pending.
+    """
+    return await db.run_sync(crud.accept_dispatch, dispatch_id, user_id)
+
+
+async def get_accepted_dispatches(
+        db: AsyncSession, user_id: int, skip: int, limit: int, after_id: Optional[int] = None
+):
+    """
+    Retrieves a list of accepted dispatches for a specific user with pagination.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - user_id (int): The ID of the user for whom to retrieve accepted dispatches.
+    - skip (int): Number of records to skip (for pagination).
+    - limit (int): Number of records to retrieve.
+    - after_id (Optional[int]): Return rows after this ID instead of skipping.
+
+    Returns:
+    - list[models.Dispatch]: A list of accepted dispatch objects.
+    """
+    return await db.run_sync(crud.get_accepted_dispatches, user_id, skip, limit, after_id)
+
+
+async def start_dispatch(db: AsyncSession, dispatch_id: int, user_id: int):
+    """
+    Marks a dispatch as started by a user.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - dispatch_id (int): The ID of the dispatch to be started.
+    - user_id (int): The ID of the user starting the dispatch.
+
+    Returns:
+    - models.Dispatch: The updated dispatch object if successful, else None.
+
+    Raises:
+    - crud.DispatchConflictError: If the dispatch is not accepted.
+    """
+    return await db.run_sync(crud.start_dispatch, dispatch_id, user_id)
+
+
+async def complete_dispatch(
+        db: AsyncSession,
+        dispatch_id: int,
+        user_id: int,
+        pod_image: str,
+        notes: str,
+        recipient_name: str,
+):
+    """
+    Marks a dispatch as completed by a user and updates its details.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - dispatch_id (int): The ID of the dispatch to be completed.
+    - user_id (int): The ID of the user completing the dispatch.
+    - pod_image (str): Proof of delivery image URL or data.
+    - notes (str): Additional notes for the dispatch.
+    - recipient_name (str): The name of the recipient.
+
+    Returns:
+    - models.Dispatch: The updated dispatch object if successful, else None.
+
+    Raises:
+    - crud.DispatchConflictError: If the dispatch is not started.
+    """
+    return await db.run_sync(
+        crud.complete_dispatch, dispatch_id, user_id, pod_image, notes, recipient_name
+    )
+
+
+async def bulk_accept_dispatches(db: AsyncSession, dispatch_ids: List[int], user_id: int):
+    """
+    Marks many dispatches as accepted by a user.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - dispatch_ids (List[int]): The IDs of the dispatches to be accepted.
+    - user_id (int): The ID of the user accepting the dispatches.
+
+    Returns:
+    - Dict[int, str]: The outcome per ID.
+    """
+    return await db.run_sync(crud.bulk_accept_dispatches, dispatch_ids, user_id)
+
+
+async def search_areas(db: AsyncSession, query: str, limit: int) -> List[dict]:
+    """
+    Searches the areas by name prefix, then by trigram similarity.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - query (str): The partial or misspelled area name.
+    - limit (int): The maximum number of areas to return.
+
+    Returns:
+    - List[dict]: The matching areas, best first.
+    """
+    return await db.run_sync(crud.search_areas, query, limit)
+
+
+async def claim_dispatches(db: AsyncSession, area: str, count: int, user_id: int):
+    """
+    Accepts the oldest pending dispatches of an area on behalf of a user.
+
+    On PostgreSQL claims run concurrently, relying on SKIP LOCKED. Other
+    backends have no row locks, so the claims of this worker are queued behind
+    claim_lock and run one at a time instead of competing for the same rows.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - area (str): The area to claim dispatches in.
+    - count (int): The maximum number of dispatches to claim.
+    - user_id (int): The ID of the user claiming the dispatches.
+
+    Returns:
+    - List[models.Dispatch]: The claimed dispatches, oldest first.
+    """
+    if db.bind.dialect.name == "postgresql":
+        return await db.run_sync(crud.claim_dispatches, area, count, user_id)
+    async with claim_lock:
+        return await db.run_sync(crud.claim_dispatches, area, count, user_id)
+
+
+async def bulk_start_dispatches(db: AsyncSession, dispatch_ids: List[int], user_id: int):
+    """
+    Marks many dispatches owned by a user as started.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - dispatch_ids (List[int]): The IDs of the dispatches to be started.
+    - user_id (int): The ID of the user starting the dispatches.
+
+    Returns:
+    - Dict[int, str]: The outcome per ID.
+    """
+    return await db.run_sync(crud.bulk_start_dispatches, dispatch_ids, user_id)
+
+
+async def bulk_complete_dispatches(
+        db: AsyncSession,
+        dispatch_ids: List[int],
+        user_id: int,
+        pod_image: str,
+        notes: str,
+        recipient_name: str,
+):
+    """
+    Marks many dispatches owned by a user as completed with the same details.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - dispatch_ids (List[int]): The IDs of the dispatches to be completed.
+    - user_id (int): The ID of the user completing the dispatches.
+    - pod_image (str): Proof of delivery image URL or data.
+    - notes (str): Additional notes for the dispatches.
+    - recipient_name (str): The name of the recipient.
+
+    Returns:
+    - Dict[int, str]: The outcome per ID.
+    """
+    return await db.run_sync(
+        crud.bulk_complete_dispatches,
+        dispatch_ids,
+        user_id,
+        pod_image,
+        notes,
+        recipient_name,
+    )
@@ -0,0 +1,143 @@
+"""
+Benchmark of dashboard counts by day, area and status.
+
+Seeds `--rows` dispatches spread over `--days` days and `--areas` areas, fills
+the rollups with `rollups.rebuild`, then times a GROUP BY over the dispatches
+table against `crud.get_daily_counts` reading the rollups, for the last 7 and
+30 days, all areas and one area, and checks that both return the same counts.
+
+    python -m benchmarks.bench_analytics --rows 500000
+    python -m benchmarks.bench_analytics --url postgresql://user:pw@localhost/bench --rows 10000000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+WINDOWS = (7, 30)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Database URL (default: a temporary SQLite file)")
+    parser.add_argument("--rows", type=int, default=500_000, help="Dispatches to seed")
+    parser.add_argument("--days", type=int, default=365, help="Days of history")
+    parser.add_argument("--areas", type=int, default=50, help="Distinct areas")
+    parser.add_argument("--repeat", type=int, default=10, help="Executions per query")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def seed(engine, models, args):
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import func, insert, select
+
+    statuses = list(models.DispatchStatusEnum)
+    with engine.begin() as conn:
+        existing = conn.execute(select(func.count()).select_from(models.Dispatch)).scalar()
+        rng = random.Random(args.seed)
+        end = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        step = timedelta(days=args.days) / args.rows
+        batch = []
+        for i in range(existing, args.rows):
+            created_at = end - timedelta(days=args.days) + step * i
+            batch.append({
+                "area": f"area-{rng.randrange(args.areas)}",
+                "created_at": created_at,
+                "date": created_at,
+                "description": "No description",
+                "status": rng.choice(statuses),
+                "owner_id": 1,
+            })
+            if len(batch) == 10_000:
+                conn.execute(insert(models.Dispatch), batch)
+                batch.clear()
+        if batch:
+            conn.execute(insert(models.Dispatch), batch)
+
+
+def timed(fn, repeat: int) -> dict:
+    fn()  # warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    url = args.url or f"sqlite:///{tempfile.mkdtemp()}/bench_analytics.db"
+    os.environ["SQLALCHEMY_DATABASE_URL"] = url
+
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import Session
+
+    import crud
+    import models
+    import rollups
+    from database import engine
+
+    models.Base.metadata.create_all(bind=engine)
+    print(f"Seeding {args.rows} dispatches into {engine.url.render_as_string()} ...", file=sys.stderr)
+    seed(engine, models, args)
+    with engine.begin() as conn:
+        rollups.rebuild(conn)
+        conn.exec_driver_sql("ANALYZE" if engine.dialect.name == "sqlite" else "ANALYZE dispatches")
+
+    def scan(db, date_from, date_to, area):
+        day = rollups.day_column(db.get_bind(), models.Dispatch.date).label("day")
+        stmt = (
+            select(day, models.Dispatch.area, models.Dispatch.status, func.count())
+            .where(
+                models.Dispatch.date >= datetime.combine(date_from, datetime.min.time()),
+                models.Dispatch.date < datetime.combine(date_to + timedelta(days=1), datetime.min.time()),
+            )
+            .group_by(day, models.Dispatch.area, models.Dispatch.status)
+        )
+        if area:
+            stmt = stmt.where(models.Dispatch.area == area)
+        return db.execute(stmt).all()
+
+    results = {}
+    today = datetime.utcnow().date()
+    with Session(engine) as db:
+        for days in WINDOWS:
+            for area in (None, "area-0"):
+                date_from = today - timedelta(days=days - 1)
+                scanned = {(str(d), a, s.name): n for d, a, s, n in scan(db, date_from, today, area)}
+                rolled = {
+                    (str(row["day"]), row["area"], row["status"].name): row["count"]
+                    for row in crud.get_daily_counts(db, date_from, today, area)
+                }
+                results[f"{days} days, {area or 'all areas'}"] = {
+                    "rows": len(rolled),
+                    "match": scanned == rolled,
+                    "scan": timed(lambda: scan(db, date_from, today, area), args.repeat),
+                    "rollup": timed(lambda: crud.get_daily_counts(db, date_from, today, area), args.repeat),
+                }
+
+    for name, result in results.items():
+        print(f"{name:22} rows {result['rows']:6}  scan {result['scan']['median_ms']:9.3f} ms  "
+              f"rollup {result['rollup']['median_ms']:9.3f} ms  match {result['match']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": args.rows, "backend": engine.dialect.name, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark of concurrent drivers taking pending dispatches from one area.
+
+Runs `--drivers` concurrent tasks against `--rows` pending dispatches with two
+strategies, through `async_crud` as the API does:
+
+- "race": browse the oldest pending dispatch, then accept it, retrying on
+  conflict; the pattern of `GET /dispatches/filter` + `POST .../accept`.
+- "claim": `POST /dispatches/claim`, taking `--count` dispatches per call.
+
+Throughput, conflicts and claim latency percentiles are printed per strategy.
+
+    python -m benchmarks.bench_claim --rows 5000 --drivers 50
+    python -m benchmarks.bench_claim --url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+AREA = "area-bench-claim"
+STRATEGIES = ("race", "claim")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Database URL (default: a temporary SQLite file)")
+    parser.add_argument("--rows", type=int, default=5000, help="Pending dispatches per strategy")
+    parser.add_argument("--drivers", type=int, default=50, help="Concurrent drivers")
+    parser.add_argument("--count", type=int, default=1, help="Dispatches per claim")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    url = args.url or f"sqlite:///{tempfile.mkdtemp()}/bench_claim.db"
+    os.environ["SQLALCHEMY_DATABASE_URL"] = url
+
+    from datetime import datetime
+
+    from sqlalchemy import delete, insert, select
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import Session
+
+    import async_crud
+    import crud
+    import models
+    from database import AsyncSessionLocal, async_engine, engine
+
+    models.Base.metadata.create_all(bind=engine)
+
+    def seed():
+        with Session(engine) as db:
+            area_id = crud.area_ids(db, [AREA])[AREA]
+            db.commit()
+        with engine.begin() as conn:
+            conn.execute(delete(models.Dispatch).where(models.Dispatch.area_id == area_id))
+            now = datetime.utcnow()
+            conn.execute(insert(models.Dispatch), [
+                {"area": AREA, "area_id": area_id, "created_at": now, "date": now,
+                 "description": "No description",
+                 "status": models.DispatchStatusEnum.PENDING, "owner_id": 1}
+                for _ in range(args.rows)
+            ])
+
+    async def race(driver_id: int, stats: dict):
+        async with AsyncSessionLocal() as db:
+            while True:
+                started = time.perf_counter()
+                dispatch_id = (await db.execute(
+                    select(models.Dispatch.id)
+                    .where(*crud.dispatch_filters(models.DispatchStatusEnum.PENDING, None, AREA))
+                    .order_by(models.Dispatch.id).limit(1)
+                )).scalar()
+                await db.commit()
+                if dispatch_id is None:
+                    return
+                try:
+                    await async_crud.accept_dispatch(db, dispatch_id, driver_id)
+                except (crud.DispatchConflictError, OperationalError):
+                    # Lost the race, or on SQLite the write lock ("database is locked")
+                    await db.rollback()
+                    stats["conflicts"] += 1
+                    continue
+                stats["timings"].append((time.perf_counter() - started) * 1000)
+                stats["claimed"] += 1
+
+    async def claim(driver_id: int, stats: dict):
+        async with AsyncSessionLocal() as db:
+            while True:
+                started = time.perf_counter()
+                claimed = await async_crud.claim_dispatches(db, AREA, args.count, driver_id)
+                if not claimed:
+                    return
+                stats["timings"].append((time.perf_counter() - started) * 1000)
+                stats["claimed"] += len(claimed)
+
+    async def run(strategy) -> dict:
+        stats = {"claimed": 0, "conflicts": 0, "timings": []}
+        worker = race if strategy == "race" else claim
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(driver_id + 1, stats) for driver_id in range(args.drivers)))
+        elapsed = time.perf_counter() - started
+        timings = sorted(stats["timings"])
+        return {
+            "claimed": stats["claimed"],
+            "conflicts": stats["conflicts"],
+            "claims_per_s": round(stats["claimed"] / elapsed, 1),
+            "median_ms": round(statistics.median(timings), 4),
+            "p99_ms": round(timings[int(len(timings) * 0.99) - 1], 4),
+        }
+
+    async def run_all() -> dict:
+        results = {}
+        for strategy in STRATEGIES:
+            seed()
+            print(f"{strategy}: {args.drivers} drivers, {args.rows} pending dispatches ...", file=sys.stderr)
+            results[strategy] = await run(strategy)
+        await async_engine.dispose()
+        return results
+
+    results = asyncio.run(run_all())
+    for strategy, result in results.items():
+        print(f"{strategy:5} {result['claims_per_s']:9.1f} dispatches/s  conflicts {result['conflicts']:6}  "
+              f"median {result['median_ms']:.4f} ms  p99 {result['p99_ms']:.4f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": args.rows, "drivers": args.drivers, "count": args.count,
+                       "backend": engine.dialect.name, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
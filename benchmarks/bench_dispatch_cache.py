@@ -0,0 +1,92 @@
+"""
+Microbenchmark of `crud.get_dispatch_by_id` with and without the dispatch cache.
+
+Reads `--reads` dispatches by ID, drawn from the `--hot` most recent ones as
+polling drivers would, through each cache backend: "off" (every read hits the
+database), "local" (per-process LRU) and "shared" (JSON values in the
+in-process stand-in for Redis). Latency percentiles and the hit rate are
+printed per backend.
+
+    python -m benchmarks.bench_dispatch_cache --rows 100000 --hot 1000
+    python -m benchmarks.bench_dispatch_cache --url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BACKENDS = ("off", "local", "shared")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Database URL (default: a temporary SQLite file)")
+    parser.add_argument("--rows", type=int, default=100_000, help="Dispatches to seed")
+    parser.add_argument("--hot", type=int, default=1000, help="Recent dispatches the reads are drawn from")
+    parser.add_argument("--reads", type=int, default=20_000, help="Reads per backend")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    url = args.url or f"sqlite:///{tempfile.mkdtemp()}/bench_dispatch_cache.db"
+    os.environ["SQLALCHEMY_DATABASE_URL"] = url
+
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import Session
+
+    import cache
+    import crud
+    import models
+    from benchmarks.bench_serialization import seed
+    from database import engine
+
+    models.Base.metadata.create_all(bind=engine)
+    print(f"Seeding {args.rows} dispatches into {engine.url.render_as_string()} ...", file=sys.stderr)
+    seed(engine, models, args.rows)
+    with Session(engine) as db:
+        last_id = db.execute(select(func.max(models.Dispatch.id))).scalar()
+    rng = random.Random(args.seed)
+    ids = [last_id - rng.randrange(min(args.hot, last_id)) for _ in range(args.reads)]
+
+    results = {}
+    for kind in BACKENDS:
+        cache.dispatch_cache.backend = cache.make_dispatch_backend(kind)
+        hits_before = cache.dispatch_cache.hits
+        timings = []
+        with Session(engine) as db:
+            for dispatch_id in ids:
+                started = time.perf_counter()
+                crud.get_dispatch_by_id(db, dispatch_id)
+                timings.append((time.perf_counter() - started) * 1000)
+                db.expunge_all()
+        timings.sort()
+        hits = cache.dispatch_cache.hits - hits_before
+        results[kind] = {
+            "median_ms": round(statistics.median(timings), 4),
+            "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 4),
+            "p99_ms": round(timings[int(len(timings) * 0.99) - 1], 4),
+            "hit_rate": round(hits / len(ids), 4) if kind != "off" else 0.0,
+        }
+
+    for kind, result in results.items():
+        print(f"{kind:6} median {result['median_ms']:.4f} ms  p95 {result['p95_ms']:.4f} ms  "
+              f"p99 {result['p99_ms']:.4f} ms  hit rate {result['hit_rate']:.1%}")
+    for kind in BACKENDS[1:]:
+        speedup = results["off"]["median_ms"] / results[kind]["median_ms"]
+        print(f"{kind} cache: median read {speedup:.1f}x faster than the database")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": args.rows, "hot": args.hot, "reads": args.reads,
+                       "backend": engine.dialect.name, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark of driver statistics and leaderboards.
+
+Seeds `--rows` dispatches owned by `--drivers` drivers, mostly completed with
+a start and completion time, fills the driver statistics with
+`rollups.rebuild_driver_stats`, then times the ad-hoc GROUP BY owner_id over
+the dispatches table against `crud.get_driver_leaderboard` and
+`crud.get_driver_stats`, and checks that both rank the drivers the same way.
+
+    python -m benchmarks.bench_drivers --rows 500000 --drivers 2000
+    python -m benchmarks.bench_drivers --url postgresql://user:pw@localhost/bench --rows 10000000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Database URL (default: a temporary SQLite file)")
+    parser.add_argument("--rows", type=int, default=500_000, help="Dispatches to seed")
+    parser.add_argument("--drivers", type=int, default=2000, help="Drivers owning them")
+    parser.add_argument("--limit", type=int, default=10, help="Leaderboard size")
+    parser.add_argument("--repeat", type=int, default=10, help="Executions per query")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def seed(engine, models, args):
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import func, insert, select
+
+    with engine.begin() as conn:
+        existing = conn.execute(select(func.count()).select_from(models.User)).scalar()
+        conn.execute(insert(models.User), [
+            {"username": f"driver-{i}", "email": f"driver-{i}@example.com", "hashed_password": "-"}
+            for i in range(existing, args.drivers)
+        ])
+        existing = conn.execute(select(func.count()).select_from(models.Dispatch)).scalar()
+        rng = random.Random(args.seed)
+        start = datetime(2024, 1, 1)
+        batch = []
+        for i in range(existing, args.rows):
+            created_at = start + timedelta(minutes=i)
+            completed = rng.random() < 0.9
+            started_at = created_at + timedelta(minutes=rng.expovariate(1 / 90))
+            batch.append({
+                "area": "area-bench-drivers",
+                "created_at": created_at,
+                "date": created_at,
+                "description": "No description",
+                "status": models.DispatchStatusEnum.COMPLETED if completed else models.DispatchStatusEnum.PENDING,
+                "start_time": started_at if completed else None,
+                "complete_time": started_at + timedelta(minutes=rng.lognormvariate(3.7, 0.5)) if completed else None,
+                "owner_id": rng.randint(1, args.drivers),
+            })
+            if len(batch) == 10_000:
+                conn.execute(insert(models.Dispatch), batch)
+                batch.clear()
+        if batch:
+            conn.execute(insert(models.Dispatch), batch)
+
+
+def timed(fn, repeat: int) -> dict:
+    fn()  # warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    url = args.url or f"sqlite:///{tempfile.mkdtemp()}/bench_drivers.db"
+    os.environ["SQLALCHEMY_DATABASE_URL"] = url
+
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import Session
+
+    import crud
+    import models
+    import rollups
+    from database import engine
+
+    models.Base.metadata.create_all(bind=engine)
+    print(f"Seeding {args.rows} dispatches into {engine.url.render_as_string()} ...", file=sys.stderr)
+    seed(engine, models, args)
+    with engine.begin() as conn:
+        rollups.rebuild_driver_stats(conn)
+        conn.exec_driver_sql("ANALYZE")
+
+    def scan(db, order):
+        dispatch = models.Dispatch
+        completed = func.count(dispatch.complete_time)
+        duration = func.avg(rollups.seconds_between(db.get_bind(), dispatch.start_time, dispatch.complete_time))
+        stmt = (
+            select(dispatch.owner_id)
+            .where(dispatch.status == models.DispatchStatusEnum.COMPLETED)
+            .group_by(dispatch.owner_id)
+        )
+        if order == "avg_duration":
+            stmt = stmt.order_by(duration, dispatch.owner_id)
+        else:
+            stmt = stmt.order_by(completed.desc(), dispatch.owner_id.desc())
+        return db.execute(stmt.limit(args.limit)).scalars().all()
+
+    results = {}
+    with Session(engine) as db:
+        for order in crud.LEADERBOARD_ORDERS:
+            leaders = [row["user_id"] for row in crud.get_driver_leaderboard(db, order, args.limit)]
+            results[f"leaderboard by {order}"] = {
+                "match": leaders == scan(db, order),
+                "scan": timed(lambda: scan(db, order), args.repeat),
+                "stats": timed(lambda: crud.get_driver_leaderboard(db, order, args.limit), args.repeat),
+            }
+        results["one driver"] = {
+            "scan": timed(lambda: db.execute(
+                select(func.count(), func.avg(rollups.seconds_between(
+                    db.get_bind(), models.Dispatch.start_time, models.Dispatch.complete_time
+                ))).where(models.Dispatch.owner_id == 1,
+                          models.Dispatch.status == models.DispatchStatusEnum.COMPLETED)
+            ).all(), args.repeat),
+            "stats": timed(lambda: crud.get_driver_stats(db, 1), args.repeat),
+        }
+
+    for name, result in results.items():
+        match = f"  match {result['match']}" if "match" in result else ""
+        print(f"{name:28} scan {result['scan']['median_ms']:9.3f} ms  "
+              f"stats {result['stats']['median_ms']:9.3f} ms{match}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": args.rows, "drivers": args.drivers, "backend": engine.dialect.name,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+End-to-end endpoint benchmark, driving the FastAPI app in-process.
+
+Requests go through httpx's ASGI transport straight into `main.app`, so the
+numbers include routing, validation, auth, serialization and the database, but
+no network. For each dataset size a fresh database is seeded (or reused, if it
+already holds enough rows), then every endpoint is hit `--requests` times from
+`--concurrency` concurrent clients. Throughput and p50/p95/p99 latency are
+printed and saved as JSON; pass an earlier result file to `--compare` to see
+the change per endpoint.
+
+    python -m benchmarks.bench_endpoints --sizes 10000
+    python -m benchmarks.bench_endpoints --sizes 10000 1000000 10000000 --output after.json --compare before.json
+    python -m benchmarks.bench_endpoints --url postgresql://user:pw@localhost/bench_{size} --sizes 1000000
+
+With `--url`, `{size}` in the URL is replaced by the dataset size, so that each
+size gets its own database; without it, temporary SQLite files are used.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PASSWORD = "benchmark-password"
+ENDPOINTS = [
+    "signup", "login", "create", "list", "filter", "accepted", "get_by_id",
+    "accept", "start", "complete",
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Database URL template (default: temporary SQLite files)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000],
+                        help="Dataset sizes in dispatches, e.g. 10000 1000000 10000000")
+    parser.add_argument("--users", type=int, default=500, help="Owners to spread dispatches over")
+    parser.add_argument("--areas", type=int, default=50, help="Distinct areas")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent clients")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier JSON result to compare against")
+    return parser.parse_args(argv)
+
+
+def seed(args, size: int):
+    """
+    Seeds `--users` users and `size` dispatches through the bulk insert path.
+    """
+    import crud
+    import models
+    from database import SessionLocal
+    from passwords import pwd_context
+
+    rng = random.Random(args.seed)
+    statuses = list(models.DispatchStatusEnum)
+    weights = [5, 10, 1, 4, 80]  # in_progress, pending, accepted, started, completed
+    start = datetime(2024, 1, 1)
+    db = SessionLocal()
+    try:
+        if not db.query(models.User).count():
+            hashed_password = pwd_context.hash(PASSWORD)
+            db.add_all(
+                models.User(username=f"bench-{i}", email=f"bench-{i}@example.com",
+                            hashed_password=hashed_password)
+                for i in range(args.users)
+            )
+            db.commit()
+        user_ids = [user_id for (user_id,) in db.query(models.User.id).order_by(models.User.id)]
+
+        existing = db.query(models.Dispatch).count()
+        batch = []
+        for i in range(existing, size):
+            created_at = start + timedelta(seconds=i * 30)
+            row = crud.new_dispatch_values(
+                f"area-{rng.randrange(args.areas)}", created_at, rng.choice(user_ids)
+            )
+            row["date"] = created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+            row["status"] = rng.choices(statuses, weights)[0]
+            batch.append(row)
+            if len(batch) == 10_000:
+                crud.bulk_create_dispatches(db, batch)
+                batch.clear()
+        if batch:
+            crud.bulk_create_dispatches(db, batch)
+        pending_ids = [
+            dispatch_id for (dispatch_id,) in db.query(models.Dispatch.id)
+            .filter(models.Dispatch.status == models.DispatchStatusEnum.PENDING)
+            .order_by(models.Dispatch.id.desc())
+            .limit(args.requests)
+        ]
+        return user_ids, pending_ids
+    finally:
+        db.close()
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_endpoint(client, requests, concurrency: int) -> dict:
+    """
+    Sends the (method, url, kwargs) requests from `concurrency` workers.
+    """
+    queue = list(reversed(requests))
+    timings = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            method, url, kwargs = queue.pop()
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            timings.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        "requests": len(timings),
+        "errors": errors,
+        "throughput_rps": round(len(timings) / elapsed, 1),
+        "p50_ms": round(percentile(timings, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+    }
+
+
+async def run_size(args, size: int, user_ids, pending_ids) -> dict:
+    import httpx
+
+    from main import app
+
+    rng = random.Random(args.seed)
+    n = args.requests
+    auth_prefix = app.url_path_for("login").rsplit("/", 1)[0]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post(
+            f"{auth_prefix}/login", json={"email": "bench-0@example.com", "password": PASSWORD}
+        )
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['jwt_token']}"}
+        run_id = f"{int(time.time())}-{os.getpid()}"
+        pending_ids = pending_ids[:n]
+
+        plans = {
+            "signup": [("POST", f"{auth_prefix}/signup", {"json": {
+                "username": f"signup-{run_id}-{i}", "email": f"signup-{run_id}-{i}@example.com",
+                "password": PASSWORD}}) for i in range(n)],
+            "login": [("POST", f"{auth_prefix}/login", {"json": {
+                "email": f"bench-{rng.randrange(len(user_ids))}@example.com",
+                "password": PASSWORD}}) for _ in range(n)],
+            "create": [("POST", "/create", {"json": {"area": f"area-{rng.randrange(args.areas)}"},
+                                            "headers": headers}) for _ in range(n)],
+            "list": [("GET", "/dispatches", {"params": {"page": rng.randrange(1, 100), "limit": 100},
+                                             "headers": headers}) for _ in range(n)],
+            "filter": [("GET", "/dispatches/filter", {"params": {
+                "status": rng.choice(["pending", "started", "completed"]),
+                "area": f"area-{rng.randrange(args.areas)}", "limit": 100},
+                "headers": headers}) for _ in range(n)],
+            "accepted": [("GET", "/dispatches/accepted", {"params": {"limit": 100},
+                                                          "headers": headers}) for _ in range(n)],
+            "get_by_id": [("GET", f"/dispatches/{rng.randrange(1, size + 1)}",
+                           {"headers": headers}) for _ in range(n)],
+            # The transitions move the same pending dispatches through their lifecycle
+            "accept": [("POST", f"/dispatches/{i}/accept", {"headers": headers}) for i in pending_ids],
+            "start": [("POST", f"/dispatches/{i}/start", {"headers": headers}) for i in pending_ids],
+            "complete": [("POST", f"/dispatches/{i}/complete",
+                          {"params": {"notes": "benchmark"}, "headers": headers})
+                         for i in pending_ids],
+        }
+
+        results = {}
+        for name in ENDPOINTS:
+            if name not in args.endpoints:
+                continue
+            if name in ("start", "complete") and "accept" not in args.endpoints:
+                continue
+            results[name] = await run_endpoint(client, plans[name], args.concurrency)
+            print(f"  {name:10} {results[name]['throughput_rps']:>9} req/s  "
+                  f"p50 {results[name]['p50_ms']:>8} ms  p95 {results[name]['p95_ms']:>8} ms  "
+                  f"p99 {results[name]['p99_ms']:>8} ms  errors {results[name]['errors']}")
+        return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(previous: dict, current: dict):
+    for size, results in current["sizes"].items():
+        before = previous.get("sizes", {}).get(size)
+        if not before:
+            continue
+        print(f"\n== {size} dispatches vs {previous.get('revision', 'previous run')}")
+        for name, result in results.items():
+            if name not in before:
+                continue
+            for metric in ("throughput_rps", "p50_ms", "p99_ms"):
+                old, new = before[name][metric], result[metric]
+                change = (new - old) / old * 100 if old else 0.0
+                print(f"  {name:10} {metric:15} {old:>10} -> {new:>10} ({change:+.1f}%)")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = {
+        "revision": git_revision(),
+        "started_at": datetime.utcnow().isoformat(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "sizes": {},
+    }
+    for size in args.sizes:
+        # Each size runs in a fresh interpreter, as the app binds its database at import time
+        url = (args.url or f"sqlite:///{tempfile.gettempdir()}/bench_endpoints_{{size}}.db").format(size=size)
+        env = dict(os.environ, SQLALCHEMY_DATABASE_URL=url, BENCH_ENDPOINTS_SIZE=str(size))
+        env.pop("ASYNC_SQLALCHEMY_DATABASE_URL", None)
+        print(f"== {size} dispatches ({url})", flush=True)
+        with tempfile.NamedTemporaryFile("r", suffix=".json") as result_file:
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_endpoints", *(argv or sys.argv[1:]),
+                 "--child-output", result_file.name],
+                env=env, check=True,
+            )
+            output["sizes"][str(size)] = json.load(result_file)
+        output["backend"] = url.split(":", 1)[0].split("+", 1)[0]
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), output)
+
+
+def child_main(argv, result_path: str):
+    args = parse_args(argv)
+    size = int(os.environ["BENCH_ENDPOINTS_SIZE"])
+
+    import models
+    from database import engine
+
+    models.Base.metadata.create_all(bind=engine)
+    print(f"  seeding up to {size} dispatches ...", file=sys.stderr, flush=True)
+    user_ids, pending_ids = seed(args, size)
+    results = asyncio.run(run_size(args, size, user_ids, pending_ids))
+    with open(result_path, "w") as f:
+        json.dump(results, f)
+
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+    if "--child-output" in argv:
+        index = argv.index("--child-output")
+        child_main(argv[:index] + argv[index + 2:], argv[index + 1])
+    else:
+        main(argv)
@@ -0,0 +1,176 @@
+"""
+Before/after benchmark for the dispatch query indexes (migration 3f1c2a7d9e45,
+moved to area_id by b9d4e6f2a178).
+
+Seeds a scratch database, then runs the crud query patterns with and without
+the composite and partial indexes, printing each query plan and its median
+latency. Use a dedicated database: the indexes are dropped and recreated.
+
+    python -m benchmarks.bench_indexes --rows 200000
+    python -m benchmarks.bench_indexes --url postgresql://user:pw@localhost/bench --rows 2000000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Database URL (default: a temporary SQLite file)")
+    parser.add_argument("--rows", type=int, default=200_000, help="Dispatches to seed")
+    parser.add_argument("--users", type=int, default=500, help="Owners to spread dispatches over")
+    parser.add_argument("--areas", type=int, default=50, help="Distinct areas")
+    parser.add_argument("--repeat", type=int, default=50, help="Executions per query")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def seed(engine, models, args):
+    from sqlalchemy import func, insert, select
+
+    with engine.begin() as conn:
+        existing = conn.execute(select(func.count()).select_from(models.Dispatch)).scalar()
+        if existing >= args.rows:
+            return
+        rng = random.Random(args.seed)
+        names = [f"area-{i}" for i in range(args.areas)]
+        known = dict(conn.execute(select(models.Area.name, models.Area.id)).all())
+        new = [{"name": name} for name in names if name not in known]
+        if new:
+            conn.execute(insert(models.Area), new)
+            known = dict(conn.execute(select(models.Area.name, models.Area.id)).all())
+        statuses = list(models.DispatchStatusEnum)
+        weights = [5, 10, 1, 4, 80]  # in_progress, pending, accepted, started, completed
+        start = datetime(2024, 1, 1)
+        batch = []
+        for i in range(existing, args.rows):
+            created_at = start + timedelta(minutes=i)
+            area = names[rng.randrange(args.areas)]
+            batch.append({
+                "area": area,
+                "area_id": known[area],
+                "created_at": created_at,
+                "date": created_at.replace(hour=0, minute=0, second=0, microsecond=0),
+                "description": "No description",
+                "status": rng.choices(statuses, weights)[0],
+                "owner_id": rng.randrange(1, args.users + 1),
+            })
+            if len(batch) == 10_000:
+                conn.execute(insert(models.Dispatch), batch)
+                batch.clear()
+        if batch:
+            conn.execute(insert(models.Dispatch), batch)
+
+
+def build_queries(session, crud, models):
+    Dispatch = models.Dispatch
+    day = datetime(2024, 2, 1)
+    return {
+        "accepted (owner, page 1)": crud.paginate(
+            session.query(Dispatch).filter(Dispatch.owner_id == 7), 0, 10
+        ),
+        "accepted (owner, cursor)": crud.paginate(
+            session.query(Dispatch).filter(Dispatch.owner_id == 7), 0, 10, after_id=100_000
+        ),
+        "filter status+area": crud.paginate(
+            session.query(Dispatch).filter(
+                *crud.dispatch_filters(models.DispatchStatusEnum.STARTED, None, "area-3")
+            ), 0, 10
+        ),
+        "filter status+area+date": crud.paginate(
+            session.query(Dispatch).filter(
+                *crud.dispatch_filters(models.DispatchStatusEnum.COMPLETED, day, "area-3")
+            ), 0, 10
+        ),
+        "filter pending+area": crud.paginate(
+            session.query(Dispatch).filter(
+                *crud.dispatch_filters(models.DispatchStatusEnum.PENDING, None, "area-3")
+            ), 0, 10
+        ),
+    }
+
+
+def explain(conn, sql):
+    from sqlalchemy import text
+
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    rows = conn.execute(text(prefix + sql)).fetchall()
+    return [str(row[-1]) for row in rows]
+
+
+def measure(engine, queries, repeat):
+    from sqlalchemy import text
+
+    results = {}
+    with engine.connect() as conn:
+        for name, query in queries.items():
+            sql = str(query.statement.compile(
+                dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+            ))
+            conn.execute(text(sql)).fetchall()  # warm the cache
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.execute(text(sql)).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = {
+                "median_ms": round(statistics.median(timings), 3),
+                "plan": explain(conn, sql),
+            }
+    return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    url = args.url or f"sqlite:///{tempfile.mkdtemp()}/bench_indexes.db"
+    os.environ["SQLALCHEMY_DATABASE_URL"] = url
+
+    from sqlalchemy.orm import Session
+
+    import crud
+    import models
+    from database import engine
+
+    models.Base.metadata.create_all(bind=engine)
+    new_indexes = [
+        index for index in models.Dispatch.__table__.indexes
+        if index.name.startswith(("ix_dispatches_owner_id_id", "ix_dispatches_status_area",
+                                  "ix_dispatches_pending"))
+    ]
+    for index in new_indexes:
+        index.drop(bind=engine, checkfirst=True)
+
+    print(f"Seeding {args.rows} dispatches into {engine.url.render_as_string()} ...", file=sys.stderr)
+    seed(engine, models, args)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE" if engine.dialect.name == "sqlite" else "ANALYZE dispatches")
+
+    with Session(engine) as session:
+        queries = build_queries(session, crud, models)
+        before = measure(engine, queries, args.repeat)
+        for index in new_indexes:
+            index.create(bind=engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE" if engine.dialect.name == "sqlite" else "ANALYZE dispatches")
+        after = measure(engine, queries, args.repeat)
+
+    for name in queries:
+        print(f"\n== {name}: {before[name]['median_ms']} ms -> {after[name]['median_ms']} ms")
+        print("  before: " + "\n          ".join(before[name]["plan"]))
+        print("  after:  " + "\n          ".join(after[name]["plan"]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": args.rows, "backend": engine.dialect.name,
+                       "before": before, "after": after}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark of the full-text dispatch search (`q=` on `GET /dispatches/filter`).
+
+Seeds `--rows` completed dispatches with generated recipient names and notes,
+then times `crud.search_dispatch_rows` for a rare name, a common name, a
+prefix and a two-word query, on the first page and on the page after a
+cursor, and `crud.count_search_matches` without its cache.
+
+    python -m benchmarks.bench_search --rows 200000
+    python -m benchmarks.bench_search --url postgresql://user:pw@localhost/bench --rows 5000000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+FIRST_NAMES = ["maria", "john", "jane", "ahmed", "li", "fatima", "carlos", "anna", "olga", "kenji"]
+LAST_NAMES = ["smith", "lopez", "khan", "wang", "rossi", "novak", "silva", "tanaka", "brown", "garcia"]
+NOTES = ["left at back door", "handed to neighbour", "signed by reception", "fragile, upright",
+         "call on arrival", "leave in parcel locker", "gate code 4411", "no answer, retried"]
+QUERIES = {
+    "rare name": "zebulon",
+    "common name": "smith",
+    "prefix": "gar",
+    "two words": "maria khan",
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Database URL (default: a temporary SQLite file)")
+    parser.add_argument("--rows", type=int, default=200_000, help="Dispatches to seed")
+    parser.add_argument("--limit", type=int, default=20, help="Results per page")
+    parser.add_argument("--repeat", type=int, default=20, help="Executions per query")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def seed(engine, models, args):
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import func, insert, select
+
+    with engine.begin() as conn:
+        existing = conn.execute(select(func.count()).select_from(models.Dispatch)).scalar()
+        rng = random.Random(args.seed)
+        start = datetime(2024, 1, 1)
+        batch = []
+        for i in range(existing, args.rows):
+            created_at = start + timedelta(minutes=i)
+            name = "zebulon quade" if i % 50_000 == 7 else f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            batch.append({
+                "area": f"area-{i % 50}",
+                "created_at": created_at,
+                "date": created_at,
+                "description": "No description",
+                "status": models.DispatchStatusEnum.COMPLETED,
+                "notes": rng.choice(NOTES),
+                "recipient_name": name,
+                "owner_id": 1,
+            })
+            if len(batch) == 10_000:
+                conn.execute(insert(models.Dispatch), batch)
+                batch.clear()
+        if batch:
+            conn.execute(insert(models.Dispatch), batch)
+
+
+def timed(fn, repeat: int) -> dict:
+    fn()  # warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    url = args.url or f"sqlite:///{tempfile.mkdtemp()}/bench_search.db"
+    os.environ["SQLALCHEMY_DATABASE_URL"] = url
+
+    from sqlalchemy.orm import Session
+
+    import cache
+    import crud
+    import models
+    from database import engine
+
+    models.Base.metadata.create_all(bind=engine)
+    print(f"Seeding {args.rows} dispatches into {engine.url.render_as_string()} ...", file=sys.stderr)
+    seed(engine, models, args)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE" if engine.dialect.name == "sqlite" else "ANALYZE dispatches")
+
+    results = {}
+    with Session(engine) as db:
+        for name, query in QUERIES.items():
+            _, position = crud.search_dispatch_rows(db, query, None, None, None, 0, args.limit)
+
+            def count():
+                cache.count_cache.clear()
+                return crud.count_search_matches(db, query, None, None, None)
+
+            results[name] = {
+                "matches": count(),
+                "first_page": timed(
+                    lambda: crud.search_dispatch_rows(db, query, None, None, None, 0, args.limit),
+                    args.repeat,
+                ),
+                "cursor_page": timed(
+                    lambda: crud.search_dispatch_rows(
+                        db, query, None, None, None, 0, args.limit, after=position
+                    ),
+                    args.repeat,
+                ),
+                "count": timed(count, args.repeat),
+            }
+
+    for name, result in results.items():
+        print(f"{name:12} matches {result['matches']:9}  first page {result['first_page']['median_ms']:9.3f} ms  "
+              f"cursor page {result['cursor_page']['median_ms']:9.3f} ms  count {result['count']['median_ms']:9.3f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": args.rows, "backend": engine.dialect.name, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Microbenchmark of the list endpoint serialization paths.
+
+Compares, for one page of dispatches, the ORM path (hydrate `models.Dispatch`
+objects, validate them against `List[schemas.DispatchBase]` with
+`from_attributes`, dump to JSON-compatible Python, then `json.dumps`, as FastAPI
+does for a `response_model`) with the row fast path (select the columns with
+SQL defaults, dump straight to bytes through the precompiled adapter).
+
+    python -m benchmarks.bench_serialization --limit 100
+    python -m benchmarks.bench_serialization --url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Database URL (default: a temporary SQLite file)")
+    parser.add_argument("--rows", type=int, default=10_000, help="Dispatches to seed")
+    parser.add_argument("--limit", type=int, default=100, help="Page size")
+    parser.add_argument("--repeat", type=int, default=500, help="Pages per path")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def seed(engine, models, rows):
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import func, insert, select
+
+    with engine.begin() as conn:
+        existing = conn.execute(select(func.count()).select_from(models.Dispatch)).scalar()
+        start = datetime(2024, 1, 1)
+        batch = [
+            {
+                "area": f"area-{i % 50}",
+                "created_at": start + timedelta(minutes=i),
+                "date": start + timedelta(minutes=i),
+                # Leave some descriptions to the SQL default
+                "description": None if i % 10 == 0 else "No description",
+                "status": models.DispatchStatusEnum.PENDING,
+                "owner_id": 1,
+            }
+            for i in range(existing, rows)
+        ]
+        if batch:
+            conn.execute(insert(models.Dispatch), batch)
+
+
+def time_path(fn, repeat: int) -> dict:
+    fn()  # warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(statistics.median(timings), 4),
+        "p95_ms": round(sorted(timings)[int(len(timings) * 0.95) - 1], 4),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    url = args.url or f"sqlite:///{tempfile.mkdtemp()}/bench_serialization.db"
+    os.environ["SQLALCHEMY_DATABASE_URL"] = url
+
+    from pydantic import TypeAdapter
+    from sqlalchemy.orm import Session
+
+    import crud
+    import models
+    import schemas
+    from database import engine
+
+    models.Base.metadata.create_all(bind=engine)
+    print(f"Seeding {args.rows} dispatches into {engine.url.render_as_string()} ...", file=sys.stderr)
+    seed(engine, models, args.rows)
+
+    response_adapter = TypeAdapter(List[schemas.DispatchBase])
+
+    def orm_path():
+        with Session(engine) as db:
+            dispatches = crud.get_dispatches(db, 0, args.limit)
+            for dispatch in dispatches:
+                if dispatch.description is None:
+                    dispatch.description = "No description"
+            validated = response_adapter.validate_python(dispatches, from_attributes=True)
+            return json.dumps(response_adapter.dump_python(validated, mode="json")).encode()
+
+    def row_path():
+        with Session(engine) as db:
+            rows = crud.get_dispatch_rows(db, 0, args.limit)
+            return schemas.dispatch_rows_adapter.dump_json(rows)
+
+    if json.loads(orm_path()) != json.loads(row_path()):
+        sys.exit("The two paths produce different JSON")
+
+    results = {"orm": time_path(orm_path, args.repeat), "rows": time_path(row_path, args.repeat)}
+    speedup = results["orm"]["median_ms"] / results["rows"]["median_ms"]
+    for name, result in results.items():
+        print(f"{name:5} median {result['median_ms']:.3f} ms  p95 {result['p95_ms']:.3f} ms")
+    print(f"row path is {speedup:.1f}x faster per {args.limit}-row page")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": args.rows, "limit": args.limit, "backend": engine.dialect.name,
+                       "results": results, "speedup": round(speedup, 2)}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Content-addressed store for proof-of-delivery images on the local filesystem.
+
+Blobs are keyed by the SHA-256 of their content and laid out under BLOB_DIR
+(default: `blobs/`) by the first two bytes of the key:
+
+    blobs/3f/a2/3fa2...e9
+
+Storing the same image twice keeps a single file. Dispatches only hold the
+64-character key in `pod_image`; the image itself is uploaded to `POST /pods`
+and served from `GET /pods/{key}`.
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+BLOB_DIR = os.getenv("BLOB_DIR", "blobs")
+MAX_POD_BYTES = int(os.getenv("MAX_POD_BYTES", str(10 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+# Bytes needed to recognize every accepted image format
+SNIFF_BYTES = 12
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+# Leading bytes of the accepted image formats
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+class BlobTooLargeError(Exception):
+    """
+    Raised when an upload exceeds the size limit.
+    """
+
+
+class UnsupportedBlobError(Exception):
+    """
+    Raised when an upload is not one of the accepted image formats.
+    """
+
+
+def is_key(value: Optional[str]) -> bool:
+    """
+    Returns whether `value` has the form of a blob key.
+    """
+    return bool(value) and KEY_PATTERN.match(value) is not None
+
+
+def path_for(key: str) -> str:
+    """
+    Returns the file path of the blob with the given key.
+    """
+    return os.path.join(BLOB_DIR, key[:2], key[2:4], key)
+
+
+def exists(key: str) -> bool:
+    """
+    Returns whether a blob with the given key is stored.
+    """
+    return is_key(key) and os.path.isfile(path_for(key))
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """
+    Returns the image media type matching the first bytes of a blob, if any.
+    """
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class BlobWriter:
+    """
+    Writes a blob handed over in chunks into the store, hashing it on the way.
+
+    The content goes to a temporary file next to the blobs, which `commit`
+    renames to its key once complete, so readers never see a partial blob. The
+    size and format limits are checked as the chunks arrive. After an error,
+    call `discard` to remove the temporary file.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = MAX_POD_BYTES, images_only: bool = True):
+        """
+        Initializes the writer and creates its temporary file.
+
+        Parameters:
+        - max_bytes (Optional[int]): Reject content larger than this; None for no limit.
+        - images_only (bool): Reject content that is not a JPEG, PNG, GIF or WebP image.
+        """
+        self.max_bytes = max_bytes
+        self.images_only = images_only
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+        os.makedirs(BLOB_DIR, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(dir=BLOB_DIR, prefix=".upload-")
+        self.temp = os.fdopen(fd, "wb")
+
+    def check_format(self):
+        if not self.images_only:
+            return
+        if not self.head:
+            raise UnsupportedBlobError("Empty upload")
+        if sniff_content_type(self.head) is None:
+            raise UnsupportedBlobError("Not a JPEG, PNG, GIF or WebP image")
+
+    def write(self, chunk: bytes):
+        """
+        Appends a chunk of the content.
+
+        Raises:
+        - BlobTooLargeError: If the content grows larger than `max_bytes`.
+        - UnsupportedBlobError: If `images_only` is set and the content is not an image.
+        """
+        self.size += len(chunk)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise BlobTooLargeError(f"Larger than {self.max_bytes} bytes")
+        if len(self.head) < SNIFF_BYTES:
+            self.head += chunk[:SNIFF_BYTES - len(self.head)]
+            if len(self.head) == SNIFF_BYTES:
+                self.check_format()
+        self.digest.update(chunk)
+        self.temp.write(chunk)
+
+    def commit(self) -> Tuple[str, int]:
+        """
+        Stores the content written so far. If the blob already exists the copy is discarded.
+
+        Returns:
+        - Tuple[str, int]: The key and size of the blob.
+
+        Raises:
+        - UnsupportedBlobError: If `images_only` is set and the content is not an image.
+        """
+        self.temp.close()
+        if len(self.head) < SNIFF_BYTES:
+            self.check_format()
+        key = self.digest.hexdigest()
+        path = path_for(key)
+        if os.path.exists(path):
+            os.remove(self.temp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self.temp_path, path)
+        return key, self.size
+
+    def discard(self):
+        """
+        Removes the temporary file of a blob that will not be committed.
+        """
+        self.temp.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+def put_stream(
+        source: BinaryIO,
+        max_bytes: Optional[int] = MAX_POD_BYTES,
+        images_only: bool = True,
+) -> Tuple[str, int]:
+    """
+    Copies a file object into the store in chunks (see `BlobWriter`).
+
+    Parameters:
+    - source (BinaryIO): The file object to read.
+    - max_bytes (Optional[int]): Reject content larger than this; None for no limit.
+    - images_only (bool): Reject content that is not a JPEG, PNG, GIF or WebP image.
+
+    Returns:
+    - Tuple[str, int]: The key and size of the blob.
+
+    Raises:
+    - BlobTooLargeError: If the content is larger than `max_bytes`.
+    - UnsupportedBlobError: If `images_only` is set and the content is not an image.
+    """
+    writer = BlobWriter(max_bytes, images_only)
+    try:
+        while chunk := source.read(CHUNK_SIZE):
+            writer.write(chunk)
+        return writer.commit()
+    except BaseException:
+        writer.discard()
+        raise
+
+
+def put_bytes(data: bytes) -> str:
+    """
+    Stores `data` without size or format checks and returns its key.
+    """
+    return put_stream(io.BytesIO(data), max_bytes=None, images_only=False)[0]
+
+
+def stat(key: str) -> Optional[Tuple[int, str]]:
+    """
+    Returns the size and media type of a stored blob, or None if it is missing.
+    """
+    if not is_key(key):
+        return None
+    try:
+        with open(path_for(key), "rb") as f:
+            head = f.read(16)
+            size = os.fstat(f.fileno()).st_size
+    except FileNotFoundError:
+        return None
+    return size, sniff_content_type(head) or "application/octet-stream"
+
+
+def read_bytes(key: str) -> bytes:
+    """
+    Returns the content of a stored blob.
+    """
+    with open(path_for(key), "rb") as f:
+        return f.read()
+
+
+def parse_range(header: str, size: int) -> Tuple[int, int]:
+    """
+    Parses a single-range `Range` header against a blob of `size` bytes.
+
+    Parameters:
+    - header (str): The header value, e.g. `bytes=0-1023`, `bytes=1024-` or `bytes=-500`.
+    - size (int): The size of the blob.
+
+    Returns:
+    - Tuple[int, int]: The first and last byte positions, inclusive.
+
+    Raises:
+    - ValueError: If the header is malformed, has several ranges or is not satisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        raise ValueError("Only a single byte range is supported")
+    first, _, last = spec.strip().partition("-")
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+    else:
+        start = max(0, size - int(last))
+        end = size - 1
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def iter_range(key: str, start: int, end: int) -> Iterator[bytes]:
+    """
+    Yields the bytes `start` to `end` (inclusive) of a stored blob in chunks.
+    """
+    remaining = end - start + 1
+    with open(path_for(key), "rb") as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,399 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+from pydantic import ValidationError
+
+import metrics
+import schemas
+
+
+class TTLCache:
+    """
+    A bounded in-process LRU cache whose entries expire after a deadline.
+
+    Once `maxsize` entries are stored, the least recently used entry is evicted
+    to make room. Expired entries are dropped lazily when they are looked up.
+    All operations are guarded by a lock so the cache can be shared between the
+    event loop and worker threads.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        """
+        Initializes the cache.
+
+        Parameters:
+        - maxsize (int): Maximum number of entries kept in the cache.
+        - ttl (Optional[float]): Default lifetime of an entry in seconds. Entries
+          without a TTL or explicit deadline never expire.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the cached value for `key`, or `default` if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        """
+        Stores `value` under `key`.
+
+        Parameters:
+        - key (Hashable): The cache key.
+        - value (Any): The value to cache.
+        - expires_at (Optional[float]): Unix timestamp after which the entry is
+          stale. The default TTL is used if omitted, and caps it if both are set.
+        """
+        if self.ttl is not None:
+            deadline = time.time() + self.ttl
+            expires_at = deadline if expires_at is None else min(expires_at, deadline)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        """
+        Removes `key` from the cache if present.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[Any], bool]) -> int:
+        """
+        Removes every entry whose value matches `predicate`.
+
+        Returns:
+        - int: The number of entries removed.
+        """
+        with self._lock:
+            stale = [key for key, (value, _) in self._data.items() if predicate(value)]
+            for key in stale:
+                del self._data[key]
+        return len(stale)
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Verified principals keyed by the SHA-256 of their bearer token. Entries live
+# until the token's `exp`, capped by USER_CACHE_TTL so that changes made by
+# other workers (e.g. a deactivation) are picked up within that window.
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "60")),
+)
+
+
+def invalidate_user(user_id: int) -> int:
+    """
+    Drops every cached token that resolves to the given user.
+
+    Parameters:
+    - user_id (int): The ID of the user whose cached principals are removed.
+
+    Returns:
+    - int: The number of cache entries removed.
+    """
+    return user_cache.discard_where(lambda user: user.id == user_id)
+
+
+# Results of COUNT(*) queries behind list totals, keyed by their filters
+count_cache = TTLCache(
+    maxsize=int(os.getenv("COUNT_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("COUNT_CACHE_TTL", "10")),
+)
+
+
+class CacheBackend:
+    """
+    Interface of the stores behind `DispatchCache`.
+
+    Values are `schemas.DispatchBase` objects keyed by dispatch ID. A backend
+    may keep them as they are (in-process) or serialize them (shared between
+    workers).
+    """
+
+    def get(self, key: int) -> Optional[schemas.DispatchBase]:
+        raise NotImplementedError
+
+    def set(self, key: int, value: schemas.DispatchBase):
+        raise NotImplementedError
+
+    def delete(self, key: int):
+        raise NotImplementedError
+
+
+class LocalBackend(CacheBackend):
+    """
+    Per-process LRU store with a TTL and size bound.
+
+    A value never replaces a cached one with a higher version, so a read that
+    raced with a transition cannot put the older row back.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float]):
+        self.entries = TTLCache(maxsize, ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key: int) -> Optional[schemas.DispatchBase]:
+        return self.entries.get(key)
+
+    def set(self, key: int, value: schemas.DispatchBase):
+        with self._lock:
+            cached = self.entries.get(key)
+            if cached is None or cached.version <= value.version:
+                self.entries.set(key, value)
+
+    def delete(self, key: int):
+        self.entries.delete(key)
+
+
+# Stores ARGV[1] under KEYS[1] (for ARGV[3] seconds, if given) unless the JSON
+# already stored there has a `version` higher than ARGV[2]. Returns 1 if stored.
+SET_IF_NEWER_SCRIPT = """
+local current = redis.call("GET", KEYS[1])
+if current then
+    local ok, stored = pcall(cjson.decode, current)
+    if ok and type(stored) == "table" and tonumber(stored["version"])
+            and tonumber(stored["version"]) > tonumber(ARGV[2]) then
+        return 0
+    end
+end
+if ARGV[3] == "" then
+    redis.call("SET", KEYS[1], ARGV[1])
+else
+    redis.call("SET", KEYS[1], ARGV[1], "EX", ARGV[3])
+end
+return 1
+"""
+
+
+class SharedBackend(CacheBackend):
+    """
+    Store shared by all workers, over a Redis-style client.
+
+    The client needs `get(name)`, `delete(name)` and `register_script(script)`,
+    as provided by `redis.Redis`; `InMemoryClient` stands in for it locally.
+    Values are stored as JSON. Like `LocalBackend`, a value never replaces a
+    stored one with a higher version: `set` runs SET_IF_NEWER_SCRIPT, which
+    compares and sets in one step, so a worker that read a dispatch before
+    another worker's transition cannot put the older row back. The client is
+    called from the thread running the crud function, so it should be quick to
+    answer.
+    """
+
+    def __init__(self, client, ttl: Optional[float], prefix: str = "dispatch:"):
+        self.client = client
+        self.ttl = None if ttl is None else max(1, int(ttl))
+        self.prefix = prefix
+        self._set_if_newer = client.register_script(SET_IF_NEWER_SCRIPT)
+
+    def get(self, key: int) -> Optional[schemas.DispatchBase]:
+        data = self.client.get(f"{self.prefix}{key}")
+        return None if data is None else schemas.DispatchBase.model_validate_json(data)
+
+    def set(self, key: int, value: schemas.DispatchBase):
+        self._set_if_newer(
+            keys=[f"{self.prefix}{key}"],
+            args=[value.model_dump_json(), value.version, "" if self.ttl is None else self.ttl],
+        )
+
+    def delete(self, key: int):
+        self.client.delete(f"{self.prefix}{key}")
+
+
+class InMemoryClient:
+    """
+    Local stand-in for the Redis client used by SharedBackend, for development
+    and benchmarks. It keeps serialized values in a dict, with expiry.
+
+    It cannot run Lua: `register_script` only accepts SET_IF_NEWER_SCRIPT, and
+    returns an equivalent that keeps the stored value if its JSON `version` is
+    higher than the new one, comparing and setting under the client's lock.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            return self._get(name)
+
+    def set(self, name: str, value, ex: Optional[int] = None):
+        with self._lock:
+            self._set(name, value, ex)
+
+    def delete(self, *names: str):
+        with self._lock:
+            for name in names:
+                self._data.pop(name, None)
+
+    def register_script(self, script: str) -> Callable[..., int]:
+        if script != SET_IF_NEWER_SCRIPT:
+            raise NotImplementedError("InMemoryClient only runs SET_IF_NEWER_SCRIPT")
+        return self._set_if_newer
+
+    def _set_if_newer(self, keys: List[str], args: list) -> int:
+        (name,), (value, version, ex) = keys, args
+        with self._lock:
+            current = self._get(name)
+            if current is not None:
+                try:
+                    stored = json.loads(current).get("version")
+                except (ValueError, AttributeError):
+                    stored = None
+                if isinstance(stored, int) and stored > int(version):
+                    return 0
+            self._set(name, value, int(ex) if ex != "" else None)
+            return 1
+
+    def _get(self, name: str) -> Optional[bytes]:
+        entry = self._data.get(name)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[name]
+            return None
+        return value
+
+    def _set(self, name: str, value, ex: Optional[int]):
+        data = value.encode() if isinstance(value, str) else value
+        self._data[name] = (data, None if ex is None else time.time() + ex)
+
+
+class DispatchCache:
+    """
+    Read-through cache of dispatches by ID in front of `crud.get_dispatch_by_id`.
+
+    Reads fill the cache, and the crud write paths store the updated dispatches
+    after committing (or drop them, for deletions), so a worker never serves an
+    entry older than its own last write. Writes made by other workers are only
+    seen once the entry expires, unless the backend is shared. Hits and misses
+    are counted in `hits` and `misses` and exported as `cache_requests_total`.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend], name: str = "dispatch"):
+        """
+        Initializes the cache.
+
+        Parameters:
+        - backend (Optional[CacheBackend]): The store to use; None disables caching.
+        - name (str): The `cache` label of the metrics.
+        """
+        self.backend = backend
+        self.hits = self.misses = 0
+        self._hits = metrics.CACHE_REQUESTS.labels(name, "hit")
+        self._misses = metrics.CACHE_REQUESTS.labels(name, "miss")
+        self._invalidations = metrics.CACHE_INVALIDATIONS.labels(name)
+
+    def get(self, dispatch_id: int) -> Optional[schemas.DispatchBase]:
+        """
+        Returns the cached dispatch, or None on a miss.
+        """
+        if self.backend is None:
+            return None
+        value = self.backend.get(dispatch_id)
+        if value is None:
+            self.misses += 1
+            self._misses.inc()
+        else:
+            self.hits += 1
+            self._hits.inc()
+        return value
+
+    def snapshot(self, dispatches: Iterable) -> Dict[int, Optional[schemas.DispatchBase]]:
+        """
+        Captures dispatches for `store` while their attributes are loaded, i.e.
+        before a commit expires them.
+
+        Returns:
+        - Dict[int, Optional[schemas.DispatchBase]]: The API representation per ID;
+          None for a dispatch the schema rejects, which `store` then drops.
+        """
+        if self.backend is None:
+            return {}
+        snapshots = {}
+        for dispatch in dispatches:
+            try:
+                snapshots[dispatch.id] = schemas.DispatchBase.model_validate(dispatch)
+            except ValidationError:
+                snapshots[dispatch.id] = None
+        return snapshots
+
+    def store(self, snapshots: Dict[int, Optional[schemas.DispatchBase]]):
+        """
+        Stores the dispatches captured by `snapshot`.
+        """
+        for dispatch_id, value in snapshots.items():
+            if value is None:
+                self.invalidate([dispatch_id])
+            else:
+                self.backend.set(dispatch_id, value)
+
+    def invalidate(self, dispatch_ids: Iterable[int]):
+        """
+        Drops the given dispatches from the cache.
+        """
+        if self.backend is None:
+            return
+        for dispatch_id in dispatch_ids:
+            self.backend.delete(dispatch_id)
+            self._invalidations.inc()
+
+
+def make_dispatch_backend(kind: str) -> Optional[CacheBackend]:
+    """
+    Builds the dispatch cache backend named by DISPATCH_CACHE.
+
+    Parameters:
+    - kind (str): "local" for a per-process LRU, "shared" for a store shared by
+      all workers (Redis at REDIS_URL, or an in-process stand-in without it), or
+      "off" to disable the cache.
+
+    Returns:
+    - Optional[CacheBackend]: The backend, or None when the cache is disabled.
+    """
+    ttl = float(os.getenv("DISPATCH_CACHE_TTL", "30"))
+    if kind == "off":
+        return None
+    if kind == "local":
+        return LocalBackend(int(os.getenv("DISPATCH_CACHE_SIZE", "10000")), ttl)
+    if kind == "shared":
+        redis_url = os.getenv("REDIS_URL")
+        if not redis_url:
+            return SharedBackend(InMemoryClient(), ttl)
+        import redis  # Optional dependency, only needed for a Redis-backed cache
+
+        return SharedBackend(redis.Redis.from_url(redis_url), ttl)
+    raise ValueError(f"Unknown DISPATCH_CACHE backend: {kind!r}")
+
+
+# Dispatches by ID, for `crud.get_dispatch_by_id`
+dispatch_cache = DispatchCache(make_dispatch_backend(os.getenv("DISPATCH_CACHE", "local")))
@@ -1,15 +1,27 @@
-from datetime import datetime
-from typing import Optional
+import csv
+import io
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
 
 from dotenv import load_dotenv
+from sqlalchemy import case, delete, func, insert, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 import models
 import schemas
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 import logging
 import os
 
+import archive
+import cache
+from areas import area_index
+import events
+import search
+from passwords import pwd_context
+
 # Load environment variables from the .env file
 load_dotenv()
 
@@ -18,7 +30,6 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 
 ALGORITHM = "HS256"
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 logger = logging.getLogger(__name__)
 
 
@@ -50,28 +61,100 @@ def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
 
-def create_user(db: Session, user: schemas.UserCreate):
+def create_user(
+        db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None
+):
     """
     Creates a new user in the database.
 
+    The user is written with a single INSERT; a duplicate email or username is
+    detected from the unique constraint violation rather than a prior lookup.
+
     Parameters:
     - db (Session): The SQLAlchemy session object.
     - user (schemas.UserCreate): The user creation schema containing user details.
+    - hashed_password (Optional[str]): The precomputed password hash. The password
+      is hashed here if omitted.
 
     Returns:
-    - models.User: The newly created user object.
+    - models.User: The newly created user object, or None if the email or
+      username is already registered.
     """
-    hashed_password = pwd_context.hash(user.password)
+    if hashed_password is None:
+        hashed_password = pwd_context.hash(user.password)
     db_user = models.User(
         username=user.username, email=user.email, hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
     return db_user
 
 
-def get_dispatches(db: Session, skip: int = 0, limit: int = 10):
+def update_password_hash(db: Session, user_id: int, hashed_password: str):
+    """
+    Replaces the stored password hash of a user.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - user_id (int): The ID of the user to update.
+    - hashed_password (str): The new password hash.
+    """
+    db.query(models.User).filter(models.User.id == user_id).update(
+        {models.User.hashed_password: hashed_password}, synchronize_session=False
+    )
+    db.commit()
+
+
+def paginate(query, skip: int, limit: int, after_id: Optional[int] = None):
+    """
+    Applies page-number or keyset pagination to a dispatch query.
+
+    Both modes order on the primary key so that page and cursor results agree.
+    When `after_id` is given the offset is ignored and the query seeks directly
+    past the last row the client has seen.
+
+    Parameters:
+    - query (Query): The dispatch query to paginate.
+    - skip (int): Number of records to skip (page-number mode).
+    - limit (int): Number of records to retrieve.
+    - after_id (Optional[int]): ID of the last row of the previous page (cursor mode).
+
+    Returns:
+    - Query: The paginated query.
+    """
+    query = query.order_by(models.Dispatch.id)
+    if after_id is not None:
+        return query.filter(models.Dispatch.id > after_id).limit(limit)
+    return query.offset(skip).limit(limit)
+
+
+def deactivate_user(db: Session, user_id: int):
+    """
+    Marks a user as inactive and drops any cached sessions for them.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - user_id (int): The ID of the user to deactivate.
+
+    Returns:
+    - models.User: The deactivated user object if found, else None.
+    """
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user:
+        return None
+    user.is_active = False
+    db.commit()
+    cache.invalidate_user(user_id)
+    return user
+
+
+def get_dispatches(
+        db: Session, skip: int = 0, limit: int = 10, after_id: Optional[int] = None
+):
     """
     Retrieves a list of dispatches from the database with pagination.
 
@@ -79,11 +162,12 @@ def get_dispatches(db: Session, skip: int = 0, limit: int = 10):
     - db (Session): The SQLAlchemy session object.
     - skip (int): Number of records to skip (for pagination).
     - limit (int): Number of records to retrieve.
+    - after_id (Optional[int]): Return rows after this ID instead of skipping.
 
     Returns:
     - list[models.Dispatch]: A list of dispatch objects.
     """
-    return db.query(models.Dispatch).offset(skip).limit(limit).all()
+    return paginate(db.query(models.Dispatch), skip, limit, after_id).all()
 
 
 def create_dispatch(
@@ -101,25 +185,670 @@ def create_dispatch(
     Returns:
     - models.Dispatch: The newly created dispatch object.
     """
-    db_dispatch = models.Dispatch(area=area, created_at=created_at, owner_id=user_id)
+    db_dispatch = models.Dispatch(
+        area=area, area_id=area_ids(db, [area])[area], created_at=created_at, owner_id=user_id
+    )
     db.add(db_dispatch)
+    db.flush()
+    record_created(db, [db_dispatch])
     db.commit()
     db.refresh(db_dispatch)
     return db_dispatch
 
 
-def get_dispatch_by_id(db: Session, dispatch_id: int):
+def upsert(db: Session, model):
+    """
+    Returns an INSERT for `model` that supports ON CONFLICT on the session's backend.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"Upserts are not supported on {dialect}")
+
+
+def area_ids(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Returns the area ids of the given names, adding areas that do not exist yet.
+
+    Known names are answered from the in-memory area index. New areas are
+    inserted in the current transaction, and enter the index on the next
+    refresh after it commits.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - names (Iterable[str]): The area names.
+
+    Returns:
+    - Dict[str, int]: The area id per name.
+    """
+    names = set(names)
+    ids = {name: area_index.ids[name] for name in names if name in area_index.ids}
+    missing = names - ids.keys()
+    if missing:
+        area_index.refresh(db)
+        ids.update({name: area_index.ids[name] for name in missing if name in area_index.ids})
+        missing -= ids.keys()
+    if missing:
+        stmt = upsert(db, models.Area).on_conflict_do_nothing(index_elements=["name"])
+        db.execute(stmt, [{"name": name} for name in sorted(missing)])
+        area_index.mark_stale()
+        ids.update(db.execute(
+            select(models.Area.name, models.Area.id).where(models.Area.name.in_(missing))
+        ).all())
+    return ids
+
+
+def assign_area_ids(db: Session, rows: List[dict]):
+    """
+    Sets the `area_id` of bulk insert rows from their `area`.
+    """
+    ids = area_ids(db, {row["area"] for row in rows if row["area"] is not None})
+    for row in rows:
+        row["area_id"] = ids.get(row["area"])
+
+
+def search_areas(db: Session, query: str, limit: int) -> List[dict]:
+    """
+    Searches the areas by name prefix, then by trigram similarity.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - query (str): The partial or misspelled area name.
+    - limit (int): The maximum number of areas to return.
+
+    Returns:
+    - List[dict]: The matching areas, best first, shaped like `schemas.AreaMatch`.
+    """
+    area_index.refresh_if_stale(db)
+    return [
+        {"id": area_id, "name": name, "score": score}
+        for area_id, name, score in area_index.search(query, limit)
+    ]
+
+
+def bump_dispatch_counts(db: Session, deltas: Counter):
+    """
+    Adjusts the per-(status, area) dispatch counters within the current transaction.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - deltas (Counter): Count changes keyed by (status, area).
+    """
+    params = [
+        {"status": status, "area": area, "count": delta}
+        for (status, area), delta in deltas.items()
+        if delta and status is not None and area is not None
+    ]
+    if not params:
+        return
+    stmt = upsert(db, models.DispatchCount)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["status", "area"],
+        set_={"count": models.DispatchCount.count + stmt.excluded.count},
+    )
+    db.execute(stmt, params)
+
+
+def bump_daily_counts(db: Session, deltas: Counter):
+    """
+    Adjusts the per-(day, area, status) dispatch rollups within the current transaction.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - deltas (Counter): Count changes keyed by (day, area, status).
+    """
+    params = [
+        {"day": day, "area": area, "status": status, "count": delta}
+        for (day, area, status), delta in deltas.items()
+        if delta and day is not None and area is not None and status is not None
+    ]
+    if not params:
+        return
+    stmt = upsert(db, models.DispatchDailyCount)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "area", "status"],
+        set_={"count": models.DispatchDailyCount.count + stmt.excluded.count},
+    )
+    db.execute(stmt, params)
+
+
+# The driver statistic counting the transitions into each status
+DRIVER_STAT_COUNTS = {
+    models.DispatchStatusEnum.IN_PROGRESS: "accepted_count",
+    models.DispatchStatusEnum.STARTED: "started_count",
+    models.DispatchStatusEnum.COMPLETED: "completed_count",
+}
+DRIVER_STAT_SUMS = ("accepted_count", "started_count", "completed_count", "duration_total", "duration_count")
+
+
+def bump_driver_stats(db: Session, deltas: Dict[int, dict]):
+    """
+    Adds to the per-driver statistics within the current transaction.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - deltas (Dict[int, dict]): Per user ID, the amounts to add to the columns in
+      DRIVER_STAT_SUMS and the new `last_activity_at`.
+    """
+    params = []
+    for user_id, delta in deltas.items():
+        if user_id is None:
+            continue
+        row = {name: delta.get(name, 0) for name in DRIVER_STAT_SUMS}
+        row["user_id"] = user_id
+        row["avg_duration"] = (
+            row["duration_total"] / row["duration_count"] if row["duration_count"] else None
+        )
+        row["last_activity_at"] = delta.get("last_activity_at")
+        params.append(row)
+    if not params:
+        return
+    stats = models.DriverStats
+    stmt = upsert(db, stats)
+    durations = stats.duration_count + stmt.excluded.duration_count
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={
+            **{name: getattr(stats, name) + getattr(stmt.excluded, name) for name in DRIVER_STAT_SUMS},
+            "avg_duration": case(
+                (durations > 0, (stats.duration_total + stmt.excluded.duration_total) / durations),
+                else_=stats.avg_duration,
+            ),
+            "last_activity_at": func.coalesce(stmt.excluded.last_activity_at, stats.last_activity_at),
+        },
+    )
+    db.execute(stmt, params)
+
+
+def day_of(value: Optional[datetime]) -> Optional[date]:
+    return value.date() if value is not None else None
+
+
+def record_created(db: Session, rows: List[dict]):
+    """
+    Updates the derived tables for newly inserted dispatches and records their
+    "created" events, before commit.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - rows (List): The inserted dispatches, as `new_dispatch_values` dicts or
+      flushed `models.Dispatch` objects.
+    """
+    keys = [
+        (row["status"], row["area"], row["date"]) if isinstance(row, dict)
+        else (row.status, row.area, row.date)
+        for row in rows
+    ]
+    bump_dispatch_counts(db, Counter((status, area) for status, area, _ in keys))
+    bump_daily_counts(db, Counter((day_of(day), area, status) for status, area, day in keys))
+    events.record(db, [events.dispatch_event("created", row) for row in rows])
+
+
+def record_transition(
+        db: Session,
+        from_status: models.DispatchStatusEnum,
+        to_status: models.DispatchStatusEnum,
+        dispatches: List[models.Dispatch],
+):
+    """
+    Updates the derived tables for dispatches that changed status and records
+    their events, before commit.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - from_status (DispatchStatusEnum): The status the dispatches had.
+    - to_status (DispatchStatusEnum): The status the dispatches moved to.
+    - dispatches (List[models.Dispatch]): The updated dispatches.
+    """
+    deltas = Counter()
+    daily_deltas = Counter()
+    # Every transition leaves the dispatch owned by the driver who applied it
+    driver_deltas: Dict[int, Counter] = {}
+    now = datetime.utcnow()
+    for dispatch in dispatches:
+        deltas[(from_status, dispatch.area)] -= 1
+        deltas[(to_status, dispatch.area)] += 1
+        day = day_of(dispatch.date)
+        daily_deltas[(day, dispatch.area, from_status)] -= 1
+        daily_deltas[(day, dispatch.area, to_status)] += 1
+        driver = driver_deltas.setdefault(dispatch.owner_id, Counter())
+        if to_status in DRIVER_STAT_COUNTS:
+            driver[DRIVER_STAT_COUNTS[to_status]] += 1
+        if (to_status == models.DispatchStatusEnum.COMPLETED
+                and dispatch.start_time and dispatch.complete_time):
+            driver["duration_total"] += (dispatch.complete_time - dispatch.start_time).total_seconds()
+            driver["duration_count"] += 1
+    bump_dispatch_counts(db, deltas)
+    bump_daily_counts(db, daily_deltas)
+    bump_driver_stats(db, {
+        user_id: {**driver, "last_activity_at": now} for user_id, driver in driver_deltas.items()
+    })
+    name = events.EVENT_NAMES[to_status]
+    events.record(db, [events.dispatch_event(name, dispatch) for dispatch in dispatches])
+
+
+class DateRanges(NamedTuple):
+    """
+    Range filters on the dispatch and creation dates of dispatches.
+
+    Each range is half-open, from <= value < to, and either bound may be left
+    out. Both columns are indexed (`created_at` is also the partition key), so
+    the ranges can be combined with the other list filters.
+    """
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+    def __bool__(self) -> bool:
+        return any(value is not None for value in self)
+
+
+def count_dispatches(
+        db: Session,
+        status: Optional[str],
+        date: Optional[datetime],
+        area: Optional[str],
+        exact: bool = False,
+        ranges: Optional[DateRanges] = None,
+) -> int:
+    """
+    Returns the number of dispatches matching the filters of `get_filtered_dispatches`.
+
+    Status and area filters are answered from the dispatch counters. A date
+    filter or range, or `exact`, needs a COUNT(*) over the dispatches table,
+    whose result is cached for COUNT_CACHE_TTL seconds.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - status (Optional[str]): Optional filter for dispatch status.
+    - date (Optional[datetime]): Optional filter for dispatch date.
+    - area (Optional[str]): Optional filter for dispatch area.
+    - exact (bool): Count the dispatches table instead of using the counters.
+    - ranges (Optional[DateRanges]): Optional date range filters.
+
+    Returns:
+    - int: The number of matching dispatches.
+    """
+    if date is None and not ranges and not exact:
+        query = db.query(func.coalesce(func.sum(models.DispatchCount.count), 0))
+        if status:
+            query = query.filter(models.DispatchCount.status == status)
+        if area:
+            query = query.filter(models.DispatchCount.area == area)
+        return query.scalar()
+
+    key = ("filter", status, date, area, ranges or None)
+    total = cache.count_cache.get(key)
+    if total is None:
+        total = (
+            db.query(func.count(models.Dispatch.id))
+            .filter(*dispatch_filters(status, date, area, ranges))
+            .scalar()
+        )
+        cache.count_cache.set(key, total)
+    return total
+
+
+def get_daily_counts(
+        db: Session,
+        date_from: date,
+        date_to: date,
+        area: Optional[str] = None,
+        status: Optional[str] = None,
+) -> List[dict]:
+    """
+    Returns the dispatch rollups by day, area and status, from the rollup table only.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - date_from (date): First day to return.
+    - date_to (date): Last day to return (inclusive).
+    - area (Optional[str]): Optional filter for dispatch area.
+    - status (Optional[str]): Optional filter for dispatch status.
+
+    Returns:
+    - List[dict]: The non-zero counts, shaped like `schemas.DailyCount`, ordered
+      by day, area and status.
+    """
+    rollup = models.DispatchDailyCount
+    stmt = (
+        select(rollup.day, rollup.area, rollup.status, rollup.count)
+        .where(rollup.day >= date_from, rollup.day <= date_to, rollup.count != 0)
+        .order_by(rollup.day, rollup.area, rollup.status)
+    )
+    if area:
+        stmt = stmt.where(rollup.area == area)
+    if status:
+        stmt = stmt.where(rollup.status == status)
+    return [row._asdict() for row in db.execute(stmt)]
+
+
+LEADERBOARD_ORDERS = ("completed", "avg_duration")
+
+
+def driver_stats_columns() -> list:
+    """
+    Returns the columns of `schemas.DriverStats`, joining the username.
+    """
+    stats = models.DriverStats
+    return [
+        stats.user_id,
+        models.User.username,
+        stats.accepted_count,
+        stats.started_count,
+        stats.completed_count,
+        stats.avg_duration.label("avg_duration_seconds"),
+        stats.last_activity_at,
+    ]
+
+
+def get_driver_stats(db: Session, user_id: int) -> Optional[dict]:
+    """
+    Retrieves the performance statistics of a user, from the driver statistics only.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - user_id (int): The ID of the user.
+
+    Returns:
+    - Optional[dict]: The statistics, shaped like `schemas.DriverStats`, with zero
+      counts for a user who has not handled a dispatch yet, or None if the user
+      does not exist.
+    """
+    row = db.execute(
+        select(*driver_stats_columns())
+        .select_from(models.User)
+        .outerjoin(models.DriverStats, models.DriverStats.user_id == models.User.id)
+        .where(models.User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+    stats = row._asdict()
+    stats["user_id"] = user_id
+    for name in ("accepted_count", "started_count", "completed_count"):
+        stats[name] = stats[name] or 0
+    return stats
+
+
+def get_driver_leaderboard(db: Session, order: str, limit: int, min_completed: int = 1) -> List[dict]:
+    """
+    Ranks drivers by the number of dispatches they completed, most first, or by
+    their average delivery duration, fastest first.
+
+    Each order is read from its index on the driver statistics, so the cost
+    depends on `limit`, not on the number of drivers or dispatches.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - order (str): "completed" or "avg_duration".
+    - limit (int): Number of drivers to retrieve.
+    - min_completed (int): Leave out drivers with fewer completed dispatches.
+
+    Returns:
+    - List[dict]: The drivers in rank order, shaped like `schemas.DriverStats`.
+    """
+    stats = models.DriverStats
+    stmt = (
+        select(*driver_stats_columns())
+        .join(models.User, models.User.id == stats.user_id)
+        .where(stats.completed_count >= min_completed)
+    )
+    if order == "avg_duration":
+        stmt = stmt.where(stats.avg_duration.is_not(None)).order_by(stats.avg_duration, stats.user_id)
+    else:
+        # Both columns descending, so the index can be scanned backwards
+        stmt = stmt.order_by(stats.completed_count.desc(), stats.user_id.desc())
+    return [row._asdict() for row in db.execute(stmt.limit(limit))]
+
+
+def count_owned_dispatches(db: Session, user_id: int) -> int:
+    """
+    Returns the number of dispatches owned by a user, cached for COUNT_CACHE_TTL seconds.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - user_id (int): The ID of the owning user.
+
+    Returns:
+    - int: The number of dispatches owned by the user.
+    """
+    key = ("owner", user_id)
+    total = cache.count_cache.get(key)
+    if total is None:
+        total = (
+            db.query(func.count(models.Dispatch.id))
+            .filter(models.Dispatch.owner_id == user_id)
+            .scalar()
+        )
+        cache.count_cache.set(key, total)
+    return total
+
+
+# Columns written by the bulk insert paths, in COPY column order
+BULK_DISPATCH_COLUMNS = ["id", "area", "area_id", "created_at", "date", "description", "status", "owner_id"]
+
+
+def new_dispatch_values(area: str, created_at: datetime, user_id: int) -> dict:
+    """
+    Builds the column values of a new pending dispatch for the bulk insert paths.
+
+    COPY does not apply the model's Python-side defaults, so they are spelled out here.
+    `id` and `area_id` are filled in by the bulk insert paths (see `assign_dispatch_ids`
+    and `assign_area_ids`).
+
+    Parameters:
+    - area (str): The area of the dispatch.
+    - created_at (datetime): The timestamp when the dispatch is created.
+    - user_id (int): The ID of the user creating the dispatch.
+
+    Returns:
+    - dict: The column values keyed by BULK_DISPATCH_COLUMNS, except `id`.
+    """
+    return {
+        "area": area,
+        "area_id": None,
+        "created_at": created_at,
+        "date": created_at,
+        "description": "No description",
+        "status": models.DispatchStatusEnum.PENDING,
+        "owner_id": user_id,
+    }
+
+
+def assign_dispatch_ids(db: Session, rows: List[dict]):
+    """
+    Sets the `id` of bulk insert rows from the dispatches id sequence (PostgreSQL).
+
+    COPY cannot return the IDs the table would generate, so they are drawn
+    from the sequence beforehand and written explicitly.
+    """
+    ids = db.execute(
+        text("SELECT nextval(pg_get_serial_sequence('dispatches', 'id')) "
+             "FROM generate_series(1, :count)"),
+        {"count": len(rows)},
+    ).scalars().all()
+    for row, dispatch_id in zip(rows, sorted(ids)):
+        row["id"] = dispatch_id
+
+
+def copy_records(rows: List[dict]) -> List[tuple]:
+    """
+    Converts bulk insert rows into COPY records ordered by BULK_DISPATCH_COLUMNS.
+
+    The status enum is stored by name, so it is written as such.
+    """
+    return [
+        tuple(
+            row[column].name if column == "status" else row[column]
+            for column in BULK_DISPATCH_COLUMNS
+        )
+        for row in rows
+    ]
+
+
+def bulk_create_dispatches(db: Session, rows: List[dict]) -> int:
+    """
+    Inserts a batch of dispatches and commits them as one transaction.
+
+    On PostgreSQL (psycopg2) the batch is streamed with COPY; other backends
+    use a single executemany INSERT ... RETURNING. Either way the `id` of each
+    row is set, so its "created" event identifies the dispatch.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - rows (List[dict]): Column values built with `new_dispatch_values`.
+
+    Returns:
+    - int: The number of inserted dispatches.
+    """
+    if not rows:
+        return 0
+    assign_area_ids(db, rows)
+    connection = db.connection()
+    if connection.dialect.driver == "psycopg2":
+        assign_dispatch_ids(db, rows)
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(copy_records(rows))
+        buffer.seek(0)
+        with connection.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY dispatches ({', '.join(BULK_DISPATCH_COLUMNS)}) "
+                f"FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+    else:
+        ids = db.execute(
+            insert(models.Dispatch).returning(models.Dispatch.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        for row, dispatch_id in zip(rows, ids):
+            row["id"] = dispatch_id
+    record_created(db, rows)
+    db.commit()
+    return len(rows)
+
+
+def get_dispatch_by_id(db: Session, dispatch_id: int, include_archived: bool = False):
     """
     Retrieves a dispatch from the database by its ID.
 
     Parameters:
     - db (Session): The SQLAlchemy session object.
     - dispatch_id (int): The ID of the dispatch to retrieve.
+    - include_archived (bool): Fall back to the archive if the dispatch is not in
+      the dispatches table. Archived dispatches are returned as transient objects.
+
+    Returns:
+    - models.Dispatch | schemas.DispatchBase: The dispatch if found, else None. Hits
+      of the dispatch cache are returned as their cached DispatchBase.
+    """
+    cached = cache.dispatch_cache.get(dispatch_id)
+    if cached is not None:
+        return cached
+    dispatch = db.query(models.Dispatch).filter(models.Dispatch.id == dispatch_id).first()
+    if dispatch is not None:
+        cache.dispatch_cache.store(cache.dispatch_cache.snapshot([dispatch]))
+    elif include_archived:
+        rows = archive.load_rows(archive.find_entries(db, [dispatch_id]))
+        if rows:
+            return archive.to_dispatch(rows[0])
+    return dispatch
+
+
+def get_dispatch_version(db: Session, dispatch_id: int) -> Optional[int]:
+    """
+    Retrieves only the version of a dispatch, for conditional requests.
+
+    Answered from the dispatch cache when possible; otherwise the
+    ix_dispatches_id_version index covers the query, so it does not touch the
+    table.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - dispatch_id (int): The ID of the dispatch.
 
     Returns:
-    - models.Dispatch: The dispatch object if found, else None.
+    - Optional[int]: The version, or None if the dispatch is not in the table.
+    """
+    cached = cache.dispatch_cache.get(dispatch_id)
+    if cached is not None:
+        return cached.version
+    return db.execute(
+        select(models.Dispatch.version).where(models.Dispatch.id == dispatch_id)
+    ).scalar()
+
+
+def record_archived(db: Session, dispatches: List[models.Dispatch]):
+    """
+    Updates the derived tables for dispatches moved to the archive, before commit.
+
+    Archived dispatches leave the counters but stay in the daily rollups, which
+    describe the whole history.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - dispatches (List[models.Dispatch]): The archived dispatches.
+    """
+    bump_dispatch_counts(
+        db, Counter({key: -count for key, count in Counter(
+            (dispatch.status, dispatch.area) for dispatch in dispatches
+        ).items()})
+    )
+
+
+def archive_completed_dispatches(db: Session, cutoff: datetime, batch_size: int) -> int:
     """
-    return db.query(models.Dispatch).filter(models.Dispatch.id == dispatch_id).first()
+    Moves one batch of old completed dispatches to the Parquet archive.
+
+    The batch is written to its files, indexed in `archived_dispatches` and
+    deleted from `dispatches` in one transaction; the files are removed again
+    if the transaction fails.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - cutoff (datetime): Archive dispatches completed (or, without a completion
+      time, created) before this time.
+    - batch_size (int): Maximum number of dispatches to archive.
+
+    Returns:
+    - int: The number of archived dispatches; 0 when nothing is left to archive.
+    """
+    query = (
+        db.query(models.Dispatch)
+        .filter(
+            models.Dispatch.status == models.DispatchStatusEnum.COMPLETED,
+            func.coalesce(models.Dispatch.complete_time, models.Dispatch.created_at) < cutoff,
+        )
+        .order_by(models.Dispatch.id)
+        .limit(batch_size)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Let concurrent archive runs work on different batches
+        query = query.with_for_update(skip_locked=True)
+    dispatches = query.all()
+    if not dispatches:
+        db.rollback()
+        return 0
+
+    dispatch_ids = [dispatch.id for dispatch in dispatches]
+    entries = archive.write_batch(dispatches)
+    try:
+        db.execute(insert(models.ArchivedDispatch), entries)
+        db.execute(
+            delete(models.Dispatch).where(models.Dispatch.id.in_(dispatch_ids)),
+            execution_options={"synchronize_session": False},
+        )
+        record_archived(db, dispatches)
+        db.commit()
+    except Exception:
+        db.rollback()
+        archive.remove_files(entries)
+        raise
+    cache.dispatch_cache.invalidate(dispatch_ids)
+    db.expunge_all()
+    return len(dispatch_ids)
 
 
 def authenticate_user(db: Session, email: str, password: str):
@@ -135,9 +864,14 @@ def authenticate_user(db: Session, email: str, password: str):
     - models.User: The authenticated user object if credentials are valid, else None.
     """
     user = get_user_by_email(db, email)
-    if user and pwd_context.verify(password, user.hashed_password):
-        return user
-    return None
+    if not user:
+        return None
+    valid, new_hash = pwd_context.verify_and_update(password, user.hashed_password)
+    if not valid:
+        return None
+    if new_hash:
+        update_password_hash(db, user.id, new_hash)
+    return user
 
 
 def get_current_user(db: Session, token: str):
@@ -168,6 +902,8 @@ def get_filtered_dispatches(
         area: Optional[str],
         skip: int,
         limit: int,
+        after_id: Optional[int] = None,
+        ranges: Optional[DateRanges] = None,
 ):
     """
     Retrieves a list of dispatches from the database with optional filters and pagination.
@@ -179,38 +915,471 @@ def get_filtered_dispatches(
     - area (Optional[str]): Optional filter for dispatch area.
     - skip (int): Number of records to skip (for pagination).
     - limit (int): Number of records to retrieve.
+    - after_id (Optional[int]): Return rows after this ID instead of skipping.
+    - ranges (Optional[DateRanges]): Optional date range filters.
 
     Returns:
     - list[models.Dispatch]: A list of filtered dispatch objects.
     """
-    logger.debug("Starting get_filtered_dispatches with parameters:")
-    logger.debug(f"Status: {status}")
-    logger.debug(f"Date: {date}")
-    logger.debug(f"Area: {area}")
-    logger.debug(f"Skip: {skip}")
-    logger.debug(f"Limit: {limit}")
+    logger.debug(
+        "get_filtered_dispatches: status=%s date=%s area=%s skip=%s limit=%s after_id=%s ranges=%s",
+        status, date, area, skip, limit, after_id, ranges,
+    )
+
+    query = db.query(models.Dispatch).filter(*dispatch_filters(status, date, area, ranges))
+    query = paginate(query, skip, limit, after_id)
+
+    # Rendering the SQL and the result list is expensive, so only do it when it is logged
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("Constructed query: %s", query)
+
+    dispatches = query.all()
+
+    if debug:
+        logger.debug("Retrieved dispatches: %s", dispatches)
+
+    return dispatches
 
-    query = db.query(models.Dispatch)
 
+def dispatch_filters(
+        status: Optional[str],
+        date: Optional[datetime],
+        area: Optional[str],
+        ranges: Optional[DateRanges] = None,
+) -> list:
+    """
+    Builds the WHERE clauses for the filters accepted by `get_filtered_dispatches`.
+
+    Parameters:
+    - status (Optional[str]): Optional filter for dispatch status.
+    - date (Optional[datetime]): Optional filter for dispatch date.
+    - area (Optional[str]): Optional filter for dispatch area.
+    - ranges (Optional[DateRanges]): Optional date range filters.
+
+    Returns:
+    - list: The clauses for the filters that are set.
+    """
+    clauses = []
     if status:
-        logger.debug(f"Applying status filter: {status}")
-        query = query.filter(models.Dispatch.status == status)
+        clauses.append(models.Dispatch.status == status)
     if date:
-        logger.debug(f"Applying date filter: {date}")
-        query = query.filter(models.Dispatch.date == date)
+        clauses.append(models.Dispatch.date == date)
     if area:
-        logger.debug(f"Applying area filter: {area}")
-        query = query.filter(models.Dispatch.area == area)
+        # Compared on the integer key; an unknown name matches nothing
+        clauses.append(models.Dispatch.area_id == (
+            select(models.Area.id).where(models.Area.name == area).scalar_subquery()
+        ))
+    if ranges:
+        for column, start, end in (
+            (models.Dispatch.date, ranges.date_from, ranges.date_to),
+            (models.Dispatch.created_at, ranges.created_from, ranges.created_to),
+        ):
+            if start is not None:
+                clauses.append(column >= start)
+            if end is not None:
+                clauses.append(column < end)
+    return clauses
+
+
+def dispatch_row_columns() -> list:
+    """
+    Returns the columns of `schemas.DispatchBase`, with defaults for missing values
+    applied in SQL so the rows can be serialized as they come back.
+    """
+    now = datetime.utcnow()
+    return [
+        models.Dispatch.id,
+        func.coalesce(models.Dispatch.description, "No description").label("description"),
+        func.coalesce(models.Dispatch.date, now).label("date"),
+        models.Dispatch.area,
+        models.Dispatch.status,
+        models.Dispatch.start_time,
+        models.Dispatch.complete_time,
+        models.Dispatch.pod_image,
+        models.Dispatch.notes,
+        models.Dispatch.recipient_name,
+        func.coalesce(models.Dispatch.created_at, now).label("created_at"),
+        models.Dispatch.version,
+    ]
+
+
+def dispatch_rows(
+        db: Session, filters: list, skip: int, limit: int, after_id: Optional[int] = None
+) -> List[dict]:
+    """
+    Retrieves a page of dispatches as plain dicts instead of ORM objects.
+
+    This is the fast path of the list endpoints: only the API columns are
+    selected and no objects are added to the session's identity map.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - filters (list): WHERE clauses restricting the dispatches.
+    - skip (int): Number of records to skip (for pagination).
+    - limit (int): Number of records to retrieve.
+    - after_id (Optional[int]): Return rows after this ID instead of skipping.
 
-    # Log the query to be executed
-    logger.debug(f"Constructed query: {str(query)}")
+    Returns:
+    - List[dict]: The dispatches, shaped like `schemas.DispatchRow`.
+    """
+    stmt = paginate(select(*dispatch_row_columns()).where(*filters), skip, limit, after_id)
+    return [row._asdict() for row in db.execute(stmt)]
 
-    # Execute the query
-    dispatches = query.offset(skip).limit(limit).all()
 
-    logger.debug(f"Retrieved dispatches: {dispatches}")
+def get_dispatch_rows(
+        db: Session, skip: int, limit: int, after_id: Optional[int] = None
+) -> List[dict]:
+    """
+    Row fast path of `get_dispatches`; see `dispatch_rows`.
+    """
+    return dispatch_rows(db, [], skip, limit, after_id)
+
+
+def get_filtered_dispatch_rows(
+        db: Session,
+        status: Optional[str],
+        date: Optional[datetime],
+        area: Optional[str],
+        skip: int,
+        limit: int,
+        after_id: Optional[int] = None,
+        include_archived: bool = False,
+        ranges: Optional[DateRanges] = None,
+) -> List[dict]:
+    """
+    Row fast path of `get_filtered_dispatches`; see `dispatch_rows`.
+
+    With `include_archived`, archived dispatches matching the filters are merged
+    into the page in id order; see `get_filtered_dispatch_page`.
+    """
+    if not include_archived:
+        return dispatch_rows(db, dispatch_filters(status, date, area, ranges), skip, limit, after_id)
+    live, entries = get_filtered_dispatch_page(db, status, date, area, skip, limit, after_id, ranges)
+    return merge_archived_rows(live, archive.load_rows(entries))
+
+
+def get_filtered_dispatch_page(
+        db: Session,
+        status: Optional[str],
+        date: Optional[datetime],
+        area: Optional[str],
+        skip: int,
+        limit: int,
+        after_id: Optional[int] = None,
+        ranges: Optional[DateRanges] = None,
+) -> Tuple[List[dict], List[models.ArchivedDispatch]]:
+    """
+    Selects a page of filtered dispatches across the live table and the archive.
+
+    The first `skip + limit` matches after `after_id` are taken from both the
+    dispatches table and the archive index, and those falling on the requested
+    page are kept. Archived rows are not read here: pass the returned entries to
+    `archive.load_rows` and combine the results with `merge_archived_rows`.
+
+    The archive index has no creation dates, so only the `date_from` and
+    `date_to` ranges apply to archived dispatches.
+
+    Returns:
+    - Tuple[List[dict], List[models.ArchivedDispatch]]: The live rows of the page,
+      and the index entries of its archived dispatches.
+    """
+    window = skip + limit
+    ranges = ranges or DateRanges()
+    live = dispatch_rows(db, dispatch_filters(status, date, area, ranges), 0, window, after_id)
+    entries = archive.filter_entries(
+        db, status, date, area, window, after_id, ranges.date_from, ranges.date_to
+    )
+    page_ids = set(sorted([row["id"] for row in live] + [entry.id for entry in entries])[skip:window])
+    return (
+        [row for row in live if row["id"] in page_ids],
+        [entry for entry in entries if entry.id in page_ids],
+    )
+
+
+def search_dispatch_rows(
+        db: Session,
+        query: str,
+        status: Optional[str],
+        date: Optional[datetime],
+        area: Optional[str],
+        skip: int,
+        limit: int,
+        after: Optional[dict] = None,
+        ranges: Optional[DateRanges] = None,
+) -> Tuple[List[dict], Optional[dict]]:
+    """
+    Full-text searches the description, notes and recipient name of dispatches.
+
+    Matches are ranked best first, then by id, and paged by offset or, with
+    `after`, by seeking past the (score, id) position of the previous page's
+    last row. See `search` for the backends.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - query (str): The words to search for.
+    - status (Optional[str]): Optional filter for dispatch status.
+    - date (Optional[datetime]): Optional filter for dispatch date.
+    - area (Optional[str]): Optional filter for dispatch area.
+    - skip (int): Number of matches to skip (ignored with `after`).
+    - limit (int): Number of matches to retrieve.
+    - after (Optional[dict]): The position returned with the previous page.
+    - ranges (Optional[DateRanges]): Optional date range filters.
+
+    Returns:
+    - Tuple[List[dict], Optional[dict]]: The matching dispatches, shaped like
+      `schemas.DispatchRow`, and the position of the last one, if any.
+    """
+    matches = search.ranked_matches(
+        db.get_bind().dialect.name, query, dispatch_row_columns(),
+        dispatch_filters(status, date, area, ranges),
+    )
+    if matches is None:
+        return [], None
+    position = (after["score"], after["id"]) if after else None
+    rows = [row._asdict() for row in db.execute(search.ranked_page(matches, skip, limit, position))]
+    last = {"id": rows[-1]["id"], "score": rows[-1]["score"]} if rows else None
+    for row in rows:
+        del row["score"]
+    return rows, last
 
-    return dispatches
+
+def count_search_matches(
+        db: Session,
+        query: str,
+        status: Optional[str],
+        date: Optional[datetime],
+        area: Optional[str],
+        ranges: Optional[DateRanges] = None,
+) -> int:
+    """
+    Returns the number of dispatches matching `search_dispatch_rows`.
+
+    Broad queries can match millions of rows, so the result is cached for
+    COUNT_CACHE_TTL seconds.
+    """
+    key = ("search", query, status, date, area, ranges or None)
+    total = cache.count_cache.get(key)
+    if total is None:
+        matches = search.ranked_matches(
+            db.get_bind().dialect.name, query, [models.Dispatch.id],
+            dispatch_filters(status, date, area, ranges),
+        )
+        total = 0 if matches is None else db.execute(
+            select(func.count()).select_from(matches.subquery())
+        ).scalar()
+        cache.count_cache.set(key, total)
+    return total
+
+
+def merge_archived_rows(live: List[dict], archived: List[dict]) -> List[dict]:
+    """
+    Combines live rows with archived rows read by `archive.load_rows`, by id.
+
+    Archived rows are projected onto `schemas.DispatchRow` with the same
+    defaults as `dispatch_row_columns`.
+    """
+    now = datetime.utcnow()
+    projected = [
+        {
+            "id": row["id"],
+            "description": row.get("description") or "No description",
+            "date": row.get("date") or now,
+            "area": row.get("area"),
+            "status": row["status"],
+            "start_time": row.get("start_time"),
+            "complete_time": row.get("complete_time"),
+            "pod_image": row.get("pod_image"),
+            "notes": row.get("notes"),
+            "recipient_name": row.get("recipient_name"),
+            "created_at": row.get("created_at") or now,
+            "version": row.get("version") or 1,
+        }
+        for row in archived
+    ]
+    return sorted(live + projected, key=lambda row: row["id"])
+
+
+def get_accepted_dispatch_rows(
+        db: Session, user_id: int, skip: int, limit: int, after_id: Optional[int] = None
+) -> List[dict]:
+    """
+    Row fast path of `get_accepted_dispatches`; see `dispatch_rows`.
+    """
+    return dispatch_rows(
+        db, [models.Dispatch.owner_id == user_id], skip, limit, after_id
+    )
+
+
+class Transition(NamedTuple):
+    """
+    A dispatch status transition.
+
+    - allowed (FrozenSet[DispatchStatusEnum]): Statuses the transition can start from.
+    - target (DispatchStatusEnum): The status the dispatch moves to.
+    - require_owner (bool): Whether only the dispatch owner may apply it.
+    """
+    allowed: FrozenSet[models.DispatchStatusEnum]
+    target: models.DispatchStatusEnum
+    require_owner: bool
+
+
+DISPATCH_TRANSITIONS: Dict[str, Transition] = {
+    "accept": Transition(
+        frozenset({models.DispatchStatusEnum.PENDING}),
+        models.DispatchStatusEnum.IN_PROGRESS,
+        require_owner=False,
+    ),
+    "start": Transition(
+        frozenset({models.DispatchStatusEnum.IN_PROGRESS, models.DispatchStatusEnum.ACCEPTED}),
+        models.DispatchStatusEnum.STARTED,
+        require_owner=True,
+    ),
+    "complete": Transition(
+        frozenset({models.DispatchStatusEnum.STARTED}),
+        models.DispatchStatusEnum.COMPLETED,
+        require_owner=True,
+    ),
+}
+
+
+# Rounds of candidate selection per claim; only SQLite needs more than one
+CLAIM_ATTEMPTS = 5
+
+
+class DispatchConflictError(Exception):
+    """
+    Raised when a dispatch is not in a status the requested transition can start from.
+    """
+
+    def __init__(self, dispatch_id: int, action: str, status: models.DispatchStatusEnum):
+        self.dispatch_id = dispatch_id
+        self.action = action
+        self.status = status
+        super().__init__(f"Cannot {action} dispatch {dispatch_id} in status {status.value}")
+
+
+def apply_transition(
+        db: Session, action: str, dispatch_ids: List[int], user_id: int, values: dict
+) -> Tuple[List[models.Dispatch], Dict[int, str]]:
+    """
+    Applies a status transition with one guarded UPDATE ... RETURNING statement.
+
+    The status and ownership checks are part of the WHERE clause, so concurrent
+    transitions of the same dispatch cannot both succeed. Rows that were not
+    updated are classified with one extra SELECT, which only runs on failure.
+
+    The derived tables need the status each row moved from. Transitions with a
+    single source status know it; for the others it is read in the same
+    statement on PostgreSQL (from a locked CTE), and just before the UPDATE
+    elsewhere (SQLite serializes writers, so it cannot change in between).
+
+    After the commit the updated dispatches replace their entries in the
+    dispatch cache.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - action (str): The key of the transition in DISPATCH_TRANSITIONS.
+    - dispatch_ids (List[int]): The IDs of the dispatches to transition.
+    - user_id (int): The ID of the user applying the transition.
+    - values (dict): Extra column values to set along with the new status.
+
+    Returns:
+    - Tuple[List[models.Dispatch], Dict[int, str]]: The updated dispatches, and the
+      outcome per ID: "ok", "not_found", "not_authorized" or "conflict".
+    """
+    transition = DISPATCH_TRANSITIONS[action]
+    dispatch_ids = list(dict.fromkeys(dispatch_ids))
+    guards = [
+        models.Dispatch.id.in_(dispatch_ids),
+        models.Dispatch.status.in_(sorted(transition.allowed, key=lambda status: status.value)),
+    ]
+    if transition.require_owner:
+        guards.append(models.Dispatch.owner_id == user_id)
+    stmt = update(models.Dispatch).values(
+        status=transition.target, version=models.Dispatch.version + 1, **values
+    )
+    options = {"synchronize_session": False, "populate_existing": True}
+
+    if len(transition.allowed) == 1:
+        (from_status,) = transition.allowed
+        dispatches = db.execute(
+            stmt.where(*guards).returning(models.Dispatch), execution_options=options
+        ).scalars().all()
+        from_statuses = {dispatch.id: from_status for dispatch in dispatches}
+    elif db.get_bind().dialect.name == "postgresql":
+        previous = (
+            select(models.Dispatch.id, models.Dispatch.status)
+            .where(*guards).with_for_update().cte("previous")
+        )
+        rows = db.execute(
+            stmt.where(models.Dispatch.id == previous.c.id, *guards)
+            .returning(models.Dispatch, previous.c.status),
+            execution_options=options,
+        ).all()
+        dispatches = [dispatch for dispatch, _ in rows]
+        from_statuses = {dispatch.id: status for dispatch, status in rows}
+    else:
+        from_statuses = dict(db.execute(
+            select(models.Dispatch.id, models.Dispatch.status).where(*guards)
+        ).all())
+        dispatches = db.execute(
+            stmt.where(*guards).returning(models.Dispatch), execution_options=options
+        ).scalars().all() if from_statuses else []
+
+    by_source: Dict[models.DispatchStatusEnum, List[models.Dispatch]] = {}
+    for dispatch in dispatches:
+        by_source.setdefault(from_statuses[dispatch.id], []).append(dispatch)
+    for from_status, updated in by_source.items():
+        record_transition(db, from_status, transition.target, updated)
+
+    outcomes = {dispatch_id: "not_found" for dispatch_id in dispatch_ids}
+    outcomes.update({dispatch.id: "ok" for dispatch in dispatches})
+    missing = [dispatch_id for dispatch_id, outcome in outcomes.items() if outcome != "ok"]
+    if missing:
+        rows = db.execute(
+            select(models.Dispatch.id, models.Dispatch.owner_id, models.Dispatch.status)
+            .where(models.Dispatch.id.in_(missing))
+        )
+        for dispatch_id, owner_id, status in rows:
+            if transition.require_owner and owner_id != user_id:
+                outcomes[dispatch_id] = "not_authorized"
+            else:
+                outcomes[dispatch_id] = "conflict"
+    # Captured before the commit expires the returned rows
+    snapshots = cache.dispatch_cache.snapshot(dispatches)
+    db.commit()
+    cache.dispatch_cache.store(snapshots)
+    return dispatches, outcomes
+
+
+def transition_dispatch(
+        db: Session, action: str, dispatch_id: int, user_id: int, values: dict
+) -> Optional[models.Dispatch]:
+    """
+    Applies a status transition to a single dispatch.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - action (str): The key of the transition in DISPATCH_TRANSITIONS.
+    - dispatch_id (int): The ID of the dispatch to transition.
+    - user_id (int): The ID of the user applying the transition.
+    - values (dict): Extra column values to set along with the new status.
+
+    Returns:
+    - models.Dispatch: The updated dispatch object if successful, None if it was
+      not found or is owned by another user.
+
+    Raises:
+    - DispatchConflictError: If the dispatch is in a status the transition cannot start from.
+    """
+    dispatches, outcomes = apply_transition(db, action, [dispatch_id], user_id, values)
+    if outcomes[dispatch_id] == "conflict":
+        status = db.execute(
+            select(models.Dispatch.status).where(models.Dispatch.id == dispatch_id)
+        ).scalar_one()
+        raise DispatchConflictError(dispatch_id, action, status)
+    return dispatches[0] if dispatches else None
 
 
 def accept_dispatch(db: Session, dispatch_id: int, user_id: int):
@@ -224,21 +1393,16 @@ def accept_dispatch(db: Session, dispatch_id: int, user_id: int):
 
     Returns:
     - models.Dispatch: The updated dispatch object if successful, else None.
+
+    Raises:
+    - DispatchConflictError: If the dispatch is no longer pending.
     """
-    dispatch = (
-        db.query(models.Dispatch).filter(models.Dispatch.id == dispatch_id).first()
-    )
-    if not dispatch:
-        return None
-    dispatch.status = models.DispatchStatusEnum.IN_PROGRESS
-    # dispatch.start_time = datetime.utcnow()
-    dispatch.owner_id = user_id
-    db.commit()
-    db.refresh(dispatch)
-    return dispatch
+    return transition_dispatch(db, "accept", dispatch_id, user_id, {"owner_id": user_id})
 
 
-def get_accepted_dispatches(db: Session, user_id: int, skip: int, limit: int):
+def get_accepted_dispatches(
+        db: Session, user_id: int, skip: int, limit: int, after_id: Optional[int] = None
+):
     """
     Retrieves a list of accepted dispatches for a specific user with pagination.
 
@@ -247,21 +1411,19 @@ def get_accepted_dispatches(db: Session, user_id: int, skip: int, limit: int):
     - user_id (int): The ID of the user for whom to retrieve accepted dispatches.
     - skip (int): Number of records to skip (for pagination).
     - limit (int): Number of records to retrieve.
+    - after_id (Optional[int]): Return rows after this ID instead of skipping.
 
     Returns:
     - list[models.Dispatch]: A list of accepted dispatch objects.
     """
     logger.debug(
-        f"Querying accepted dispatches for user_id={user_id}, skip={skip}, limit={limit}"
-    )
-    dispatches = (
-        db.query(models.Dispatch)
-        .filter(models.Dispatch.owner_id == user_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
+        "Querying accepted dispatches for user_id=%s, skip=%s, limit=%s, after_id=%s",
+        user_id, skip, limit, after_id,
     )
-    logger.debug(f"Dispatches found: {dispatches}")
+    query = db.query(models.Dispatch).filter(models.Dispatch.owner_id == user_id)
+    dispatches = paginate(query, skip, limit, after_id).all()
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Dispatches found: %s", dispatches)
     return dispatches
 
 
@@ -276,19 +1438,13 @@ def start_dispatch(db: Session, dispatch_id: int, user_id: int):
 
     Returns:
     - models.Dispatch: The updated dispatch object if successful, else None.
+
+    Raises:
+    - DispatchConflictError: If the dispatch is not accepted.
     """
-    dispatch = (
-        db.query(models.Dispatch).filter(models.Dispatch.id == dispatch_id).first()
+    return transition_dispatch(
+        db, "start", dispatch_id, user_id, {"start_time": datetime.utcnow()}
     )
-    if not dispatch:
-        return None
-    if dispatch.owner_id != user_id:
-        return None
-    dispatch.status = models.DispatchStatusEnum.STARTED
-    dispatch.start_time = datetime.utcnow()
-    db.commit()
-    db.refresh(dispatch)
-    return dispatch
 
 
 def complete_dispatch(
@@ -312,18 +1468,143 @@ def complete_dispatch(
 
     Returns:
     - schemas.DispatchBase: The updated dispatch schema if successful, else None.
+
+    Raises:
+    - DispatchConflictError: If the dispatch is not started.
     """
-    dispatch = (
-        db.query(models.Dispatch).filter(models.Dispatch.id == dispatch_id).first()
+    return transition_dispatch(
+        db,
+        "complete",
+        dispatch_id,
+        user_id,
+        {
+            "complete_time": datetime.utcnow(),
+            "pod_image": pod_image,
+            "notes": notes,
+            "recipient_name": recipient_name,
+        },
     )
-    if not dispatch or dispatch.owner_id != user_id:
-        return None
 
-    dispatch.status = models.DispatchStatusEnum.COMPLETED
-    dispatch.complete_time = datetime.utcnow()
-    dispatch.pod_image = pod_image
-    dispatch.notes = notes
-    dispatch.recipient_name = recipient_name
-    db.commit()
-    db.refresh(dispatch)
-    return dispatch
+
+def bulk_accept_dispatches(db: Session, dispatch_ids: List[int], user_id: int):
+    """
+    Marks many dispatches as accepted by a user.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - dispatch_ids (List[int]): The IDs of the dispatches to be accepted.
+    - user_id (int): The ID of the user accepting the dispatches.
+
+    Returns:
+    - Dict[int, str]: The outcome per ID.
+    """
+    _, outcomes = apply_transition(
+        db, "accept", dispatch_ids, user_id, {"owner_id": user_id}
+    )
+    return outcomes
+
+
+def claim_dispatches(db: Session, area: str, count: int, user_id: int) -> List[models.Dispatch]:
+    """
+    Accepts the oldest pending dispatches of an area on behalf of a user.
+
+    Candidates are picked with `SELECT ... FOR UPDATE SKIP LOCKED` and accepted
+    through `apply_transition` in the same transaction. On PostgreSQL concurrent
+    claimers therefore lock disjoint rows instead of waiting for, or racing on,
+    the same ones. SQLite has no row locks, so callers serialize claims (see
+    `async_crud.claim_dispatches`); candidates that another process accepted in
+    the meantime fail the transition's status check and are replaced by the
+    next pending ones, for up to CLAIM_ATTEMPTS rounds.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - area (str): The area to claim dispatches in.
+    - count (int): The maximum number of dispatches to claim.
+    - user_id (int): The ID of the user claiming the dispatches.
+
+    Returns:
+    - List[models.Dispatch]: The claimed dispatches, oldest first; fewer than
+      `count` (possibly none) if the area has no more pending dispatches.
+    """
+    area_id = area_index.lookup(db, area)
+    if area_id is None:
+        return []
+    claimed: List[models.Dispatch] = []
+    for _ in range(CLAIM_ATTEMPTS):
+        wanted = count - len(claimed)
+        # Served by the partial ix_dispatches_pending_areaid_id index
+        candidate_ids = db.execute(
+            select(models.Dispatch.id)
+            .where(
+                models.Dispatch.status == models.DispatchStatusEnum.PENDING,
+                models.Dispatch.area_id == area_id,
+            )
+            .order_by(models.Dispatch.id)
+            .limit(wanted)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not candidate_ids:
+            db.rollback()
+            break
+        dispatches, _ = apply_transition(
+            db, "accept", candidate_ids, user_id, {"owner_id": user_id}
+        )
+        claimed.extend(dispatches)
+        if len(claimed) >= count or len(candidate_ids) < wanted:
+            break
+    return sorted(claimed, key=lambda dispatch: dispatch.id)
+
+
+def bulk_start_dispatches(db: Session, dispatch_ids: List[int], user_id: int):
+    """
+    Marks many dispatches owned by a user as started.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - dispatch_ids (List[int]): The IDs of the dispatches to be started.
+    - user_id (int): The ID of the user starting the dispatches.
+
+    Returns:
+    - Dict[int, str]: The outcome per ID.
+    """
+    _, outcomes = apply_transition(
+        db, "start", dispatch_ids, user_id, {"start_time": datetime.utcnow()}
+    )
+    return outcomes
+
+
+def bulk_complete_dispatches(
+        db: Session,
+        dispatch_ids: List[int],
+        user_id: int,
+        pod_image: str,
+        notes: str,
+        recipient_name: str,
+):
+    """
+    Marks many dispatches owned by a user as completed with the same details.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - dispatch_ids (List[int]): The IDs of the dispatches to be completed.
+    - user_id (int): The ID of the user completing the dispatches.
+    - pod_image (str): Proof of delivery image URL or data.
+    - notes (str): Additional notes for the dispatches.
+    - recipient_name (str): The name of the recipient.
+
+    Returns:
+    - Dict[int, str]: The outcome per ID.
+    """
+    _, outcomes = apply_transition(
+        db,
+        "complete",
+        dispatch_ids,
+        user_id,
+        {
+            "complete_time": datetime.utcnow(),
+            "pod_image": pod_image,
+            "notes": notes,
+            "recipient_name": recipient_name,
+        },
+    )
+    return outcomes
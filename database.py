@@ -1,5 +1,7 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -10,6 +12,36 @@ load_dotenv()
 # Retrieve the database URL from the environment variables
 SQLALCHEMY_DATABASE_URL = os.getenv("SQLALCHEMY_DATABASE_URL")
 
+# Async drivers used when no explicit ASYNC_SQLALCHEMY_DATABASE_URL is configured
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """
+    Derives the async driver URL from a synchronous database URL.
+
+    Parameters:
+    - url (str): A synchronous SQLAlchemy URL, e.g. postgresql://... or sqlite:///...
+
+    Returns:
+    - str: The same URL using asyncpg for PostgreSQL or aiosqlite for SQLite.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(
+        hide_password=False
+    )
+
+
+ASYNC_SQLALCHEMY_DATABASE_URL = os.getenv(
+    "ASYNC_SQLALCHEMY_DATABASE_URL"
+) or get_async_database_url(SQLALCHEMY_DATABASE_URL)
+
 
 def get_db():
     """
@@ -28,8 +60,40 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """
+    Provides an async database session for use in a FastAPI endpoint.
+
+    Queries made through this session do not block the event loop while they
+    wait on the database, so other requests keep being served.
+
+    Yields:
+    - AsyncSession: A SQLAlchemy async session object.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# SQLite gets NullPool (files) or StaticPool (in-memory) on the SQLAlchemy
+# versions requirements.txt allows, and those reject the queue pool sizes
+if make_url(ASYNC_SQLALCHEMY_DATABASE_URL).get_backend_name() == "sqlite":
+    ASYNC_POOL_OPTIONS = {}
+else:
+    ASYNC_POOL_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    }
+
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, **ASYNC_POOL_OPTIONS)
+
+# Objects are not expired on commit: reloading them lazily would need to await
+# outside of the session, which async sessions cannot do.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession
+)
+
 Base = declarative_base()
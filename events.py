@@ -0,0 +1,250 @@
+"""
+Dispatch status events for the push endpoints.
+
+The crud write paths record an event for every dispatch they create, accept,
+start or complete, and the events are fanned out to the subscribers of
+`GET /dispatches/events` (Server-Sent Events) and `/dispatches/ws` (WebSocket)
+once the transaction commits:
+
+- On PostgreSQL the events are sent with one `pg_notify` batch just before
+  the transaction commits, so they are delivered on commit, dropped on
+  rollback, and reach every worker (and writes made by other processes, such
+  as the bulk loaders). Each worker LISTENs on the channel through `listen`
+  and feeds its local broadcaster.
+- On other backends, events are kept on the session until it commits and then
+  published to the broadcaster of the process that made the write.
+
+Every subscriber has a bounded queue of EVENT_QUEUE_SIZE events. A subscriber
+that falls that far behind is sent an `overflow` event and disconnected, and
+is expected to re-read the dispatches it cares about before subscribing again.
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from typing import List, Optional, Set
+
+from sqlalchemy import event as sa_event, text
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "dispatch_events"
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "10000"))
+# Bytes per NOTIFY payload, which PostgreSQL limits to less than 8000
+NOTIFY_MAX_BYTES = 7900
+PENDING_KEY = "pending_dispatch_events"
+EVENT_NAMES = {
+    models.DispatchStatusEnum.PENDING: "created",
+    models.DispatchStatusEnum.IN_PROGRESS: "accepted",
+    models.DispatchStatusEnum.STARTED: "started",
+    models.DispatchStatusEnum.COMPLETED: "completed",
+}
+
+
+def dispatch_event(name: str, dispatch) -> dict:
+    """
+    Builds the event for a dispatch, given as an ORM object or a row dict.
+    """
+    get = dispatch.get if isinstance(dispatch, dict) else lambda key: getattr(dispatch, key, None)
+    status = get("status")
+    return {
+        "event": name,
+        "id": get("id"),
+        "area": get("area"),
+        "status": status.value if isinstance(status, models.DispatchStatusEnum) else status,
+        "owner_id": get("owner_id"),
+        "version": get("version") or 1,
+        "at": datetime.utcnow().isoformat(),
+    }
+
+
+class Subscription:
+    """
+    A subscriber's filters and bounded queue of pending events.
+    """
+
+    def __init__(self, area: Optional[str], status: Optional[str], owner_id: Optional[int]):
+        self.area = area
+        self.status = status
+        self.owner_id = owner_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.overflowed = False
+
+    def matches(self, event: dict) -> bool:
+        return (
+            (self.area is None or event["area"] == self.area)
+            and (self.status is None or event["status"] == self.status)
+            and (self.owner_id is None or event["owner_id"] == self.owner_id)
+        )
+
+    async def next(self) -> dict:
+        """
+        Waits for the next event; an `overflow` event once the queue overflowed.
+        """
+        if self.overflowed:
+            return {"event": "overflow"}
+        event = await self.queue.get()
+        return {"event": "overflow"} if self.overflowed else event
+
+
+class Broadcaster:
+    """
+    In-process fan-out of dispatch events to the subscriptions of this worker.
+
+    `publish` may be called from any thread; delivery always happens on the
+    event loop the subscriptions were created on.
+    """
+
+    def __init__(self):
+        self.subscriptions: Set[Subscription] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(
+            self, area: Optional[str] = None, status: Optional[str] = None, owner_id: Optional[int] = None
+    ) -> Subscription:
+        self.loop = asyncio.get_running_loop()
+        subscription = Subscription(area, status, owner_id)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+
+    def publish(self, events: List[dict]):
+        """
+        Queues events for the matching subscriptions.
+        """
+        if not self.subscriptions or self.loop is None or self.loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self.deliver(events)
+        else:
+            self.loop.call_soon_threadsafe(self.deliver, events)
+
+    def deliver(self, events: List[dict]):
+        for subscription in list(self.subscriptions):
+            if subscription.overflowed:
+                continue
+            for event in events:
+                if not subscription.matches(event):
+                    continue
+                try:
+                    subscription.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    # Drop the backlog and wake the consumer up to disconnect
+                    subscription.overflowed = True
+                    while not subscription.queue.empty():
+                        subscription.queue.get_nowait()
+                    subscription.queue.put_nowait({"event": "overflow"})
+                    break
+
+
+broadcaster = Broadcaster()
+
+
+def notify_payloads(events: List[dict]) -> List[str]:
+    """
+    Serializes events into JSON arrays of at most NOTIFY_MAX_BYTES bytes each.
+
+    An event too large for a payload of its own is sent without its area, the
+    only field of unbounded length.
+    """
+    payloads: List[str] = []
+    batch: List[str] = []
+    size = 2
+    for event in events:
+        encoded = json.dumps(event, separators=(",", ":"))
+        if len(encoded) + 2 > NOTIFY_MAX_BYTES:
+            encoded = json.dumps({**event, "area": None}, separators=(",", ":"))
+        if batch and size + 1 + len(encoded) > NOTIFY_MAX_BYTES:
+            payloads.append(f"[{','.join(batch)}]")
+            batch, size = [], 2
+        size += len(encoded) + (1 if batch else 0)
+        batch.append(encoded)
+    if batch:
+        payloads.append(f"[{','.join(batch)}]")
+    return payloads
+
+
+def record(db: Session, events: List[dict]):
+    """
+    Records events of the current transaction, to be delivered once it commits.
+
+    Events without a dispatch ID are left out. The events are kept on the
+    session; on PostgreSQL they are sent in one `pg_notify` batch just before
+    the commit, and on other backends they are published after it.
+
+    Parameters:
+    - db (Session): The session whose transaction made the changes.
+    - events (List[dict]): Events built with `dispatch_event`.
+    """
+    events = [event for event in events if event["id"] is not None]
+    if events:
+        db.info.setdefault(PENDING_KEY, []).extend(events)
+
+
+@sa_event.listens_for(Session, "before_commit")
+def _notify_pending(session: Session):
+    if not session.info.get(PENDING_KEY):
+        return
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    # Delivered to every worker (this one included) through `listen`.
+    events = session.info.pop(PENDING_KEY)
+    session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        [{"channel": CHANNEL, "payload": payload} for payload in notify_payloads(events)],
+    )
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session):
+    events = session.info.pop(PENDING_KEY, None)
+    if events:
+        broadcaster.publish(events)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session):
+    session.info.pop(PENDING_KEY, None)
+
+
+async def listen(async_engine, retry_delay: float = 5.0):
+    """
+    Feeds the NOTIFY events of all workers into this worker's broadcaster.
+
+    Runs until cancelled, reconnecting after connection failures. Only
+    PostgreSQL with the asyncpg driver is supported; on other backends this
+    returns immediately, as events are published in-process.
+    """
+    if async_engine.dialect.name != "postgresql":
+        return
+    if async_engine.dialect.driver != "asyncpg":
+        logger.warning("Dispatch events need asyncpg to LISTEN; other workers' events are not pushed")
+        return
+
+    def on_notify(connection, pid, channel, payload):
+        broadcaster.publish(json.loads(payload))
+
+    while True:
+        try:
+            async with async_engine.connect() as conn:
+                raw = await conn.get_raw_connection()
+                await raw.driver_connection.add_listener(CHANNEL, on_notify)
+                logger.info("Listening for dispatch events on %s", CHANNEL)
+                # The connection stays checked out; asyncpg invokes the callback
+                while not raw.driver_connection.is_closed():
+                    await asyncio.sleep(retry_delay)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Dispatch event listener failed; reconnecting")
+        await asyncio.sleep(retry_delay)
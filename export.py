@@ -0,0 +1,173 @@
+"""
+Streaming dispatch export to NDJSON or CSV.
+
+Used by the `GET /dispatches/export` endpoint and as a command line tool:
+
+    python export.py --status completed --area north > completed.ndjson
+    python export.py --format csv -o dispatches.csv
+
+Rows are read through a server-side cursor in batches of `EXPORT_YIELD_PER`,
+so memory use stays flat regardless of how many dispatches match.
+"""
+import argparse
+import csv
+import enum
+import io
+import json
+import os
+import sys
+from datetime import datetime
+from typing import AsyncIterator, Iterator, Optional, Sequence
+
+from sqlalchemy import select
+
+import crud
+import models
+import schemas
+from database import AsyncSessionLocal, SessionLocal
+
+FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+# Exported columns, in the order of the dispatch API representation
+EXPORT_COLUMNS = list(schemas.DispatchBase.model_fields)
+EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "1000"))
+
+
+def export_query(
+        status: Optional[str],
+        date: Optional[datetime],
+        area: Optional[str],
+        ranges: Optional[crud.DateRanges] = None,
+):
+    """
+    Builds the export SELECT for the given filters.
+
+    Only the exported columns are selected, as plain rows rather than ORM
+    objects, and `yield_per` makes the driver use a server-side cursor.
+    """
+    columns = [getattr(models.Dispatch, name) for name in EXPORT_COLUMNS]
+    return (
+        select(*columns)
+        .where(*crud.dispatch_filters(status, date, area, ranges))
+        .order_by(models.Dispatch.id)
+        .execution_options(yield_per=EXPORT_YIELD_PER)
+    )
+
+
+def encode_value(value):
+    """
+    Converts a column value to its JSON/CSV representation.
+    """
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def header(fmt: str) -> str:
+    """
+    Returns the text written before the first row: the CSV header line, if any.
+    """
+    if fmt == "csv":
+        return format_rows([EXPORT_COLUMNS], fmt)
+    return ""
+
+
+def format_rows(rows: Sequence[Sequence], fmt: str) -> str:
+    """
+    Formats a batch of rows as NDJSON or CSV text.
+    """
+    if fmt == "ndjson":
+        return "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, map(encode_value, row)))) + "\n"
+            for row in rows
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows([encode_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def stream_export(
+        status: Optional[str],
+        date: Optional[datetime],
+        area: Optional[str],
+        fmt: str,
+        ranges: Optional[crud.DateRanges] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Streams every matching dispatch as encoded NDJSON or CSV chunks.
+
+    The generator opens its own session: the response body is produced after the
+    endpoint returns, when request-scoped dependencies have already been closed.
+
+    Parameters:
+    - status (Optional[str]): Optional filter for dispatch status.
+    - date (Optional[datetime]): Optional filter for dispatch date.
+    - area (Optional[str]): Optional filter for dispatch area.
+    - fmt (str): The output format, "ndjson" or "csv".
+    - ranges (Optional[DateRanges]): Optional date range filters.
+
+    Yields:
+    - bytes: One chunk per batch of `EXPORT_YIELD_PER` rows.
+    """
+    yield header(fmt).encode()
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(export_query(status, date, area, ranges))
+        async for rows in result.partitions():
+            yield format_rows(rows, fmt).encode()
+
+
+def export_lines(
+        db,
+        status: Optional[str],
+        date: Optional[datetime],
+        area: Optional[str],
+        fmt: str,
+        ranges: Optional[crud.DateRanges] = None,
+) -> Iterator[str]:
+    """
+    Yields every matching dispatch as NDJSON or CSV text, one chunk per batch.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - status (Optional[str]): Optional filter for dispatch status.
+    - date (Optional[datetime]): Optional filter for dispatch date.
+    - area (Optional[str]): Optional filter for dispatch area.
+    - fmt (str): The output format, "ndjson" or "csv".
+    - ranges (Optional[DateRanges]): Optional date range filters.
+    """
+    yield header(fmt)
+    for rows in db.execute(export_query(status, date, area, ranges)).partitions():
+        yield format_rows(rows, fmt)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Export dispatches as NDJSON or CSV.")
+    arg_parser.add_argument("--status", help="Only export dispatches with this status")
+    arg_parser.add_argument("--date", type=datetime.fromisoformat, help="Only export dispatches for this date")
+    arg_parser.add_argument("--area", help="Only export dispatches in this area")
+    arg_parser.add_argument("--date-from", type=datetime.fromisoformat, help="Only export dispatches dated on or after this")
+    arg_parser.add_argument("--date-to", type=datetime.fromisoformat, help="Only export dispatches dated before this")
+    arg_parser.add_argument("--created-from", type=datetime.fromisoformat, help="Only export dispatches created on or after this")
+    arg_parser.add_argument("--created-to", type=datetime.fromisoformat, help="Only export dispatches created before this")
+    arg_parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    arg_parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = arg_parser.parse_args(argv)
+
+    ranges = crud.DateRanges(args.date_from, args.date_to, args.created_from, args.created_to)
+    db = SessionLocal()
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        for chunk in export_lines(db, args.status, args.date, args.area, args.format, ranges):
+            out.write(chunk)
+    finally:
+        db.close()
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""
+Synthetic users and dispatches for load testing.
+
+Rows are generated column-wise with numpy, chunk by chunk, and written with
+COPY on PostgreSQL (executemany on other backends), so tens of millions of
+dispatches load in minutes. The same seed and `--end` always produce the same data.
+
+    python generate_data.py --users 10000 --dispatches 10000000 --seed 1
+    python generate_data.py --users 500 --dispatches 100000 --days 30 --areas 20
+
+Distributions:
+- owners and areas follow a Zipf-like skew (`--owner-skew`, `--area-skew`);
+- `created_at` is spread evenly over the `--days` days before `--end` and
+  increases with the id, and `date` is its calendar day;
+- older dispatches are mostly completed, while those created in the last
+  `--active-days` days are mostly still pending or underway;
+- started dispatches get a `start_time` a while after creation, and completed
+  ones a `complete_time`, recipient and notes.
+
+All generated users share the password given by `--password`.
+"""
+import argparse
+import io
+import sys
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+import crud
+import models
+import rollups
+from database import SessionLocal, engine
+from passwords import pwd_context
+
+CHUNK_SIZE = 200_000
+DISPATCH_COLUMNS = [
+    "area", "area_id", "created_at", "date", "description", "status", "start_time",
+    "complete_time", "pod_image", "notes", "recipient_name", "owner_id",
+]
+STATUSES = list(models.DispatchStatusEnum)
+STATUS_NAMES = np.array([status.name for status in STATUSES])
+# Status mix by age, in DispatchStatusEnum order:
+# in_progress, pending, accepted, started, completed
+SETTLED_STATUS_WEIGHTS = [0.02, 0.05, 0.01, 0.02, 0.90]
+ACTIVE_STATUS_WEIGHTS = [0.20, 0.45, 0.05, 0.20, 0.10]
+STARTED = STATUSES.index(models.DispatchStatusEnum.STARTED)
+COMPLETED = STATUSES.index(models.DispatchStatusEnum.COMPLETED)
+MICROSECONDS_PER_MINUTE = 60_000_000
+
+
+def zipf_weights(n: int, skew: float, rng: np.random.Generator) -> np.ndarray:
+    """
+    Returns Zipf-like probabilities for `n` items, in random order so that the
+    heaviest items are not simply the lowest ids.
+    """
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return rng.permutation(weights / weights.sum())
+
+
+def format_timestamps(values: np.ndarray, sep: str) -> np.ndarray:
+    """
+    Formats datetime64 values as strings, with None for NaT.
+    """
+    text = np.datetime_as_string(values, unit="us").astype(object)
+    if sep != "T":
+        text = np.char.replace(text.astype(str), "T", sep).astype(object)
+    text[np.isnat(values)] = None
+    return text
+
+
+def generate_users(db, count: int, prefix: str, password: str, copy: bool) -> np.ndarray:
+    """
+    Inserts `count` users and returns their ids.
+    """
+    hashed_password = pwd_context.hash(password)
+    usernames = [f"{prefix}{i}" for i in range(count)]
+    connection = db.connection()
+    if copy:
+        buffer = io.StringIO("".join(
+            f"{name},{name}@example.com,{hashed_password},t\n" for name in usernames
+        ))
+        with connection.connection.cursor() as cursor:
+            cursor.copy_expert(
+                "COPY users (username, email, hashed_password, is_active) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+    else:
+        connection.exec_driver_sql(
+            "INSERT INTO users (username, email, hashed_password, is_active) VALUES (?, ?, ?, 1)",
+            [(name, f"{name}@example.com", hashed_password) for name in usernames],
+        )
+    db.commit()
+    ids = db.query(models.User.id).filter(models.User.username.like(f"{prefix}%")).all()
+    return np.array(sorted(user_id for (user_id,) in ids), dtype=np.int64)
+
+
+def generate_chunk(rng, size: int, window_start: int, window: int, args, area_p, user_ids, owner_p, now_us):
+    """
+    Generates one chunk of dispatch columns.
+
+    Timestamps are int64 microseconds since the epoch, uniform within
+    [window_start, window_start + window) and sorted, so ids follow time.
+    """
+    created = np.sort(rng.integers(window_start, window_start + window, size=size))
+    active = created >= now_us - args.active_days * 24 * 60 * MICROSECONDS_PER_MINUTE
+    draws = rng.random(size)
+    status = np.where(
+        active,
+        np.searchsorted(np.cumsum(ACTIVE_STATUS_WEIGHTS), draws, side="right"),
+        np.searchsorted(np.cumsum(SETTLED_STATUS_WEIGHTS), draws, side="right"),
+    ).clip(max=len(STATUSES) - 1)
+
+    # Started ~1.5h after creation on average; completed ~40 min after starting
+    started = (status == STARTED) | (status == COMPLETED)
+    completed = status == COMPLETED
+    start_delay = (rng.exponential(90, size) * MICROSECONDS_PER_MINUTE).astype(np.int64)
+    complete_delay = (rng.lognormal(np.log(40), 0.5, size) * MICROSECONDS_PER_MINUTE).astype(np.int64)
+    start_time = np.where(started, created + start_delay, np.iinfo(np.int64).min)
+    complete_time = np.where(completed, start_time + complete_delay, np.iinfo(np.int64).min)
+
+    created_at = created.astype("datetime64[us]")
+    return {
+        "area": rng.choice(args.areas, size=size, p=area_p),
+        "created_at": created_at,
+        "date": created_at.astype("datetime64[D]").astype("datetime64[us]"),
+        "status": status,
+        "start_time": start_time.astype("datetime64[us]"),
+        "complete_time": complete_time.astype("datetime64[us]"),
+        "completed": completed,
+        "recipient": rng.integers(0, 100_000, size=size),
+        "owner_id": rng.choice(user_ids, size=size, p=owner_p),
+    }
+
+
+def chunk_records(chunk: dict, sep: str, area_ids: np.ndarray) -> list:
+    """
+    Converts generated columns into per-row values ordered by DISPATCH_COLUMNS.
+
+    `area_ids` maps the generated area numbers to the ids of their `areas` rows.
+    """
+    size = len(chunk["status"])
+    completed = chunk["completed"]
+    notes = np.where(completed, "Delivered", None)
+    recipient = np.char.add("Recipient ", chunk["recipient"].astype(str)).astype(object)
+    recipient[~completed] = None
+    columns = [
+        np.char.add("area-", chunk["area"].astype(str)).tolist(),
+        area_ids[chunk["area"]].tolist(),
+        format_timestamps(chunk["created_at"], sep).tolist(),
+        format_timestamps(chunk["date"], sep).tolist(),
+        ["No description"] * size,
+        STATUS_NAMES[chunk["status"]].tolist(),
+        format_timestamps(chunk["start_time"], sep).tolist(),
+        format_timestamps(chunk["complete_time"], sep).tolist(),
+        [None] * size,
+        notes.tolist(),
+        recipient.tolist(),
+        chunk["owner_id"].tolist(),
+    ]
+    return list(zip(*columns))
+
+
+def chunk_counts(chunk: dict) -> Counter:
+    """
+    Aggregates a chunk into dispatch counter deltas keyed by (status, area).
+    """
+    pairs, counts = np.unique(
+        np.stack([chunk["status"], chunk["area"]]), axis=1, return_counts=True
+    )
+    return Counter({
+        (STATUSES[status], f"area-{area}"): int(count)
+        for (status, area), count in zip(pairs.T.tolist(), counts.tolist())
+    })
+
+
+def chunk_daily_counts(chunk: dict) -> Counter:
+    """
+    Aggregates a chunk into daily rollup deltas keyed by (day, area, status).
+    """
+    days = chunk["date"].astype("datetime64[D]").astype(np.int64)
+    keys, counts = np.unique(
+        np.stack([days, chunk["area"], chunk["status"]]), axis=1, return_counts=True
+    )
+    epoch = date(1970, 1, 1)
+    return Counter({
+        (epoch + timedelta(days=day), f"area-{area}", STATUSES[status]): int(count)
+        for (day, area, status), count in zip(keys.T.tolist(), counts.tolist())
+    })
+
+
+def write_chunk(db, records: list, copy: bool):
+    connection = db.connection()
+    if copy:
+        buffer = io.StringIO("".join(
+            ",".join("" if value is None else str(value) for value in record) + "\n"
+            for record in records
+        ))
+        with connection.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY dispatches ({', '.join(DISPATCH_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+    else:
+        placeholders = ", ".join("?" for _ in DISPATCH_COLUMNS)
+        connection.exec_driver_sql(
+            f"INSERT INTO dispatches ({', '.join(DISPATCH_COLUMNS)}) VALUES ({placeholders})",
+            records,
+        )
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Generate synthetic users and dispatches.")
+    arg_parser.add_argument("--users", type=int, default=1000, help="Users to create")
+    arg_parser.add_argument("--dispatches", type=int, default=100_000, help="Dispatches to create")
+    arg_parser.add_argument("--areas", type=int, default=50, help="Distinct areas")
+    arg_parser.add_argument("--days", type=int, default=365, help="Days of history to spread dispatches over")
+    arg_parser.add_argument("--active-days", type=float, default=2, help="Age under which dispatches are mostly open")
+    arg_parser.add_argument("--owner-skew", type=float, default=1.0, help="Zipf exponent of dispatches per user")
+    arg_parser.add_argument("--area-skew", type=float, default=0.8, help="Zipf exponent of dispatches per area")
+    arg_parser.add_argument("--user-prefix", default="loadtest-", help="Prefix of generated usernames")
+    arg_parser.add_argument("--password", default="loadtest", help="Password of every generated user")
+    arg_parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    arg_parser.add_argument("--end", type=datetime.fromisoformat,
+                            default=datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0),
+                            help="End of the generated history (default: today 00:00 UTC)")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args(argv)
+    if args.users < 1:
+        arg_parser.error("--users must be at least 1")
+
+    models.Base.metadata.create_all(bind=engine)
+    rng = np.random.default_rng(args.seed)
+    copy = engine.dialect.driver == "psycopg2"
+    sep = "T" if copy else " "  # SQLite stores SQLAlchemy datetimes with a space
+    started = time.perf_counter()
+
+    db = SessionLocal()
+    try:
+        user_ids = generate_users(db, args.users, args.user_prefix, args.password, copy)
+        print(f"users: {len(user_ids)} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        names = [f"area-{area}" for area in range(args.areas)]
+        ids = crud.area_ids(db, names)
+        db.commit()
+        area_ids = np.array([ids[name] for name in names], dtype=np.int64)
+        area_p = zipf_weights(args.areas, args.area_skew, rng)
+        owner_p = zipf_weights(len(user_ids), args.owner_skew, rng)
+        now_us = (args.end - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+        span = args.days * 24 * 60 * MICROSECONDS_PER_MINUTE
+        chunks = max(1, -(-args.dispatches // args.chunk_size))
+        window = span // chunks
+        written = 0
+        for index in range(chunks):
+            size = min(args.chunk_size, args.dispatches - written)
+            chunk = generate_chunk(
+                rng, size, now_us - span + index * window, window, args,
+                area_p, user_ids, owner_p, now_us,
+            )
+            write_chunk(db, chunk_records(chunk, sep, area_ids), copy)
+            crud.bump_dispatch_counts(db, chunk_counts(chunk))
+            crud.bump_daily_counts(db, chunk_daily_counts(chunk))
+            db.commit()
+            written += size
+            elapsed = time.perf_counter() - started
+            print(f"dispatches: {written}/{args.dispatches} ({written / elapsed:,.0f} rows/s)",
+                  file=sys.stderr)
+
+        # Driver statistics need durations per owner; one pass once everything is loaded
+        drivers = rollups.rebuild_driver_stats(db.connection())
+        db.commit()
+        print(f"driver stats: {drivers} drivers", file=sys.stderr)
+
+        db.connection().exec_driver_sql("ANALYZE")
+        db.commit()
+    finally:
+        db.close()
+    print(f"users={len(user_ids)} dispatches={written} seconds={time.perf_counter() - started:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+"""
+Bulk dispatch ingest from NDJSON or CSV.
+
+Used by the `POST /dispatches/bulk` endpoint and as a command line tool:
+
+    python ingest.py dispatches.ndjson --owner-id 1
+    cat dispatches.csv | python ingest.py - --format csv --owner-id 1
+"""
+import argparse
+import csv
+import logging
+import sys
+from datetime import datetime
+from typing import AsyncIterable, Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+import async_crud
+import crud
+import schemas
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("ndjson", "csv")
+BATCH_SIZE = 1000
+# Per-row errors beyond this many are counted but not listed in the result
+MAX_REPORTED_ERRORS = 1000
+# Longer lines (and CSV rows) are rejected without being buffered in full
+MAX_LINE_BYTES = 1024 * 1024
+
+
+def quote_open(text: str) -> bool:
+    """
+    Returns whether CSV text ends inside a quoted field, i.e. its row continues
+    on the next line.
+    """
+    try:
+        next(csv.reader([text], strict=True))
+    except csv.Error as e:
+        return str(e) == "unexpected end of data"
+    return False
+
+
+class RowParser:
+    """
+    Parses NDJSON or CSV lines into `schemas.DispatchCreate` objects.
+
+    For CSV the first non-empty line is the header naming the columns, and a
+    quoted field may span several lines (see `assemble`).
+    """
+
+    def __init__(self, fmt: str):
+        """
+        Initializes the parser.
+
+        Parameters:
+        - fmt (str): The input format, "ndjson" or "csv".
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format {fmt!r}")
+        self.fmt = fmt
+        self.header: Optional[List[str]] = None
+        # The lines of a CSV row whose quoted field is still open
+        self.pending: List[str] = []
+        self.pending_size = 0
+        # The line the current row starts on
+        self.row_line = 0
+
+    def assemble(self, line_no: int, line: str) -> Optional[str]:
+        """
+        Joins the lines of a CSV row with a quoted field spanning lines.
+
+        Returns:
+        - str: The complete row, starting on line `row_line`, or None while the
+          row continues on the next line.
+
+        Raises:
+        - ValueError: If the row grows beyond MAX_LINE_BYTES.
+        """
+        if not self.pending:
+            self.row_line = line_no
+            if self.fmt != "csv" or '"' not in line or not quote_open(line):
+                return line
+        # The lines so far end inside a quoted field, so this one starts in it
+        elif not quote_open('"\n' + line):
+            row = "\n".join(self.pending + [line])
+            self.pending, self.pending_size = [], 0
+            return row
+        self.pending.append(line)
+        self.pending_size += len(line) + 1
+        if self.pending_size > MAX_LINE_BYTES:
+            self.pending, self.pending_size = [], 0
+            raise ValueError(f"row longer than {MAX_LINE_BYTES} bytes")
+        return None
+
+    def finish(self) -> Optional[int]:
+        """
+        Ends the input.
+
+        Returns:
+        - int: The line of a CSV row left with an unterminated quoted field, if any.
+        """
+        if not self.pending:
+            return None
+        self.pending, self.pending_size = [], 0
+        return self.row_line
+
+    def parse(self, line: str) -> Optional[schemas.DispatchCreate]:
+        """
+        Parses one line.
+
+        Returns:
+        - schemas.DispatchCreate: The parsed row, or None for blank and header lines.
+
+        Raises:
+        - ValueError: If the line is malformed or fails validation.
+        """
+        if not line.strip():
+            return None
+        if self.fmt == "ndjson":
+            return schemas.DispatchCreate.model_validate_json(line)
+        try:
+            values = next(csv.reader([line]))
+        except csv.Error as e:
+            raise ValueError(str(e))
+        if self.header is None:
+            self.header = [name.strip() for name in values]
+            return None
+        return schemas.DispatchCreate.model_validate(dict(zip(self.header, values)))
+
+
+def describe_error(error: Exception) -> str:
+    """
+    Formats a parsing or validation error for the per-row error report.
+    """
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}"
+            for err in error.errors()
+        )
+    return str(error)
+
+
+class IngestResult:
+    """
+    Accumulates the outcome of an ingest run.
+    """
+
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[schemas.BulkRowError] = []
+
+    def add_error(self, line: int, error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(schemas.BulkRowError(line=line, error=error))
+
+    def add_batch_error(self, batch: List[Tuple[int, dict]], error: Exception):
+        logger.warning("Bulk ingest batch failed: %s", error)
+        for line, _ in batch:
+            self.add_error(line, f"batch rejected by database: {error}")
+
+    def to_schema(self) -> schemas.BulkIngestResult:
+        return schemas.BulkIngestResult(
+            inserted=self.inserted, failed=self.failed, errors=self.errors
+        )
+
+
+async def aiter_lines(chunks: AsyncIterable[bytes]):
+    """
+    Splits a stream of byte chunks into decoded lines.
+
+    A line longer than MAX_LINE_BYTES is yielded as None, and its content is
+    discarded as it arrives rather than buffered.
+    """
+    buffer = b""
+    oversized = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if oversized:
+                # The end of a line already yielded as None
+                oversized = False
+            elif len(line) > MAX_LINE_BYTES:
+                yield None
+            else:
+                yield line.decode("utf-8", errors="replace").rstrip("\r")
+        if len(buffer) > MAX_LINE_BYTES:
+            if not oversized:
+                yield None
+                oversized = True
+            buffer = b""
+    if buffer and not oversized:
+        yield buffer.decode("utf-8", errors="replace").rstrip("\r")
+
+
+def parse_line(
+        parser: RowParser, line_no: int, line: Optional[str], user_id: int, result: IngestResult
+) -> Optional[Tuple[int, dict]]:
+    """
+    Parses one input line into insert values, recording a row error on failure.
+
+    A None or overlong `line` is rejected, as is a CSV row it was part of.
+
+    Returns:
+    - Tuple[int, dict]: The line the row starts on and its insert values, or None
+      if the line does not complete a valid row.
+    """
+    if line is None or len(line) > MAX_LINE_BYTES:
+        row_line = parser.finish()
+        if row_line is not None:
+            result.add_error(row_line, "unterminated quoted field")
+        result.add_error(line_no, f"line longer than {MAX_LINE_BYTES} bytes")
+        return None
+    try:
+        row = parser.assemble(line_no, line)
+        if row is None:
+            return None
+        item = parser.parse(row)
+    except ValueError as e:
+        result.add_error(parser.row_line, describe_error(e))
+        return None
+    if item is None:
+        return None
+    return parser.row_line, crud.new_dispatch_values(item.area, datetime.utcnow(), user_id)
+
+
+def finish_input(parser: RowParser, result: IngestResult):
+    """
+    Records an error for a CSV row left unterminated at the end of the input.
+    """
+    row_line = parser.finish()
+    if row_line is not None:
+        result.add_error(row_line, "unterminated quoted field")
+
+
+async def ingest_stream(
+        db, lines: AsyncIterable[Optional[str]], fmt: str, user_id: int, batch_size: int = BATCH_SIZE
+) -> schemas.BulkIngestResult:
+    """
+    Ingests dispatches from an async stream of lines, committing per batch.
+
+    Parameters:
+    - db (AsyncSession): The SQLAlchemy async session object.
+    - lines (AsyncIterable[Optional[str]]): The NDJSON or CSV input lines, None for a
+      line longer than MAX_LINE_BYTES (see `aiter_lines`).
+    - fmt (str): The input format, "ndjson" or "csv".
+    - user_id (int): The ID of the user the dispatches are created for.
+    - batch_size (int): Number of rows written per transaction.
+
+    Returns:
+    - schemas.BulkIngestResult: Inserted and failed counts with per-row errors.
+    """
+    parser = RowParser(fmt)
+    result = IngestResult()
+    batch: List[Tuple[int, dict]] = []
+
+    async def flush():
+        try:
+            result.inserted += await async_crud.bulk_create_dispatches(
+                db, [row for _, row in batch]
+            )
+        except Exception as e:
+            await db.rollback()
+            result.add_batch_error(batch, e)
+        batch.clear()
+
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        row = parse_line(parser, line_no, line, user_id, result)
+        if row is not None:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                await flush()
+    finish_input(parser, result)
+    if batch:
+        await flush()
+    return result.to_schema()
+
+
+def ingest_lines(
+        db, lines: Iterable[str], fmt: str, user_id: int, batch_size: int = BATCH_SIZE
+) -> schemas.BulkIngestResult:
+    """
+    Ingests dispatches from an iterable of lines, committing per batch.
+
+    Parameters:
+    - db (Session): The SQLAlchemy session object.
+    - lines (Iterable[str]): The NDJSON or CSV input lines.
+    - fmt (str): The input format, "ndjson" or "csv".
+    - user_id (int): The ID of the user the dispatches are created for.
+    - batch_size (int): Number of rows written per transaction.
+
+    Returns:
+    - schemas.BulkIngestResult: Inserted and failed counts with per-row errors.
+    """
+    parser = RowParser(fmt)
+    result = IngestResult()
+    batch: List[Tuple[int, dict]] = []
+
+    def flush():
+        try:
+            result.inserted += crud.bulk_create_dispatches(db, [row for _, row in batch])
+        except Exception as e:
+            db.rollback()
+            result.add_batch_error(batch, e)
+        batch.clear()
+
+    for line_no, line in enumerate(lines, start=1):
+        row = parse_line(parser, line_no, line.rstrip("\r\n"), user_id, result)
+        if row is not None:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush()
+    finish_input(parser, result)
+    if batch:
+        flush()
+    return result.to_schema()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Bulk load dispatches from NDJSON or CSV.")
+    arg_parser.add_argument("path", help="Input file, or - for stdin")
+    arg_parser.add_argument("--owner-id", type=int, required=True, help="ID of the owning user")
+    arg_parser.add_argument("--format", choices=FORMATS, help="Input format (default: from file extension)")
+    arg_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = arg_parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    db = SessionLocal()
+    source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8", newline="")
+    try:
+        result = ingest_lines(db, source, fmt, args.owner_id, args.batch_size)
+    finally:
+        db.close()
+        if source is not sys.stdin:
+            source.close()
+
+    for error in result.errors:
+        print(f"line {error.line}: {error.error}", file=sys.stderr)
+    print(f"inserted={result.inserted} failed={result.failed}")
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,39 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+import events
+import metrics
 import models
-from database import engine
-from routers import auth, dispatch
+from database import async_engine, engine
+from routers import auth, dispatch, users
+
+# Application log level, e.g. LOG_LEVEL=DEBUG to trace queries while developing
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 
 models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+metrics.instrument_engine(engine, "sync")
+metrics.instrument_engine(async_engine.sync_engine, "async")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Relays other workers' dispatch events to this worker's subscribers (PostgreSQL)
+    listener = asyncio.create_task(events.listen(async_engine))
+    yield
+    listener.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(dispatch.router, tags=["dispatch"])
+app.include_router(users.router, tags=["users"])
+app.add_route("/metrics", metrics.metrics_endpoint, include_in_schema=False)
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,196 @@
+"""
+Prometheus metrics for requests and database access.
+
+`MetricsMiddleware` records per-route latency, in-flight requests, and the
+number and total time of the SQL statements each request ran. Statements are
+attributed to the request through a context variable, which follows the request
+into `AsyncSession.run_sync` greenlets. Time spent waiting for a pooled
+connection is recorded per engine.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty directory
+before starting them. Each worker then writes its samples there, and `/metrics`
+aggregates them no matter which worker serves the scrape.
+"""
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from starlette.requests import Request
+from starlette.responses import Response
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled.", ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ["method", "route"]
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per HTTP request.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Total time spent executing SQL per HTTP request.",
+    ["method", "route"],
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool.",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by result (hit or miss).", ["cache", "result"]
+)
+CACHE_INVALIDATIONS = Counter(
+    "cache_invalidations_total", "Cache entries dropped after a write.", ["cache"]
+)
+
+
+class RequestStats:
+    """
+    Database activity of the request being handled.
+    """
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def _handle_error(exception_context):
+    # Failed statements never reach after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def instrument_engine(engine, name: str):
+    """
+    Records statement counts and timings and pool checkout waits for an engine.
+
+    Parameters:
+    - engine (Engine): A synchronous engine, or the `sync_engine` of an async one.
+    - name (str): The engine label of the pool checkout metric.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+    observe = POOL_CHECKOUT_WAIT.labels(engine=name).observe
+    _time_checkouts(engine.pool, observe)
+    # dispose() replaces the pool with a fresh one, which needs timing too
+    event.listen(engine, "engine_disposed", lambda disposed: _time_checkouts(disposed.pool, observe))
+
+
+def _time_checkouts(pool, observe):
+    """
+    Times the public `Pool.connect`, which blocks until a connection is available.
+
+    The pool events only fire once a connection has been checked out, so none
+    of them marks the start of the wait.
+    """
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            observe(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the request metrics of every HTTP request.
+
+    Requests are labelled with the route template (e.g. `/dispatches/{dispatch_id}`)
+    rather than the raw path, so that label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        in_progress = REQUESTS_IN_PROGRESS.labels(method=method)
+        in_progress.inc()
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            _request_stats.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED_ROUTE)
+            REQUESTS.labels(method=method, route=path, status=str(status)).inc()
+            REQUEST_LATENCY.labels(method=method, route=path).observe(elapsed)
+            REQUEST_DB_QUERIES.labels(method=method, route=path).observe(stats.queries)
+            REQUEST_DB_TIME.labels(method=method, route=path).observe(stats.db_time)
+
+
+def metrics_endpoint(request: Request) -> Response:
+    """
+    Serves the metrics in the Prometheus text exposition format.
+    """
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        data = generate_latest(registry)
+    else:
+        data = generate_latest()
+    return Response(data, media_type=CONTENT_TYPE_LATEST)
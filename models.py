@@ -1,6 +1,6 @@
 import enum
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Enum, Float, Index, text
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -47,17 +47,147 @@ class Dispatch(Base):
     """
     __tablename__ = "dispatches"
 
+    # On PostgreSQL the table is range-partitioned on created_at (migration
+    # 7d2a9c4e1b60, maintained by partitions.py), so its primary key there is
+    # (id, created_at). id alone remains unique and identifies a dispatch.
     id = Column(Integer, primary_key=True, index=True)
-    area = Column(String, index=True)
+    # The area's name is kept for the API and derived tables; queries filter on area_id
+    area = Column(String)
+    area_id = Column(Integer, ForeignKey("areas.id"), index=True)
     created_at = Column(DateTime, index=True, default=datetime.utcnow)
     description = Column(String, default="No description")
     date = Column(DateTime, default=datetime.utcnow)
     status = Column(Enum(DispatchStatusEnum), default=DispatchStatusEnum.PENDING)
     start_time = Column(DateTime, nullable=True)
     complete_time = Column(DateTime, nullable=True)
+    # Key of the proof of delivery image in the blob store (see blobstore.py)
     pod_image = Column(String, nullable=True)
     notes = Column(String, nullable=True)
     recipient_name = Column(String, nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
+    # Bumped by every crud transition; the ETag of the dispatch is derived from it
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # The full-text search column (PostgreSQL) or table (SQLite) is not mapped;
+    # search.py creates and queries it.
 
     owner = relationship("User", back_populates="dispatches")
+
+    # Indexes matching the crud query patterns; see the 3f1c2a7d9e45, b9d4e6f2a178 and f6c1b8d4a259 migrations
+    __table_args__ = (
+        # get_accepted_dispatches: owner_id filter, ordered/paged by id
+        Index("ix_dispatches_owner_id_id", "owner_id", "id"),
+        # get_filtered_dispatches: status/area filters, ordered/paged by id
+        Index("ix_dispatches_status_areaid_id", "status", "area_id", "id"),
+        # get_filtered_dispatches with a date filter
+        Index("ix_dispatches_status_areaid_date", "status", "area_id", "date"),
+        # date ranges without a status filter (created_at ranges use ix_dispatches_created_at)
+        Index("ix_dispatches_date", "date"),
+        # pending dispatches browsed or claimed per area, a small fraction of the table
+        Index(
+            "ix_dispatches_pending_areaid_id",
+            "area_id",
+            "id",
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'"),
+        ),
+        # get_dispatch_version: conditional GETs answered from the index alone
+        Index("ix_dispatches_id_version", "id", "version"),
+    )
+
+
+class Area(Base):
+    """
+    SQLAlchemy model for the Area entity.
+
+    Each distinct area name is stored once; dispatches reference it through
+    `area_id`, so filters compare integers and their indexes stay small.
+    Areas are never renamed or deleted.
+    """
+    __tablename__ = "areas"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+
+class DispatchCount(Base):
+    """
+    SQLAlchemy model for the per-(status, area) dispatch counters.
+
+    Each row holds the number of dispatches with a given status in a given area.
+    The counters are kept up to date by the crud functions that create dispatches
+    or change their status, in the same transaction, so list endpoints can report
+    totals without counting the dispatches table.
+    """
+    __tablename__ = "dispatch_counts"
+
+    status = Column(Enum(DispatchStatusEnum), primary_key=True)
+    area = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class DispatchDailyCount(Base):
+    """
+    SQLAlchemy model for the per-(day, area, status) dispatch rollups.
+
+    Each row holds the number of dispatches dated `day` in an area that are in
+    a given status, archived dispatches counting as completed. The rows are kept
+    up to date like the counters of `DispatchCount`, and rebuilt from scratch by
+    `rollups.py`, so the analytics endpoint never reads the dispatches table.
+    """
+    __tablename__ = "dispatch_daily_counts"
+
+    day = Column(Date, primary_key=True)
+    area = Column(String, primary_key=True)
+    status = Column(Enum(DispatchStatusEnum), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class DriverStats(Base):
+    """
+    SQLAlchemy model for the per-driver performance statistics.
+
+    Each row holds, for one user, the number of dispatches they accepted,
+    started and completed, the total and number of measured delivery durations
+    (from `start_time` to `complete_time`, in seconds) with their average, and
+    the time of their last transition. The rows are kept up to date by the crud
+    transition functions, in the same transaction, and indexed for the
+    leaderboards, so neither reads the dispatches table.
+    """
+    __tablename__ = "driver_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    accepted_count = Column(Integer, nullable=False, default=0)
+    started_count = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+    duration_total = Column(Float, nullable=False, default=0)
+    duration_count = Column(Integer, nullable=False, default=0)
+    # duration_total / duration_count, stored so the leaderboard can read it from an index
+    avg_duration = Column(Float)
+    last_activity_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_driver_stats_completed_count", "completed_count", "user_id"),
+        Index("ix_driver_stats_avg_duration", "avg_duration", "user_id"),
+    )
+
+
+class ArchivedDispatch(Base):
+    """
+    SQLAlchemy model for the index of archived dispatches.
+
+    Each row points at the Parquet file and row group holding a completed
+    dispatch that `archive.py` moved out of the dispatches table, and keeps the
+    columns the list filters need so lookups do not scan the files.
+    """
+    __tablename__ = "archived_dispatches"
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, index=True)
+    area = Column(String)
+    date = Column(DateTime, index=True)
+    file = Column(String, nullable=False)
+    row_group = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_archived_dispatches_area_id", "area", "id"),
+    )
@@ -0,0 +1,39 @@
+import base64
+import json
+
+
+def encode_cursor(position: dict) -> str:
+    """
+    Encodes a keyset position into an opaque cursor string.
+
+    Parameters:
+    - position (dict): The ordering values of the last row on the page, e.g. {"id": 42}.
+
+    Returns:
+    - str: A URL-safe cursor that can be passed back as `after`.
+    """
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Decodes an opaque cursor string back into its keyset position.
+
+    Parameters:
+    - cursor (str): The cursor previously returned by `encode_cursor`.
+
+    Returns:
+    - dict: The keyset position.
+
+    Raises:
+    - ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Malformed cursor") from e
+    if not isinstance(position, dict) or not isinstance(position.get("id"), int):
+        raise ValueError("Malformed cursor")
+    return position
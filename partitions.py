@@ -0,0 +1,187 @@
+"""
+Maintenance of the monthly partitions of the dispatches table (PostgreSQL).
+
+After migration 7d2a9c4e1b60 `dispatches` is range-partitioned on `created_at`,
+one partition per calendar month (`dispatches_y2026m10`), plus a DEFAULT
+partition that catches rows outside every range. Run this command regularly
+(e.g. daily from cron) so the partitions for the coming months exist before
+rows arrive:
+
+    python partitions.py ensure --months-ahead 3
+    python partitions.py list
+
+Rows that landed in the DEFAULT partition because their month had no partition
+yet are moved into the new partition when it is created.
+"""
+import argparse
+import sys
+from datetime import date, datetime
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+PARENT = "dispatches"
+DEFAULT_PARTITION = "dispatches_default"
+# Holds the DEFAULT partition's rows of a month while its partition is created
+STAGING_TABLE = "dispatches_staging"
+MONTHS_AHEAD = 3
+
+
+def month_start(value: datetime) -> date:
+    """
+    Returns the first day of the month containing `value`.
+    """
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    """
+    Returns the first day of the month `months` after `month`.
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """
+    Returns the name of the partition holding the dispatches created in `month`.
+    """
+    return f"{PARENT}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(conn) -> bool:
+    """
+    Returns whether the dispatches table is partitioned on this database.
+    """
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:parent)"
+    ), {"parent": PARENT}).scalar())
+
+
+def list_partitions(conn) -> List[Tuple[str, str, int]]:
+    """
+    Returns the partitions of the dispatches table.
+
+    Returns:
+    - List[Tuple[str, str, int]]: Name, bounds and estimated row count of each partition.
+    """
+    return [tuple(row) for row in conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:parent) ORDER BY c.relname"
+    ), {"parent": PARENT})]
+
+
+def create_partition(conn, month: date) -> bool:
+    """
+    Creates the partition for `month` if it does not exist yet.
+
+    Rows of that month already sitting in the DEFAULT partition are moved out
+    to a staging table first, as a partition cannot be created for a range that
+    the DEFAULT partition still holds rows for, and copied into the new
+    partition afterwards. The partition is created with PARTITION OF, so it
+    takes the parent's columns as they are, generated columns included.
+
+    Parameters:
+    - conn (Connection): A connection inside a transaction.
+    - month (date): The first day of the month.
+
+    Returns:
+    - bool: True if the partition was created.
+    """
+    name = partition_name(month)
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+        return False
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+    has_default = conn.execute(
+        text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}
+    ).scalar()
+    if has_default:
+        # Generated columns are left out; they are computed again on insert
+        columns = ", ".join(stored_columns(conn))
+        conn.execute(text(f"CREATE TEMPORARY TABLE {STAGING_TABLE} (LIKE {PARENT})"))
+        conn.execute(text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            f"WHERE created_at >= '{lower}' AND created_at < '{upper}' RETURNING *) "
+            f"INSERT INTO {STAGING_TABLE} ({columns}) SELECT {columns} FROM moved"
+        ))
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {PARENT} "
+        f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    ))
+    if has_default:
+        conn.execute(text(
+            f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {STAGING_TABLE}"
+        ))
+        conn.execute(text(f"DROP TABLE {STAGING_TABLE}"))
+    return True
+
+
+def stored_columns(conn) -> List[str]:
+    """
+    Returns the columns of the dispatches table that are not generated, in order.
+    """
+    return list(conn.execute(text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :parent "
+        "AND is_generated = 'NEVER' ORDER BY ordinal_position"
+    ), {"parent": PARENT}).scalars())
+
+
+def create_default_partition(conn):
+    """
+    Creates the DEFAULT partition if it does not exist yet.
+    """
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"
+    ))
+
+
+def ensure_partitions(conn, first_month: date, months_ahead: int = MONTHS_AHEAD) -> List[str]:
+    """
+    Creates every missing monthly partition from `first_month` up to
+    `months_ahead` months after the current one.
+
+    Returns:
+    - List[str]: The names of the partitions that were created.
+    """
+    last_month = add_months(month_start(datetime.utcnow()), months_ahead)
+    created = []
+    month = first_month
+    while month <= last_month:
+        if create_partition(conn, month):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Manage the monthly dispatches partitions.")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser("ensure", help="Create the partitions for the coming months")
+    ensure.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    commands.add_parser("list", help="List the partitions with estimated row counts")
+    args = arg_parser.parse_args(argv)
+
+    from database import engine
+
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            print("dispatches is not partitioned on this database; run `alembic upgrade head` "
+                  "on PostgreSQL first", file=sys.stderr)
+            return 1
+        if args.command == "ensure":
+            created = ensure_partitions(
+                conn, month_start(datetime.utcnow()), args.months_ahead
+            )
+            print("created: " + (", ".join(created) if created else "nothing to do"))
+        else:
+            for name, bounds, rows in list_partitions(conn):
+                print(f"{name:28} {rows:>12}  {bounds}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+from passlib.context import CryptContext
+
+# Load environment variables from the .env file
+load_dotenv()
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=int(os.getenv("BCRYPT_ROUNDS", "12")),
+)
+
+# bcrypt releases the GIL, so a thread pool gives real parallelism while capping
+# how many hashes run at once. Excess requests queue here instead of on the loop.
+PASSWORD_HASH_CONCURRENCY = int(
+    os.getenv("PASSWORD_HASH_CONCURRENCY", str(min(4, os.cpu_count() or 1)))
+)
+_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_CONCURRENCY, thread_name_prefix="password-hash"
+)
+
+
+async def hash_password(password: str) -> str:
+    """
+    Hashes a password on the password hashing pool.
+
+    Parameters:
+    - password (str): The plain text password.
+
+    Returns:
+    - str: The bcrypt hash of the password.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, pwd_context.hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password on the password hashing pool.
+
+    If the password is valid but its hash uses outdated settings (e.g. fewer
+    bcrypt rounds than configured), a replacement hash is computed as well.
+
+    Parameters:
+    - password (str): The plain text password.
+    - hashed_password (str): The stored hash to check against.
+
+    Returns:
+    - Tuple[bool, Optional[str]]: Whether the password matched, and the new hash
+      to store if the old one needs an update.
+    """
+    loop = asyncio.get_running_loop()
+    valid = await loop.run_in_executor(
+        _executor, pwd_context.verify, password, hashed_password
+    )
+    if valid and pwd_context.needs_update(hashed_password):
+        return True, await hash_password(password)
+    return valid, None
@@ -0,0 +1,219 @@
+"""
+Rebuilding of the daily dispatch rollups, `dispatch_daily_counts`, and of the
+per-driver statistics, `driver_stats`.
+
+The rollups hold the number of dispatches per day (of the dispatch date), area
+and status, archived dispatches counting as completed, and back the analytics
+endpoint. The driver statistics back `/users/{id}/stats` and the leaderboard.
+`crud` keeps both up to date in the same transaction as every dispatch it
+creates or moves to another status, so a rebuild is only needed after changing
+dispatches outside the API (or to check the rollups for drift):
+
+    python rollups.py rebuild
+    python rollups.py rebuild --check
+    python rollups.py rebuild-drivers
+
+A rebuild replaces every row in a single transaction. On PostgreSQL the table
+is locked against writes first: transactions changing dispatches wait for the
+rebuild, and their changes are then applied on top of it, so none are lost.
+
+Rebuilt driver statistics count the dispatches each driver owns by their
+current status, and archived dispatches as completed without a duration;
+the time of an accept is not stored, so it is not part of `last_activity_at`.
+"""
+import argparse
+import sys
+from typing import Dict, Tuple
+
+from sqlalchemy import (
+    Date, Float, and_, case, cast, delete, extract, func, insert, literal, null, select, text,
+    union_all,
+)
+
+import models
+
+ROLLUP_TABLE = models.DispatchDailyCount.__tablename__
+DRIVER_STATS_TABLE = models.DriverStats.__tablename__
+
+
+def day_column(conn, column):
+    """
+    Returns the SQL expression of the day of a DateTime column.
+    """
+    if conn.dialect.name == "sqlite":
+        return func.date(column)
+    return cast(column, Date)
+
+
+def seconds_between(conn, start, end):
+    """
+    Returns the SQL expression of the seconds from one DateTime column to another.
+    """
+    if conn.dialect.name == "sqlite":
+        return (func.julianday(end) - func.julianday(start)) * 86400.0
+    return extract("epoch", end - start)
+
+
+def rollup_query(conn):
+    """
+    Returns a SELECT of (day, area, status, count) computed from the dispatches
+    table and the archive index.
+    """
+    live = models.Dispatch
+    archived = models.ArchivedDispatch
+    rows = union_all(
+        select(day_column(conn, live.date).label("day"), live.area, live.status)
+        .where(live.date.is_not(None), live.area.is_not(None), live.status.is_not(None)),
+        select(
+            day_column(conn, archived.date).label("day"),
+            archived.area,
+            literal(models.DispatchStatusEnum.COMPLETED, live.status.type).label("status"),
+        ).where(archived.date.is_not(None), archived.area.is_not(None)),
+    ).subquery("rows")
+    return (
+        select(rows.c.day, rows.c.area, rows.c.status, func.count().label("count"))
+        .group_by(rows.c.day, rows.c.area, rows.c.status)
+    )
+
+
+def rebuild(conn) -> int:
+    """
+    Replaces the rollups with counts computed from the dispatches.
+
+    Must run inside a transaction (e.g. `engine.begin()`).
+
+    Returns:
+    - int: The number of rollup rows written.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"LOCK TABLE {ROLLUP_TABLE} IN EXCLUSIVE MODE"))
+    conn.execute(delete(models.DispatchDailyCount))
+    rollup = models.DispatchDailyCount.__table__
+    conn.execute(insert(rollup).from_select(
+        ["day", "area", "status", "count"], rollup_query(conn)
+    ))
+    return conn.execute(select(func.count()).select_from(rollup)).scalar()
+
+
+def driver_stats_query(conn):
+    """
+    Returns a SELECT of the `driver_stats` columns computed from the dispatches
+    table and the archive index.
+    """
+    live = models.Dispatch
+    archived = models.ArchivedDispatch
+    status = models.DispatchStatusEnum
+    timed = and_(live.start_time.is_not(None), live.complete_time.is_not(None))
+    rows = union_all(
+        select(
+            live.owner_id.label("user_id"),
+            case((live.status.in_([status.IN_PROGRESS, status.ACCEPTED, status.STARTED, status.COMPLETED]), 1),
+                 else_=0).label("accepted"),
+            case((live.status.in_([status.STARTED, status.COMPLETED]), 1), else_=0).label("started"),
+            case((live.status == status.COMPLETED, 1), else_=0).label("completed"),
+            case((timed, seconds_between(conn, live.start_time, live.complete_time)),
+                 else_=null()).label("duration"),
+            func.coalesce(live.complete_time, live.start_time).label("activity"),
+        ).where(live.owner_id.is_not(None)),
+        select(
+            archived.owner_id,
+            literal(1),
+            literal(1),
+            literal(1),
+            cast(null(), Float),
+            cast(null(), live.start_time.type),
+        ).where(archived.owner_id.is_not(None)),
+    ).subquery("rows")
+    durations = func.count(rows.c.duration)
+    accepted = func.sum(rows.c.accepted)
+    return (
+        select(
+            rows.c.user_id,
+            accepted,
+            func.sum(rows.c.started),
+            func.sum(rows.c.completed),
+            func.coalesce(func.sum(rows.c.duration), 0),
+            durations,
+            case((durations > 0, func.sum(rows.c.duration) / durations), else_=null()),
+            func.max(rows.c.activity),
+        )
+        .group_by(rows.c.user_id)
+        .having(accepted > 0)
+    )
+
+
+def rebuild_driver_stats(conn) -> int:
+    """
+    Replaces the driver statistics with values computed from the dispatches.
+
+    Must run inside a transaction (e.g. `engine.begin()`).
+
+    Returns:
+    - int: The number of drivers written.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"LOCK TABLE {DRIVER_STATS_TABLE} IN EXCLUSIVE MODE"))
+    conn.execute(delete(models.DriverStats))
+    stats = models.DriverStats.__table__
+    conn.execute(insert(stats).from_select(
+        ["user_id", "accepted_count", "started_count", "completed_count",
+         "duration_total", "duration_count", "avg_duration", "last_activity_at"],
+        driver_stats_query(conn),
+    ))
+    return conn.execute(select(func.count()).select_from(stats)).scalar()
+
+
+def drift(conn) -> Dict[Tuple, Tuple[int, int]]:
+    """
+    Compares the rollups with counts computed from the dispatches.
+
+    Returns:
+    - Dict[Tuple, Tuple[int, int]]: (stored, computed) counts by (day, area, status),
+      for the keys where they differ.
+    """
+    computed = {
+        (str(day), area, status.name): count
+        for day, area, status, count in conn.execute(rollup_query(conn))
+    }
+    rollup = models.DispatchDailyCount
+    stored = {
+        (str(day), area, status.name): count
+        for day, area, status, count in conn.execute(
+            select(rollup.day, rollup.area, rollup.status, rollup.count).where(rollup.count != 0)
+        )
+    }
+    return {
+        key: (stored.get(key, 0), computed.get(key, 0))
+        for key in stored.keys() | computed.keys()
+        if stored.get(key, 0) != computed.get(key, 0)
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Maintain the daily dispatch rollups.")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = commands.add_parser("rebuild", help="Recompute the rollups from the dispatches")
+    rebuild_parser.add_argument(
+        "--check", action="store_true", help="Only report the rollups that differ, without writing"
+    )
+    commands.add_parser("rebuild-drivers", help="Recompute the driver statistics from the dispatches")
+    args = arg_parser.parse_args(argv)
+
+    from database import engine
+
+    with engine.begin() as conn:
+        if args.command == "rebuild-drivers":
+            print(f"rebuilt statistics of {rebuild_driver_stats(conn)} drivers")
+            return 0
+        if args.check:
+            differences = drift(conn)
+            for (day, area, status), (stored, computed) in sorted(differences.items()):
+                print(f"{day} {area:24} {status:12} stored {stored:>8}  computed {computed:>8}")
+            print(f"{len(differences)} rollups differ")
+            return 1 if differences else 0
+        print(f"rebuilt {rebuild(conn)} rollups")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
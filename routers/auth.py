@@ -1,14 +1,13 @@
 from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, HTTPException
-from jose import jwt, JWTError
-from sqlalchemy.orm import Session
-from datetime import timedelta, datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import timedelta
 import os
-import crud
+import async_crud
 import schemas
 
-from database import get_db
-from routers.auth_bearer import JWTBearer
+from database import get_async_db
+from routers.auth_bearer import CurrentUser
 from routers.auth_handler import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
@@ -18,12 +17,10 @@ load_dotenv()
 # Retrieve the database URL from the environment variables
 SECRET_KEY= os.getenv("SECRET_KEY")
 @router.post("/signup")
-async def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
-    if db_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-
-    new_user = crud.create_user(db=db, user=user)
+async def signup(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    new_user = await async_crud.create_user(db=db, user=user)
+    if not new_user:
+        raise HTTPException(status_code=400, detail="Email or username already registered")
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(data={"email": new_user.email}, expires_delta=access_token_expires)
@@ -36,8 +33,8 @@ async def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
     }
 
 @router.post("/login")
-async def login(user: schemas.UserLogin, db: Session = Depends(get_db)):
-    authenticated_user = crud.authenticate_user(db, email=user.email, password=user.password)
+async def login(user: schemas.UserLogin, db: AsyncSession = Depends(get_async_db)):
+    authenticated_user = await async_crud.authenticate_user(db, email=user.email, password=user.password)
     if not authenticated_user:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
 
@@ -46,27 +43,14 @@ async def login(user: schemas.UserLogin, db: Session = Depends(get_db)):
     return {"jwt_token": access_token, "token_type": "bearer"}
 
 @router.post("/refresh")
-async def refresh_token(token: str = Depends(JWTBearer()), db: Session = Depends(get_db)):
-    if not token:
-        raise HTTPException(status_code=401, detail="Token is missing or invalid")
-
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[crud.ALGORITHM])
-        email = payload.get("email")
-        if not email:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        current_user = crud.get_user_by_email(db, email=email)
-        if not current_user:
-            raise HTTPException(status_code=401, detail="User not found")
-
-        exp = payload.get("exp")
-        if exp and exp < datetime.utcnow().timestamp():
-            raise HTTPException(status_code=401, detail="Token expired")
-
-    except JWTError as e:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
+async def refresh_token(current_user: CurrentUser):
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     new_access_token = create_access_token(data={"email": current_user.email}, expires_delta=access_token_expires)
     return {"access_token": new_access_token, "token_type": "bearer"}
+
+@router.post("/deactivate")
+async def deactivate(current_user: CurrentUser, db: AsyncSession = Depends(get_async_db)):
+    deactivated_user = await async_crud.deactivate_user(db, current_user.id)
+    if not deactivated_user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return {"message": "User deactivated"}
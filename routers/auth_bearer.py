@@ -1,79 +1,88 @@
-from fastapi import Request, HTTPException
+import hashlib
+from typing import Annotated, Optional
+
+from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 
+import async_crud
+import schemas
+from cache import user_cache
+from database import get_async_db
 from routers.auth_handler import decode_jwt
 
 
-class JWTBearer(HTTPBearer):
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> schemas.User:
+    """
+    Resolves the authenticated user for a request.
+
+    The bearer token is verified at most once: the resolved user is cached under
+    the SHA-256 of the token until the token expires, so repeat requests with the
+    same token skip both the signature check and the user lookup.
+
+    Parameters:
+    - credentials (HTTPAuthorizationCredentials): The bearer credentials of the request.
+    - db (AsyncSession): The SQLAlchemy async session object.
+
+    Returns:
+    - schemas.User: The active user the token belongs to.
+
+    Raises:
+    - HTTPException: 403 if the authorization header is missing or not a bearer token.
+    - HTTPException: 401 if the token is invalid or expired, or the user is unknown or inactive.
+    """
+    if not credentials:
+        raise HTTPException(status_code=403, detail="Invalid authorization code.")
+    return await resolve_user(credentials.credentials, db)
+
+
+async def resolve_user(token: str, db: AsyncSession) -> schemas.User:
     """
-    A custom HTTPBearer security scheme for JWT authentication.
+    Resolves the active user a bearer token belongs to, through the token cache.
+
+    Used by `get_current_user`, and directly by endpoints such as WebSockets that
+    receive the token some other way than in the Authorization header.
+
+    Parameters:
+    - token (str): The JWT token.
+    - db (AsyncSession): The SQLAlchemy async session object.
+
+    Returns:
+    - schemas.User: The active user the token belongs to.
 
-    This class extends the `HTTPBearer` class from FastAPI to include custom
-    logic for validating JWT tokens provided in the Authorization header of
-    HTTP requests.
+    Raises:
+    - HTTPException: 401 if the token is invalid or expired, or the user is unknown or inactive.
     """
+    token_key = hashlib.sha256(token.encode()).hexdigest()
+    user = user_cache.get(token_key)
+    if user is not None:
+        return user
+
+    payload = decode_jwt(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token or expired token.")
+
+    email = payload.get("email")
+    db_user = await async_crud.get_user_by_email(db, email) if email else None
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if db_user.is_active is False:
+        raise HTTPException(status_code=401, detail="Inactive user")
+
+    user = schemas.User(
+        id=db_user.id,
+        username=db_user.username,
+        email=db_user.email,
+        is_active=True,
+    )
+    user_cache.set(token_key, user, expires_at=payload["exp"])
+    return user
+
 
-    def __init__(self, auto_error: bool = True):
-        """
-        Initializes the JWTBearer class.
-
-        Parameters:
-        - auto_error (bool): Whether to automatically raise an HTTPException on
-          authentication errors.
-        """
-        super(JWTBearer, self).__init__(auto_error=auto_error)
-
-    async def __call__(self, request: Request):
-        """
-        Validates the JWT token from the Authorization header.
-
-        This method extracts the credentials from the request, checks the
-        authentication scheme, and verifies the JWT token. Raises an HTTPException
-        if the token is invalid, expired, or the scheme is incorrect.
-
-        Parameters:
-        - request (Request): The incoming HTTP request containing the Authorization header.
-
-        Returns:
-        - str: The JWT token if it is valid.
-
-        Raises:
-        - HTTPException: 403 if the authentication scheme is invalid or the token is missing.
-        - HTTPException: 401 if the token is invalid or expired.
-        """
-        credentials: HTTPAuthorizationCredentials = await super(
-            JWTBearer, self
-        ).__call__(request)
-        if credentials:
-            if not credentials.scheme == "Bearer":
-                raise HTTPException(
-                    status_code=403, detail="Invalid authentication scheme."
-                )
-            if not self.verify_jwt(credentials.credentials):
-                raise HTTPException(
-                    status_code=401, detail="Invalid token or expired token."
-                )
-            return credentials.credentials
-        else:
-            raise HTTPException(status_code=403, detail="Invalid authorization code.")
-
-    def verify_jwt(self, jwtoken: str) -> bool:
-        """
-        Verifies the validity of the JWT token.
-
-        Attempts to decode the JWT token and returns True if the token is valid.
-
-        Parameters:
-        - jwtoken (str): The JWT token to be verified.
-
-        Returns:
-        - bool: True if the token is valid, False otherwise.
-        """
-        isTokenValid: bool = False
-        try:
-            payload = decode_jwt(jwtoken)
-        except:
-            payload = None
-        if payload:
-            isTokenValid = True
-        return isTokenValid
+CurrentUser = Annotated[schemas.User, Depends(get_current_user)]
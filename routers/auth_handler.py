@@ -8,6 +8,7 @@ import schemas
 import crud
 from fastapi import Depends, HTTPException
 from jose import jwt, JWTError
+import logging
 import os
 # Load environment variables from the .env file
 load_dotenv()
@@ -19,6 +20,8 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+logger = logging.getLogger(__name__)
+
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """
@@ -59,12 +62,11 @@ def decode_jwt(token: str):
     """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        print(f"Decoded JWT payload: {payload}")  # Add this line
         if payload.get("exp") and payload["exp"] >= datetime.utcnow().timestamp():
             return payload
         return None
     except JWTError as e:
-        print(f"JWTError: {e}")  # Add this line
+        logger.debug("JWTError: %s", e)
         return None
 
 
@@ -1,75 +1,331 @@
+import asyncio
+import hashlib
+import json
 import logging
-from datetime import datetime
-from typing import Optional, List
+import os
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Union
 
+import async_crud
 import crud
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
-from sqlalchemy.orm import Session
-
-
+from fastapi import (
+    APIRouter, Depends, HTTPException, Query, Path, Request, Response, WebSocket,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+try:
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart before 0.0.13
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+import blobstore
+import events
+import export
+import ingest
 import schemas
 
-from database import get_db
-from routers.auth_bearer import JWTBearer
+from database import AsyncSessionLocal, get_async_db
+from pagination import decode_cursor, encode_cursor
+from routers.auth_bearer import CurrentUser, resolve_user
 
 router = APIRouter()
 
-logging.basicConfig(level=logging.DEBUG)  # Set up logging configuration
 logger = logging.getLogger(__name__)
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Seconds between keepalives on idle event streams
+EVENT_HEARTBEAT = float(os.getenv("EVENT_HEARTBEAT", "15"))
+# Longest span of days one analytics request may cover
+ANALYTICS_MAX_DAYS = int(os.getenv("ANALYTICS_MAX_DAYS", "366"))
+
+
+def decode_after(after: Optional[str]) -> Optional[int]:
+    """
+    Decodes the `after` query parameter into the ID to seek past.
+
+    Raises a 400 error if the cursor was not produced by this API.
+    """
+    if after is None:
+        return None
+    try:
+        return decode_cursor(after)["id"]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_search_after(after: Optional[str]) -> Optional[dict]:
+    """
+    Decodes the `after` query parameter of a search into the (score, id)
+    position to seek past.
+
+    Raises a 400 error if the cursor was not produced by a search.
+    """
+    if after is None:
+        return None
+    try:
+        position = decode_cursor(after)
+    except ValueError:
+        position = None
+    if not position or not isinstance(position.get("score"), (int, float)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+
+def conflict(error: crud.DispatchConflictError) -> HTTPException:
+    """
+    Maps a rejected status transition to a 409 error.
+    """
+    return HTTPException(
+        status_code=409,
+        detail=f"Cannot {error.action} a dispatch that is {error.status.value}",
+    )
+
 
-@router.get("/dispatches/accepted", response_model=List[schemas.DispatchBase])
+async def check_pod_image(pod_image: Optional[str]):
+    """
+    Ensures a `podImage` value is the key of an uploaded POD image.
+
+    Raises:
+    - HTTPException: 400 if no image with that key has been uploaded to `/pods`.
+    """
+    if pod_image and not await asyncio.to_thread(blobstore.exists, pod_image):
+        raise HTTPException(
+            status_code=400,
+            detail="'podImage' must be the key of an image uploaded to /pods",
+        )
+
+
+# Allowance for the multipart boundaries and part headers around a POD image
+POD_MULTIPART_OVERHEAD = 16 * 1024
+POD_UPLOAD_BODY = {
+    "required": True,
+    "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "properties": {"file": {"type": "string", "format": "binary"}},
+        "required": ["file"],
+    }}},
+}
+
+
+async def receive_pod(request: Request) -> schemas.PodUploadResult:
+    """
+    Streams the `file` field of a multipart/form-data request into the blob store.
+
+    The body is parsed as it arrives and the image is written chunk by chunk,
+    so the size limit applies while it is received: a body whose Content-Length
+    is already too large is rejected before any of it is read, and any other
+    is cut off once the image exceeds MAX_POD_BYTES.
+
+    Raises:
+    - HTTPException: 413 if the image is larger than MAX_POD_BYTES.
+    - HTTPException: 415 if it is not a JPEG, PNG, GIF or WebP image.
+    - HTTPException: 422 if the body is not well-formed multipart/form-data with a `file` field.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise HTTPException(status_code=422, detail="Expected a multipart/form-data body")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > blobstore.MAX_POD_BYTES + POD_MULTIPART_OVERHEAD:
+        raise HTTPException(status_code=413, detail=f"Larger than {blobstore.MAX_POD_BYTES} bytes")
+
+    part = {"headers": {}, "field": b"", "value": b"", "is_file": False}
+    found = False
+    pending: List[bytes] = []
+
+    def on_part_begin():
+        part.update(headers={}, is_file=False)
+
+    def on_header_field(data, start, end):
+        part["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["field"].lower()] = part["value"]
+        part.update(field=b"", value=b"")
+
+    def on_headers_finished():
+        nonlocal found
+        _, disposition = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        part["is_file"] = not found and disposition.get(b"name") == b"file"
+        found = found or part["is_file"]
+
+    def on_part_data(data, start, end):
+        if part["is_file"]:
+            pending.append(data[start:end])
+
+    parser = MultipartParser(options[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+    writer = await asyncio.to_thread(blobstore.BlobWriter, blobstore.MAX_POD_BYTES)
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if pending:
+                await asyncio.to_thread(writer.write, b"".join(pending))
+                pending.clear()
+        parser.finalize()
+        if not found:
+            raise HTTPException(status_code=422, detail="Missing the 'file' field")
+        key, size = await asyncio.to_thread(writer.commit)
+    except blobstore.BlobTooLargeError as e:
+        await asyncio.to_thread(writer.discard)
+        raise HTTPException(status_code=413, detail=str(e))
+    except blobstore.UnsupportedBlobError as e:
+        await asyncio.to_thread(writer.discard)
+        raise HTTPException(status_code=415, detail=str(e))
+    except MultipartParseError as e:
+        await asyncio.to_thread(writer.discard)
+        raise HTTPException(status_code=422, detail=f"Malformed multipart body: {e}")
+    except BaseException:
+        await asyncio.to_thread(writer.discard)
+        raise
+    return schemas.PodUploadResult(key=key, size=size)
+
+
+def bulk_transition_result(outcomes: dict) -> schemas.BulkTransitionResult:
+    """
+    Builds the bulk transition response from the per-ID outcomes returned by crud.
+    """
+    return schemas.BulkTransitionResult(
+        updated=sum(outcome == "ok" for outcome in outcomes.values()),
+        results=[
+            schemas.BulkTransitionOutcome(id=dispatch_id, outcome=outcome)
+            for dispatch_id, outcome in outcomes.items()
+        ],
+    )
+
+
+class DispatchRowsResponse(Response):
+    """
+    JSON response for rows from the list fast path.
+
+    The content is dumped straight to bytes by the precompiled adapters in
+    `schemas`, skipping response_model validation and `jsonable_encoder`.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, dict):
+            return schemas.dispatch_row_page_adapter.dump_json(content)
+        return schemas.dispatch_rows_adapter.dump_json(content)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Returns whether the request's If-None-Match header matches `etag`.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in tags or "*" in tags
+
+
+def dispatch_etag(dispatch_id: int, version: int) -> str:
+    """
+    Returns the strong ETag of a dispatch at the given version.
+    """
+    return f'"{dispatch_id}.{version}"'
+
+
+def page_etag(rows: List[dict], total: Optional[int]) -> str:
+    """
+    Returns the strong ETag of a list page, a hash of the (id, version) pairs of
+    its rows and the envelope total.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for row in rows:
+        digest.update(b"%d.%d," % (row["id"], row["version"]))
+    digest.update(b"total=%s" % str(total).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def page_result(
+        request: Request,
+        rows: List[dict],
+        limit: int,
+        total: Optional[int] = None,
+        position: Optional[dict] = None,
+) -> Response:
+    """
+    Builds the response of a list endpoint from a page of dispatch rows.
+
+    The cursor for the page following `rows` is exposed in a response header;
+    it is omitted when the page is short, meaning there is nothing left to
+    fetch. It encodes `position`, or by default the id of the last row. When a
+    total is given, the page is wrapped in a DispatchList envelope.
+    If the request's If-None-Match matches the page's ETag, a bodyless 304 is
+    returned instead, without serializing the rows.
+    """
+    headers = {"ETag": page_etag(rows, total)}
+    next_cursor = None
+    if rows and len(rows) == limit:
+        next_cursor = encode_cursor(position or {"id": rows[-1]["id"]})
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if total is None:
+        return DispatchRowsResponse(rows, headers=headers)
+    return DispatchRowsResponse(
+        {"total": total, "dispatches": rows, "next_cursor": next_cursor}, headers=headers
+    )
+
+
+@router.get(
+    "/dispatches/accepted",
+    response_model=Union[List[schemas.DispatchBase], schemas.DispatchList],
+)
 async def get_accepted_dispatches(
+    user: CurrentUser,
+    request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(10, le=100),
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer()),
+    after: Optional[str] = Query(None),
+    envelope: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Retrieving a paginated list of accepted dispatches for the current user.
     - Validates the token to identify the current user.
+    - Pages by `after` cursor when given, otherwise by page number.
     - Retrieves accepted dispatches for the user from the database.
-    - Ensures that all fields of the dispatches are populated, providing defaults if necessary.
-    - Returns the list of validated dispatches.
+    - Fills in defaults for missing fields in the query itself.
+    - Returns the list of dispatches, or with `envelope=true` a DispatchList
+      with the user's total number of dispatches.
+    - Sends an ETag for the page and returns 304 if If-None-Match matches it.
     """
     logger.debug(
-        f"Received request for accepted dispatches: page={page}, limit={limit}, token={token}"
+        "Received request for accepted dispatches: user_id=%s page=%s limit=%s",
+        user.id, page, limit,
     )
 
-    user = crud.get_current_user(db, token)
-    logger.debug(f"Current user: {user}")
-
-    if not user:
-        logger.error("Invalid token, no user found.")
-        raise HTTPException(status_code=401, detail="Invalid token")
-
+    after_id = decode_after(after)
     skip = (page - 1) * limit
-    logger.debug(f"Calculated skip: {skip}")
 
-    dispatches = crud.get_accepted_dispatches(
-        db, user_id=user.id, skip=skip, limit=limit
+    rows = await async_crud.get_accepted_dispatch_rows(
+        db, user_id=user.id, skip=skip, limit=limit, after_id=after_id
     )
-    logger.debug(f"Retrieved dispatches: {dispatches}")
-
-    # Ensure all fields are populated correctly
-    validated_dispatches: List[schemas.DispatchBase] = []
-    for dispatch in dispatches:
-        if dispatch.description is None:
-            dispatch.description = "No description"
-        if dispatch.date is None:
-            dispatch.date = datetime.utcnow()
-        if dispatch.created_at is None:
-            dispatch.created_at = datetime.utcnow()
-        validated_dispatches.append(dispatch)
 
-    return validated_dispatches
+    total = await async_crud.count_owned_dispatches(db, user.id) if envelope else None
+    return page_result(request, rows, limit, total)
 
 
 @router.post("/create", response_model=schemas.DispatchBase)
 async def create_dispatch(
+    user: CurrentUser,
     dispatch: schemas.DispatchCreate,
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer()),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Creating a new dispatch.
@@ -77,107 +333,439 @@ async def create_dispatch(
     - Creates a new dispatch entry in the database with the specified area.
     - Returns the newly created dispatch.
     """
-    user = crud.get_current_user(db, token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    return crud.create_dispatch(
+    return await async_crud.create_dispatch(
         db, area=dispatch.area, created_at=datetime.utcnow(), user_id=user.id
     )
 
 
-@router.get("/dispatches", response_model=List[schemas.DispatchBase])
+@router.post("/dispatches/bulk", response_model=schemas.BulkIngestResult)
+async def bulk_create_dispatches(
+    user: CurrentUser,
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(ingest.BATCH_SIZE, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Bulk create dispatches from an NDJSON or CSV request body.
+    - Validates the token to identify the current user.
+    - Streams the body line by line; CSV input needs a header row with an `area` column.
+    - Validates each row and writes valid rows in batches, one transaction per batch.
+    - Returns the inserted and failed counts with the line number and reason of each failure.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if content_type.startswith("text/csv") else "ndjson"
+
+    return await ingest.ingest_stream(
+        db, ingest.aiter_lines(request.stream()), format, user.id, batch_size
+    )
+
+
+@router.post("/dispatches/bulk/accept", response_model=schemas.BulkTransitionResult)
+async def bulk_accept_dispatches(
+    user: CurrentUser,
+    request: schemas.BulkTransitionRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Accept many dispatches in one request.
+    - Validates the token to identify the current user.
+    - Accepts all given pending dispatches with a single UPDATE and assigns them to the user.
+    - Returns the outcome for each ID; dispatches that are no longer pending are "conflict".
+    """
+    outcomes = await async_crud.bulk_accept_dispatches(db, request.ids, user.id)
+    return bulk_transition_result(outcomes)
+
+
+@router.post("/dispatches/bulk/start", response_model=schemas.BulkTransitionResult)
+async def bulk_start_dispatches(
+    user: CurrentUser,
+    request: schemas.BulkTransitionRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Start many dispatches in one request.
+    - Validates the token to identify the current user.
+    - Starts the given dispatches owned by the user with a single UPDATE.
+    - Returns the outcome for each ID; dispatches of other users are "not_authorized"
+      and dispatches in the wrong status are "conflict".
+    """
+    outcomes = await async_crud.bulk_start_dispatches(db, request.ids, user.id)
+    return bulk_transition_result(outcomes)
+
+
+@router.post("/dispatches/bulk/complete", response_model=schemas.BulkTransitionResult)
+async def bulk_complete_dispatches(
+    user: CurrentUser,
+    request: schemas.BulkCompleteRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Complete many dispatches in one request with the same details.
+    - Ensures at least one of 'pod_image', 'notes', or 'recipient_name' is provided.
+    - Ensures 'pod_image', if given, is the key of an image uploaded to `/pods`.
+    - Validates the token to identify the current user.
+    - Completes the given dispatches owned by the user with a single UPDATE.
+    - Returns the outcome for each ID; dispatches of other users are "not_authorized"
+      and dispatches in the wrong status are "conflict".
+    """
+    if not any([request.pod_image, request.notes, request.recipient_name]):
+        raise HTTPException(
+            status_code=400,
+            detail="At least one of 'pod_image', 'notes', or 'recipient_name' must be provided",
+        )
+    await check_pod_image(request.pod_image)
+
+    outcomes = await async_crud.bulk_complete_dispatches(
+        db,
+        request.ids,
+        user.id,
+        request.pod_image or "",
+        request.notes or "",
+        request.recipient_name or "",
+    )
+    return bulk_transition_result(outcomes)
+
+
+@router.get("/areas", response_model=List[schemas.AreaMatch])
+async def search_areas(
+    user: CurrentUser,
+    q: str = Query(..., min_length=1, max_length=100, description="Partial or misspelled area name"),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Autocomplete area names.
+    - Validates the token to identify the current user.
+    - Returns the areas whose name starts with 'q' (ignoring case), then the ones most similar to it.
+    - Served from the in-memory area index, which picks up new areas incrementally.
+    """
+    return await async_crud.search_areas(db, q, limit)
+
+
+@router.get("/analytics/dispatches", response_model=List[schemas.DailyCount])
+async def dispatch_analytics(
+    user: CurrentUser,
+    date_from: Optional[date] = Query(None, description="First day, default 29 days before date_to"),
+    date_to: Optional[date] = Query(None, description="Last day (inclusive), default today"),
+    area: Optional[str] = Query(None),
+    status: Optional[schemas.DispatchStatus] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Count dispatches by area, status and day.
+    - Validates the token to identify the current user.
+    - Returns, for each day from 'date_from' to 'date_to', the number of dispatches dated that
+      day in each area that are currently in each status; empty combinations are left out.
+    - Archived dispatches count as completed.
+    - Served from the daily rollup table, which is updated with every dispatch change, so the
+      dispatches table is never scanned. The span is limited to ANALYTICS_MAX_DAYS days.
+    """
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from is after date_to")
+    if (date_to - date_from).days >= ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {ANALYTICS_MAX_DAYS} days can be requested")
+    return await async_crud.get_daily_counts(
+        db, date_from, date_to, area, status.value if status else None
+    )
+
+
+@router.post("/dispatches/claim", response_model=List[schemas.DispatchBase])
+async def claim_dispatches(
+    user: CurrentUser,
+    request: schemas.ClaimRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Claim the oldest pending dispatches in an area.
+    - Validates the token to identify the current user.
+    - Accepts up to 'count' of the oldest pending dispatches in 'area' and assigns them to the user.
+    - Concurrent claims never receive the same dispatch and do not wait on each other's rows.
+    - Returns the claimed dispatches; an empty list if the area has no pending dispatches left.
+    """
+    logger.debug("Claiming %s dispatches in area=%s for user_id=%s", request.count, request.area, user.id)
+    return await async_crud.claim_dispatches(db, request.area, request.count, user.id)
+
+
+@router.get(
+    "/dispatches",
+    response_model=Union[List[schemas.DispatchBase], schemas.DispatchList],
+)
 async def get_dispatches(
+    user: CurrentUser,
+    request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(10, le=100),
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer()),
+    after: Optional[str] = Query(None),
+    envelope: bool = Query(False),
+    exact: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Retrieve a list(paginated) of all dispatches for the current user.
     - Validates the token to identify the current user.
+    - Pages by `after` cursor when given, otherwise by page number.
     - Retrieves all dispatches from the database.
-    - Returns the list of dispatches.
+    - Returns the list of dispatches, or with `envelope=true` a DispatchList with the
+      total taken from the dispatch counters (`exact=true` counts the table instead).
+    - Sends an ETag for the page and returns 304 if If-None-Match matches it.
     """
-    user = crud.get_current_user(db, token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
+    after_id = decode_after(after)
     skip = (page - 1) * limit
-    dispatches = crud.get_dispatches(db, skip=skip, limit=limit)
+    rows = await async_crud.get_dispatch_rows(
+        db, skip=skip, limit=limit, after_id=after_id
+    )
 
-    return dispatches
+    total = None
+    if envelope:
+        total = await async_crud.count_dispatches(db, None, None, None, exact)
+    return page_result(request, rows, limit, total)
 
 
-@router.get("/dispatches/filter", response_model=List[schemas.DispatchBase])
+@router.get(
+    "/dispatches/filter",
+    response_model=Union[List[schemas.DispatchBase], schemas.DispatchList],
+)
 async def filter_dispatches(
+    user: CurrentUser,
+    request: Request,
     status: Optional[str] = Query(None),
     date: Optional[datetime] = Query(None),
     area: Optional[str] = Query(None),
+    date_from: Optional[datetime] = Query(None, description="Dispatch date on or after"),
+    date_to: Optional[datetime] = Query(None, description="Dispatch date before"),
+    created_from: Optional[datetime] = Query(None, description="Created on or after"),
+    created_to: Optional[datetime] = Query(None, description="Created before"),
+    q: Optional[str] = Query(None, max_length=200, description="Words to search for"),
     page: int = Query(1, ge=1),
     limit: int = Query(10, le=100),
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer()),
+    after: Optional[str] = Query(None),
+    envelope: bool = Query(False),
+    exact: bool = Query(False),
+    include_archived: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Retrieve a paginated list of dispatches filtered by optional criteria.
     - Validates the token to identify the current user.
     - Applies filters (status, date, area) to the dispatches query.
+    - Restricts the dispatch date to [date_from, date_to) and the creation time to
+      [created_from, created_to); either bound may be left out.
+    - Pages by `after` cursor when given, otherwise by page number.
     - Retrieves filtered dispatches from the database.
-    - Returns the list of filtered dispatches.
+    - Returns the list of filtered dispatches, or with `envelope=true` a DispatchList with
+      the number of matching dispatches. Status and area totals come from the dispatch
+      counters; a date filter or range, or `exact=true`, uses a briefly cached COUNT(*).
+    - With `include_archived=true`, archived dispatches are merged into the page by id.
+      Totals count live dispatches only. The archive has no creation times, so
+      `created_from`/`created_to` cannot be combined with it.
+    - With `q`, full-text searches the description, notes and recipient name and
+      returns the matches best first; the total is a briefly cached count of the matches.
+      Archived dispatches are not searched.
+    - Sends an ETag for the page and returns 304 if If-None-Match matches it.
     """
-    user = crud.get_current_user(db, token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
     skip = (page - 1) * limit
-    dispatches = crud.get_filtered_dispatches(db, status, date, area, skip, limit)
+    ranges = crud.DateRanges(date_from, date_to, created_from, created_to)
+    if q is not None:
+        if include_archived:
+            raise HTTPException(status_code=400, detail="Archived dispatches cannot be searched")
+        rows, position = await async_crud.search_dispatch_rows(
+            db, q, status, date, area, skip, limit, after=decode_search_after(after), ranges=ranges
+        )
+        total = None
+        if envelope:
+            total = await async_crud.count_search_matches(db, q, status, date, area, ranges)
+        return page_result(request, rows, limit, total, position)
+
+    if include_archived and (created_from or created_to):
+        raise HTTPException(
+            status_code=400, detail="Archived dispatches cannot be filtered by creation time"
+        )
+    after_id = decode_after(after)
+    rows = await async_crud.get_filtered_dispatch_rows(
+        db, status, date, area, skip, limit, after_id=after_id,
+        include_archived=include_archived, ranges=ranges,
+    )
+
+    total = None
+    if envelope:
+        total = await async_crud.count_dispatches(db, status, date, area, exact, ranges)
+    return page_result(request, rows, limit, total)
+
+
+@router.get("/dispatches/export", response_class=StreamingResponse)
+async def export_dispatches(
+    user: CurrentUser,
+    status: Optional[str] = Query(None),
+    date: Optional[datetime] = Query(None),
+    area: Optional[str] = Query(None),
+    date_from: Optional[datetime] = Query(None, description="Dispatch date on or after"),
+    date_to: Optional[datetime] = Query(None, description="Dispatch date before"),
+    created_from: Optional[datetime] = Query(None, description="Created on or after"),
+    created_to: Optional[datetime] = Query(None, description="Created before"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+):
+    """
+    Export every dispatch matching the filters as NDJSON or CSV.
+    - Validates the token to identify the current user.
+    - Takes the same filters (status, date, area and the date ranges) as `/dispatches/filter`,
+      without pagination.
+    - Streams the rows in id order from a server-side cursor, so memory use does not
+      grow with the size of the export.
+    """
+    return StreamingResponse(
+        export.stream_export(
+            status, date, area, format, crud.DateRanges(date_from, date_to, created_from, created_to)
+        ),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="dispatches.{format}"'},
+    )
 
-    return dispatches
+
+async def sse_events(area: Optional[str], status: Optional[str], owner_id: Optional[int]):
+    """
+    Yields the matching dispatch events as Server-Sent Events, with a comment
+    line as keepalive every EVENT_HEARTBEAT seconds.
+    """
+    subscription = events.broadcaster.subscribe(area, status, owner_id)
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.next(), EVENT_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            if event["event"] == "overflow":
+                return
+    finally:
+        events.broadcaster.unsubscribe(subscription)
+
+
+@router.get("/dispatches/events", response_class=StreamingResponse)
+async def stream_dispatch_events(
+    user: CurrentUser,
+    area: Optional[str] = Query(None),
+    status: Optional[schemas.DispatchStatus] = Query(None),
+    owner_id: Optional[int] = Query(None),
+):
+    """
+    Stream dispatch events as Server-Sent Events.
+    - Validates the token to identify the current user.
+    - Sends a `created`, `accepted`, `started` or `completed` event for every dispatch
+      matching the filters (area, status after the change, owner) as it happens.
+    - Sends an `overflow` event and ends the stream if the client falls EVENT_QUEUE_SIZE
+      events behind; the client should then re-read and reconnect.
+    """
+    return StreamingResponse(
+        sse_events(area, status.value if status else None, owner_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/dispatches/ws")
+async def dispatch_events_socket(
+    websocket: WebSocket,
+    token: str = Query(...),
+    area: Optional[str] = Query(None),
+    status: Optional[schemas.DispatchStatus] = Query(None),
+    owner_id: Optional[int] = Query(None),
+):
+    """
+    Stream dispatch events over a WebSocket, as JSON messages.
+    - Authenticates with the JWT in the `token` query parameter, as browsers cannot
+      set headers on WebSockets; closes with code 1008 if it is invalid.
+    - Sends the same events with the same filters as `/dispatches/events`.
+    - Sends an `overflow` event and closes with code 1013 if the client falls
+      EVENT_QUEUE_SIZE events behind.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            await resolve_user(token, db)
+        except HTTPException:
+            await websocket.close(code=1008)
+            return
+    await websocket.accept()
+
+    async def wait_for_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    subscription = events.broadcaster.subscribe(area, status.value if status else None, owner_id)
+    disconnected = asyncio.create_task(wait_for_disconnect())
+    try:
+        while True:
+            next_event = asyncio.ensure_future(subscription.next())
+            await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                next_event.cancel()
+                return
+            event = next_event.result()
+            await websocket.send_json(event)
+            if event["event"] == "overflow":
+                await websocket.close(code=1013)
+                return
+    finally:
+        disconnected.cancel()
+        events.broadcaster.unsubscribe(subscription)
 
 
 @router.get("/dispatches/{dispatch_id}", response_model=schemas.DispatchBase)
 async def get_dispatch_by_id(
+    user: CurrentUser,
+    request: Request,
+    response: Response,
     dispatch_id: int = Path(..., title="The ID of the dispatch to get"),
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer()),
+    include_archived: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Retrieving a dispatch by its ID.
     - Validates the token to identify the current user.
-    - Retrieves the dispatch with the specified ID from the database.
-    - Returns the dispatch or raises a 404 error if not found.
+    - With If-None-Match, looks up only the dispatch's version and returns 304 if the
+      ETag still matches.
+    - Retrieves the dispatch with the specified ID from the database, or with
+      `include_archived=true` from the archive if it has been archived.
+    - Returns the dispatch with its ETag, or raises a 404 error if not found.
     """
-    user = crud.get_current_user(db, token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    dispatch = crud.get_dispatch_by_id(db, dispatch_id)
+    if request.headers.get("if-none-match"):
+        version = await async_crud.get_dispatch_version(db, dispatch_id)
+        if version is not None:
+            etag = dispatch_etag(dispatch_id, version)
+            if etag_matches(request, etag):
+                return Response(status_code=304, headers={"ETag": etag})
+
+    dispatch = await async_crud.get_dispatch_by_id(db, dispatch_id, include_archived)
     if not dispatch:
         raise HTTPException(status_code=404, detail="Dispatch not found")
 
+    response.headers["ETag"] = dispatch_etag(dispatch.id, dispatch.version)
     return dispatch
 
 
 @router.post("/dispatches/{dispatch_id}/accept")
 async def accept_dispatch(
+    user: CurrentUser,
     dispatch_id: int = Path(..., title="The ID of the dispatch to accept"),
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer()),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Take a dispatch at face value.
     - Verifies the token's identity to determine the current user.
     - Assigns the current user to the dispatch after accepting it with the given ID.
     - if the accepted dispatch cannot be located, throws a 404 error and returns it.
+    - if the dispatch is no longer pending (e.g. another driver accepted it first), throws a 409 error.
     """
-    print(f"Received dispatch_id: {dispatch_id}")  # Debugging line
+    logger.debug("Accepting dispatch_id=%s for user_id=%s", dispatch_id, user.id)
 
-    user = crud.get_current_user(db, token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    accepted_dispatch = crud.accept_dispatch(db, dispatch_id, user.id)
+    try:
+        accepted_dispatch = await async_crud.accept_dispatch(db, dispatch_id, user.id)
+    except crud.DispatchConflictError as e:
+        raise conflict(e)
     if not accepted_dispatch:
         raise HTTPException(status_code=404, detail="Dispatch not found")
 
@@ -186,21 +774,21 @@ async def accept_dispatch(
 
 @router.post("/dispatches/{dispatch_id}/start")
 async def start_dispatch(
+    user: CurrentUser,
     dispatch_id: int = Path(..., title="The ID of the dispatch to start"),
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer()),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
    Launch a dispatch using its ID.
     - it then confirms the current user by validating the token.
     - links the dispatch to the active user and launches it with the given ID.
     - If the dispatch is not found or permitted, returns the begun dispatch or issues a 404 error.
+    - If the dispatch is not in an accepted status, issues a 409 error.
     """
-    user = crud.get_current_user(db, token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    started_dispatch = crud.start_dispatch(db, dispatch_id, user.id)
+    try:
+        started_dispatch = await async_crud.start_dispatch(db, dispatch_id, user.id)
+    except crud.DispatchConflictError as e:
+        raise conflict(e)
     if not started_dispatch:
         raise HTTPException(
             status_code=404, detail="Dispatch not found or not authorized"
@@ -211,38 +799,40 @@ async def start_dispatch(
 
 @router.post("/dispatches/{dispatch_id}/complete")
 async def complete_dispatch(
+    user: CurrentUser,
     dispatch_id: int = Path(..., title="The ID of the dispatch to complete"),
     pod_image: Optional[str] = Query(None, alias="podImage"),
     notes: Optional[str] = Query(None),
     recipient_name: Optional[str] = Query(None, alias="recipientName"),
-    db: Session = Depends(get_db),
-    token: str = Depends(JWTBearer()),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Complete a dispatch by its ID.
     - Ensures at least one of 'podImage', 'notes', or 'recipientName' is provided.
+    - Ensures 'podImage', if given, is the key of an image uploaded to `/pods`.
     - Validates the token to identify the current user.
     - Completes the dispatch with the specified ID and updates it with provided details.
     - Returns the completed dispatch or raises a 404 error if not found or authorized.
+    - Raises a 409 error if the dispatch has not been started.
     """
     if not any([pod_image, notes, recipient_name]):    # Ensure at least one field is provided
         raise HTTPException(
             status_code=400,
             detail="At least one of 'podImage', 'notes', or 'recipientName' must be provided",
         )
-
-    user = crud.get_current_user(db, token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    completed_dispatch = crud.complete_dispatch(
-        db,
-        dispatch_id,
-        user.id,
-        pod_image if pod_image else "",
-        notes if notes else "",
-        recipient_name if recipient_name else "",
-    )
+    await check_pod_image(pod_image)
+
+    try:
+        completed_dispatch = await async_crud.complete_dispatch(
+            db,
+            dispatch_id,
+            user.id,
+            pod_image if pod_image else "",
+            notes if notes else "",
+            recipient_name if recipient_name else "",
+        )
+    except crud.DispatchConflictError as e:
+        raise conflict(e)
 
     if not completed_dispatch:
         raise HTTPException(
@@ -250,3 +840,71 @@ async def complete_dispatch(
         )
 
     return completed_dispatch
+
+
+@router.post(
+    "/pods",
+    response_model=schemas.PodUploadResult,
+    openapi_extra={"requestBody": POD_UPLOAD_BODY},
+)
+async def upload_pod(
+    user: CurrentUser,
+    request: Request,
+):
+    """
+    Upload a proof of delivery image.
+    - Validates the token to identify the current user.
+    - Accepts a multipart upload of a JPEG, PNG, GIF or WebP image of at most MAX_POD_BYTES
+      in a 'file' field.
+    - Streams the image into the content-addressed store as the body arrives, hashing it on
+      the way and enforcing the size limit; an image uploaded before is stored once.
+    - Returns the key to pass as 'podImage' when completing a dispatch.
+    """
+    return await receive_pod(request)
+
+
+@router.get("/pods/{key}", response_class=StreamingResponse)
+async def download_pod(
+    user: CurrentUser,
+    request: Request,
+    key: str = Path(..., pattern=blobstore.KEY_PATTERN.pattern),
+):
+    """
+    Download a proof of delivery image by its key.
+    - Validates the token to identify the current user.
+    - Serves single byte ranges (`Range: bytes=...`) with 206 Partial Content.
+    - Content never changes for a key, so the response is cacheable indefinitely and
+      `If-None-Match` with the key's ETag returns 304.
+    - Raises a 404 error if no image with that key is stored.
+    """
+    found = await asyncio.to_thread(blobstore.stat, key)
+    if found is None:
+        raise HTTPException(status_code=404, detail="POD image not found")
+    size, media_type = found
+
+    etag = f'"{key}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes",
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    start, end, status_code = 0, size - 1, 200
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", etag) == etag:
+        try:
+            start, end = blobstore.parse_range(range_header, size)
+        except ValueError:
+            raise HTTPException(
+                status_code=416, headers={"Content-Range": f"bytes */{size}"},
+                detail="Range not satisfiable",
+            )
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        blobstore.iter_range(key, start, end), status_code=status_code,
+        media_type=media_type, headers=headers,
+    )
@@ -0,0 +1,53 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import async_crud
+import schemas
+
+from database import get_async_db
+from routers.auth_bearer import CurrentUser
+
+router = APIRouter()
+
+
+@router.get("/users/leaderboard", response_model=List[schemas.DriverStats])
+async def driver_leaderboard(
+    user: CurrentUser,
+    order: str = Query("completed", pattern="^(completed|avg_duration)$"),
+    limit: int = Query(10, ge=1, le=100),
+    min_completed: int = Query(1, ge=1),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Rank drivers by performance.
+    - Validates the token to identify the current user.
+    - With `order=completed`, ranks drivers by the number of dispatches they completed, most first.
+    - With `order=avg_duration`, ranks them by their average time from start to completion,
+      fastest first.
+    - Leaves out drivers with fewer than 'min_completed' completed dispatches.
+    - Read from an index on the driver statistics, so the cost does not grow with the number
+      of drivers or dispatches.
+    """
+    return await async_crud.get_driver_leaderboard(db, order, limit, min_completed)
+
+
+@router.get("/users/{user_id}/stats", response_model=schemas.DriverStats)
+async def driver_stats(
+    user_id: int,
+    user: CurrentUser,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Retrieve the performance statistics of a user.
+    - Validates the token to identify the current user.
+    - Returns the number of dispatches the user accepted, started and completed, their average
+      delivery time in seconds and the time of their last transition.
+    - Read from a single row of the driver statistics, updated with every transition.
+    - Raises 404 if the user does not exist.
+    """
+    stats = await async_crud.get_driver_stats(db, user_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return stats
@@ -1,6 +1,7 @@
-from typing import List, Optional
-from pydantic import BaseModel
-from datetime import datetime
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, TypeAdapter
+from typing_extensions import TypedDict
+from datetime import date, datetime
 import enum
 
 
@@ -120,6 +121,7 @@ class DispatchBase(BaseModel):
     notes: Optional[str] = None
     recipient_name: Optional[str] = None
     created_at: datetime
+    version: int = 1
 
     class Config:
         orm_mode = True
@@ -140,17 +142,54 @@ class DispatchList(BaseModel):
     """
     Model for a list of dispatches.
 
-    This model includes a total count of dispatches and a list of DispatchBase objects
-    representing individual dispatches.
+    This model includes a total count of dispatches, a list of DispatchBase objects
+    representing individual dispatches, and the cursor of the next page if any.
     """
     total: int
     dispatches: List[DispatchBase]
+    next_cursor: Optional[str] = None
 
     class Config:
         orm_mode = True
         from_attributes = True
 
 
+class DispatchRow(TypedDict):
+    """
+    Dispatch row selected by the list fast path, with the fields of DispatchBase.
+
+    Rows are built by `crud.dispatch_rows` from trusted database values and are
+    serialized without validation. `status` holds a `DispatchStatusEnum` member,
+    which serializes as its string value.
+    """
+    id: int
+    description: str
+    date: datetime
+    area: str
+    status: str
+    start_time: Optional[datetime]
+    complete_time: Optional[datetime]
+    pod_image: Optional[str]
+    notes: Optional[str]
+    recipient_name: Optional[str]
+    created_at: datetime
+    version: int
+
+
+class DispatchRowPage(TypedDict):
+    """
+    DispatchList envelope around rows selected by the list fast path.
+    """
+    total: int
+    dispatches: List[DispatchRow]
+    next_cursor: Optional[str]
+
+
+# Serializers built once at import, used to dump list responses straight to JSON bytes
+dispatch_rows_adapter = TypeAdapter(List[DispatchRow])
+dispatch_row_page_adapter = TypeAdapter(DispatchRowPage)
+
+
 class DispatchAcceptResponse(BaseModel):
     """
     Model for the response after accepting a dispatch.
@@ -188,3 +227,130 @@ class DispatchCompleteRequest(BaseModel):
     pod_image: str
     notes: str
     recipient_name: str
+
+
+class BulkRowError(BaseModel):
+    """
+    Model for a row rejected during a bulk ingest.
+
+    This model includes the 1-based input line number and the reason it was rejected.
+    """
+    line: int
+    error: str
+
+
+class BulkIngestResult(BaseModel):
+    """
+    Model for the response after a bulk ingest.
+
+    This model includes the number of inserted and failed rows, and the errors of
+    the failed rows.
+    """
+    inserted: int
+    failed: int
+    errors: List[BulkRowError] = []
+
+
+class BulkTransitionRequest(BaseModel):
+    """
+    Model for the request body of a bulk status transition.
+
+    This model includes the IDs of the dispatches to transition.
+    """
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+
+class ClaimRequest(BaseModel):
+    """
+    Model for the request body when claiming pending dispatches.
+
+    This model includes the area to claim dispatches in and how many to claim.
+    """
+    area: str
+    count: int = Field(1, ge=1, le=100)
+
+
+class BulkCompleteRequest(BulkTransitionRequest):
+    """
+    Model for the request body when completing many dispatches.
+
+    This model extends BulkTransitionRequest with the completion details applied to
+    every dispatch. At least one of them must be provided.
+    """
+    pod_image: Optional[str] = None
+    notes: Optional[str] = None
+    recipient_name: Optional[str] = None
+
+
+class BulkTransitionOutcome(BaseModel):
+    """
+    Model for the outcome of one dispatch in a bulk status transition.
+
+    The outcome is "ok", "not_found", "not_authorized" (owned by another user)
+    or "conflict" (not in a status the transition can start from).
+    """
+    id: int
+    outcome: Literal["ok", "not_found", "not_authorized", "conflict"]
+
+
+class BulkTransitionResult(BaseModel):
+    """
+    Model for the response after a bulk status transition.
+
+    This model includes the number of updated dispatches and the outcome per ID.
+    """
+    updated: int
+    results: List[BulkTransitionOutcome]
+
+
+class PodUploadResult(BaseModel):
+    """
+    Model for the response after uploading a proof of delivery image.
+
+    This model includes the content key to pass as `podImage` when completing a
+    dispatch, and the size of the stored image in bytes.
+    """
+    key: str
+    size: int
+
+
+class AreaMatch(BaseModel):
+    """
+    Model for an area returned by the area search.
+
+    This model includes the area's ID and name, and how well the name matches the
+    query: 1 for a prefix match, else the trigram similarity.
+    """
+    id: int
+    name: str
+    score: float
+
+
+class DailyCount(BaseModel):
+    """
+    Model for one row of the dispatch analytics.
+
+    This model includes the number of dispatches dated `day` in an area that
+    are in a given status, archived dispatches counting as completed.
+    """
+    day: date
+    area: str
+    status: DispatchStatus
+    count: int
+
+
+class DriverStats(BaseModel):
+    """
+    Model for the performance statistics of a driver.
+
+    This model includes the number of dispatches the user accepted, started and
+    completed, their average delivery time from start to completion in seconds
+    (None until one is measured), and the time of their last transition.
+    """
+    user_id: int
+    username: Optional[str] = None
+    accepted_count: int
+    started_count: int
+    completed_count: int
+    avg_duration_seconds: Optional[float] = None
+    last_activity_at: Optional[datetime] = None
@@ -0,0 +1,139 @@
+"""
+Full-text search over the description, notes and recipient name of dispatches.
+
+Two backends are supported, both kept up to date by the database itself:
+
+- PostgreSQL: a stored generated `tsvector` column, `dispatches.search_vector`,
+  with a GIN index, ranked with `ts_rank`.
+- SQLite: an external-content FTS5 table, `dispatch_search`, kept in step with
+  dispatches by triggers, ranked with `bm25`.
+
+Queries are reduced to their words, which must all appear; the last word also
+matches as a prefix, so results follow what is being typed. Names are not
+stemmed (the `simple` text search configuration), so they match as written.
+
+The search objects are created with the dispatches table by `create_all`, and
+added to existing databases by migration d3f8a1c6b047 (see `install`).
+"""
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, column, event, func, literal_column, or_, select, table
+from sqlalchemy.engine import Connection
+
+import models
+
+SEARCH_CONFIG = "simple"
+SEARCH_TABLE = "dispatch_search"
+SEARCH_COLUMNS = ("description", "notes", "recipient_name")
+# Words beyond this are ignored, to bound the cost of a query
+MAX_TERMS = 8
+WORD = re.compile(r"\w+")
+
+SEARCH_VECTOR = (
+    f"to_tsvector('{SEARCH_CONFIG}', "
+    + " || ' ' || ".join(f"coalesce({name}, '')" for name in SEARCH_COLUMNS)
+    + ")"
+)
+
+dispatch_search = table(SEARCH_TABLE, column("rowid"), column(SEARCH_TABLE))
+
+
+def terms(query: str) -> List[str]:
+    """
+    Returns the words of a search query, lowercased.
+    """
+    return WORD.findall(query.lower())[:MAX_TERMS]
+
+
+def postgresql_ddl() -> List[str]:
+    return [
+        f"ALTER TABLE dispatches ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_dispatches_search_vector ON dispatches USING gin (search_vector)",
+    ]
+
+
+def sqlite_ddl() -> List[str]:
+    columns = ", ".join(SEARCH_COLUMNS)
+    new = ", ".join(f"new.{name}" for name in SEARCH_COLUMNS)
+    old = ", ".join(f"old.{name}" for name in SEARCH_COLUMNS)
+    delete_old = (
+        f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {old});"
+    )
+    insert_new = f"INSERT INTO {SEARCH_TABLE} (rowid, {columns}) VALUES (new.id, {new});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        f"{columns}, content='dispatches', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON dispatches "
+        f"BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON dispatches "
+        f"BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF {columns} ON dispatches "
+        f"BEGIN {delete_old} {insert_new} END",
+        # Indexes the rows that existed before the table was created
+        f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('rebuild')",
+    ]
+
+
+def install(conn: Connection):
+    """
+    Creates the search column or table, its index and triggers, and indexes the
+    existing dispatches. Does nothing on other backends.
+    """
+    if conn.dialect.name == "postgresql":
+        statements = postgresql_ddl()
+    elif conn.dialect.name == "sqlite":
+        statements = sqlite_ddl()
+    else:
+        return
+    for statement in statements:
+        conn.exec_driver_sql(statement)
+
+
+@event.listens_for(models.Dispatch.__table__, "after_create")
+def _install_on_create(target, connection, **kw):
+    install(connection)
+
+
+def ranked_matches(dialect_name: str, query: str, columns: list, filters: list):
+    """
+    Builds a SELECT of `columns` plus a `score` column for the dispatches
+    matching `query` and `filters`. A higher score is a better match.
+
+    Returns None if the query has no words.
+    """
+    words = terms(query)
+    if not words:
+        return None
+    if dialect_name == "postgresql":
+        tsquery = func.to_tsquery(SEARCH_CONFIG, " & ".join(words[:-1] + [words[-1] + ":*"]))
+        vector = literal_column("dispatches.search_vector")
+        return (
+            select(*columns, func.ts_rank(vector, tsquery).label("score"))
+            .where(vector.op("@@")(tsquery), *filters)
+        )
+    match = " ".join([f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*'])
+    return (
+        select(*columns, (-func.bm25(literal_column(SEARCH_TABLE))).label("score"))
+        .select_from(models.Dispatch.__table__.join(
+            dispatch_search, dispatch_search.c.rowid == models.Dispatch.id
+        ))
+        .where(literal_column(SEARCH_TABLE).op("MATCH")(match), *filters)
+    )
+
+
+def ranked_page(matches, skip: int, limit: int, after: Optional[Tuple[float, int]] = None):
+    """
+    Orders `ranked_matches` by score, then id, and selects one page, either by
+    offset or after the (score, id) position of the previous page's last row.
+    """
+    ranked = matches.subquery("ranked")
+    stmt = select(ranked).order_by(ranked.c.score.desc(), ranked.c.id)
+    if after is not None:
+        score, last_id = after
+        return stmt.where(or_(
+            ranked.c.score < score, and_(ranked.c.score == score, ranked.c.id > last_id)
+        )).limit(limit)
+    return stmt.offset(skip).limit(limit)
@@ -0,0 +1,93 @@
+"""
+Shared fixtures: the application on a scratch SQLite database, and helpers to
+sign users up and create dispatches through the API.
+
+The environment is set before the application is imported, so `database.py`
+never connects to the database configured in `.env`.
+"""
+import itertools
+import os
+import tempfile
+
+os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ.pop("ASYNC_SQLALCHEMY_DATABASE_URL", None)
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("BLOB_DIR", tempfile.mkdtemp())
+os.environ.setdefault("ARCHIVE_DIR", tempfile.mkdtemp())
+
+import pytest
+from fastapi.testclient import TestClient
+
+import crud
+from database import SessionLocal
+from main import app
+
+_names = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(client):
+    """
+    Signs up a new user and returns their (headers, user_id).
+    """
+    def make():
+        name = f"user{next(_names)}"
+        email = f"{name}@example.com"
+        client.post("/api/auth/api/auth/signup",
+                    json={"username": name, "email": email, "password": "pw"})
+        token = client.post("/api/auth/api/auth/login",
+                            json={"email": email, "password": "pw"}).json()["jwt_token"]
+        with SessionLocal() as session:
+            user_id = crud.get_user_by_email(session, email).id
+        return {"Authorization": f"Bearer {token}"}, user_id
+    return make
+
+
+@pytest.fixture
+def area():
+    """
+    An area name no other test uses, so counts can be checked exactly.
+    """
+    return f"area-{next(_names)}"
+
+
+@pytest.fixture
+def create_dispatches(client):
+    """
+    Creates dispatches in an area and returns their IDs.
+    """
+    def create(headers, area, count=1):
+        return [
+            client.post("/create", json={"area": area}, headers=headers).json()["id"]
+            for _ in range(count)
+        ]
+    return create
+
+
+@pytest.fixture
+def drive(client):
+    """
+    Accepts, starts and, unless `complete=False`, completes dispatches as a driver.
+    """
+    def run(headers, ids, complete=True):
+        client.post("/dispatches/bulk/accept", json={"ids": ids}, headers=headers)
+        client.post("/dispatches/bulk/start", json={"ids": ids}, headers=headers)
+        if complete:
+            client.post("/dispatches/bulk/complete", json={"ids": ids, "notes": "x"}, headers=headers)
+    return run
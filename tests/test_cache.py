@@ -0,0 +1,35 @@
+"""
+Dispatch cache backends: an older version never replaces a newer one.
+"""
+from datetime import datetime
+
+import pytest
+
+import cache
+import models
+import schemas
+
+
+def dispatch(version):
+    return schemas.DispatchBase(
+        id=1, description="Parcel", date=datetime(2026, 1, 1), area="north",
+        status=models.DispatchStatusEnum.IN_PROGRESS, created_at=datetime(2026, 1, 1), version=version,
+    )
+
+
+@pytest.mark.parametrize("backend", [
+    lambda: cache.LocalBackend(10, 30),
+    lambda: cache.SharedBackend(cache.InMemoryClient(), 30),
+], ids=["local", "shared"])
+def test_older_version_is_not_stored(backend):
+    store = backend()
+    store.set(1, dispatch(3))
+    store.set(1, dispatch(2))
+    assert store.get(1).version == 3
+    store.set(1, dispatch(4))
+    assert store.get(1).version == 4
+
+
+def test_in_memory_client_only_runs_set_if_newer():
+    with pytest.raises(NotImplementedError):
+        cache.InMemoryClient().register_script("return 1")
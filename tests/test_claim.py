@@ -0,0 +1,70 @@
+"""
+Claiming the oldest pending dispatches of an area.
+
+On PostgreSQL, set TEST_POSTGRESQL_URL to a scratch database to also check
+that a claim skips rows locked by another transaction instead of waiting.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+import crud
+import models
+
+
+def claim(client, headers, area, count):
+    response = client.post("/dispatches/claim", json={"area": area, "count": count}, headers=headers)
+    assert response.status_code == 200
+    return [dispatch["id"] for dispatch in response.json()]
+
+
+def test_claim_oldest(client, make_user, create_dispatches, area):
+    creator, _ = make_user()
+    driver, _ = make_user()
+    ids = create_dispatches(creator, area, 5)
+
+    assert claim(client, driver, area, 3) == ids[:3]
+    assert claim(client, driver, area, 3) == ids[3:]
+    assert claim(client, driver, area, 3) == []
+    assert claim(client, driver, "no such area", 3) == []
+
+    assert client.get(f"/dispatches/{ids[0]}", headers=driver).json()["status"] == "in_progress"
+
+
+def test_concurrent_claims_are_disjoint(client, make_user, create_dispatches, area):
+    creator, _ = make_user()
+    ids = create_dispatches(creator, area, 20)
+    drivers = [make_user()[0] for _ in range(8)]
+
+    with ThreadPoolExecutor(len(drivers)) as pool:
+        claims = list(pool.map(lambda headers: claim(client, headers, area, 3), drivers))
+
+    claimed = [dispatch_id for ids_claimed in claims for dispatch_id in ids_claimed]
+    assert len(claimed) == len(set(claimed)) == 20
+    assert sorted(claimed) == ids
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRESQL_URL"), reason="TEST_POSTGRESQL_URL is not set")
+def test_claim_skips_locked_rows():
+    engine = create_engine(os.environ["TEST_POSTGRESQL_URL"])
+    models.Base.metadata.create_all(bind=engine)
+    area = f"claim-{datetime.utcnow().timestamp()}"
+    with Session(engine) as db:
+        user = models.User(username=area, email=f"{area}@example.com", hashed_password="-")
+        db.add(user)
+        db.commit()
+        ids = [crud.create_dispatch(db, area, datetime.utcnow(), user.id).id for _ in range(4)]
+
+    with Session(engine) as holder, Session(engine) as claimer:
+        locked = holder.execute(
+            select(models.Dispatch.id).where(models.Dispatch.id.in_(ids[:2])).with_for_update()
+        ).scalars().all()
+        assert locked == ids[:2]
+        claimed = crud.claim_dispatches(claimer, area, 2, user.id)
+        assert [dispatch.id for dispatch in claimed] == ids[2:]
+        holder.rollback()
+    engine.dispose()
@@ -0,0 +1,34 @@
+"""
+The per-(status, area) dispatch counters behind the list totals.
+"""
+from sqlalchemy import func, select
+
+import models
+
+
+def test_counters_match_table(client, db, make_user, create_dispatches, drive, area):
+    creator, _ = make_user()
+    driver, _ = make_user()
+    ids = create_dispatches(creator, area, 6)
+    drive(driver, ids[:2])
+    drive(driver, ids[2:3], complete=False)
+    client.post(f"/dispatches/{ids[3]}/accept", headers=driver)
+
+    counted = dict(db.execute(
+        select(models.Dispatch.status, func.count())
+        .where(models.Dispatch.area == area).group_by(models.Dispatch.status)
+    ).all())
+    counters = dict(db.execute(
+        select(models.DispatchCount.status, models.DispatchCount.count)
+        .where(models.DispatchCount.area == area, models.DispatchCount.count != 0)
+    ).all())
+    assert counters == counted == {
+        models.DispatchStatusEnum.PENDING: 2,
+        models.DispatchStatusEnum.IN_PROGRESS: 1,
+        models.DispatchStatusEnum.STARTED: 1,
+        models.DispatchStatusEnum.COMPLETED: 2,
+    }
+
+    body = client.get("/dispatches/filter", params={"area": area, "status": "pending", "envelope": True},
+                      headers=creator).json()
+    assert body["total"] == 2
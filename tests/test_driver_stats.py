@@ -0,0 +1,51 @@
+"""
+The driver statistics, kept up to date with every transition, and the
+endpoints they serve.
+"""
+from sqlalchemy import select
+
+import models
+import rollups
+from database import engine
+
+
+def test_driver_stats_match_rebuild(client, db, make_user, create_dispatches, drive, area):
+    creator, _ = make_user()
+    fast, fast_id = make_user()
+    slow, slow_id = make_user()
+    ids = create_dispatches(creator, area, 5)
+    drive(fast, ids[:3])
+    drive(slow, ids[3:4])
+    drive(slow, ids[4:5], complete=False)
+
+    stats = client.get(f"/users/{fast_id}/stats", headers=creator).json()
+    assert (stats["accepted_count"], stats["started_count"], stats["completed_count"]) == (3, 3, 3)
+    stats = client.get(f"/users/{slow_id}/stats", headers=creator).json()
+    assert (stats["accepted_count"], stats["started_count"], stats["completed_count"]) == (2, 2, 1)
+    assert client.get("/users/999999/stats", headers=creator).status_code == 404
+
+    stats = models.DriverStats
+    stored = {
+        row.user_id: row
+        for row in db.execute(select(
+            stats.user_id, stats.accepted_count, stats.started_count, stats.completed_count,
+            stats.duration_count, stats.duration_total,
+        ).where(stats.user_id.in_([fast_id, slow_id])))
+    }
+    with engine.connect() as conn:
+        computed = {
+            row[0]: row
+            for row in conn.execute(rollups.driver_stats_query(conn))
+            if row[0] in (fast_id, slow_id)
+        }
+    assert stored.keys() == computed.keys() == {fast_id, slow_id}
+    for user_id, row in stored.items():
+        user_id, accepted, started, completed, duration_total, duration_count, _, _ = computed[user_id]
+        assert tuple(row[:5]) == (user_id, accepted, started, completed, duration_count)
+        # SQLite computes the rebuilt durations from julianday(), to about a millisecond
+        assert abs(row.duration_total - duration_total) < 0.01
+
+    leaders = client.get("/users/leaderboard", params={"limit": 100}, headers=creator).json()
+    ranked = [row["user_id"] for row in leaders]
+    assert ranked.index(fast_id) < ranked.index(slow_id)
+    assert client.get("/users/leaderboard", params={"order": "fastest"}, headers=creator).status_code == 422
@@ -0,0 +1,37 @@
+"""
+Conditional requests with ETag / If-None-Match.
+"""
+
+
+def test_page_etag(client, make_user, create_dispatches, area):
+    headers, _ = make_user()
+    ids = create_dispatches(headers, area, 2)
+    params = {"area": area}
+
+    response = client.get("/dispatches/filter", params=params, headers=headers)
+    etag = response.headers["ETag"]
+    response = client.get("/dispatches/filter", params=params, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    client.post(f"/dispatches/{ids[0]}/accept", headers=headers)
+    response = client.get("/dispatches/filter", params=params, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_dispatch_etag(client, make_user, create_dispatches, area):
+    headers, _ = make_user()
+    dispatch_id, = create_dispatches(headers, area)
+
+    response = client.get(f"/dispatches/{dispatch_id}", headers=headers)
+    etag = response.headers["ETag"]
+    response = client.get(f"/dispatches/{dispatch_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    client.post(f"/dispatches/{dispatch_id}/accept", headers=headers)
+    response = client.get(f"/dispatches/{dispatch_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert client.get("/dispatches/999999", headers=headers).status_code == 404
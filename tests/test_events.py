@@ -0,0 +1,87 @@
+"""
+Dispatch events: NOTIFY payload sizing and the events of bulk-inserted dispatches.
+"""
+import json
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+import crud
+import events
+import models
+
+
+def event(dispatch_id, area):
+    return events.dispatch_event("created", {
+        "id": dispatch_id, "area": area, "status": models.DispatchStatusEnum.PENDING, "owner_id": 1,
+    })
+
+
+def test_payloads_split_by_size():
+    sent = [event(i, f"{i}-" + "x" * 3000) for i in range(10)]
+    payloads = events.notify_payloads(sent)
+    assert all(len(payload.encode()) <= events.NOTIFY_MAX_BYTES for payload in payloads)
+    assert [item for payload in payloads for item in json.loads(payload)] == sent
+
+
+def test_small_events_share_a_payload():
+    sent = [event(i, "north") for i in range(20)]
+    assert [json.loads(payload) for payload in events.notify_payloads(sent)] == [sent]
+
+
+def test_oversized_event_drops_area():
+    sent = [event(1, "north"), event(2, "é" * 5000), event(3, "south")]
+    received = [item for payload in events.notify_payloads(sent) for item in json.loads(payload)]
+    assert [item["id"] for item in received] == [1, 2, 3]
+    assert [item["area"] for item in received] == ["north", None, "south"]
+
+
+def test_bulk_insert_events_carry_ids(db, make_user, area, monkeypatch):
+    _, user_id = make_user()
+    published = []
+    monkeypatch.setattr(events.broadcaster, "publish", published.extend)
+
+    rows = [crud.new_dispatch_values(area, datetime.utcnow(), user_id) for _ in range(3)]
+    assert crud.bulk_create_dispatches(db, rows) == 3
+
+    ids = db.execute(select(models.Dispatch.id).where(models.Dispatch.area == area)
+                     .order_by(models.Dispatch.id)).scalars().all()
+    assert [event["id"] for event in published] == ids
+
+
+def test_events_without_id_are_dropped(db, monkeypatch):
+    published = []
+    monkeypatch.setattr(events.broadcaster, "publish", published.extend)
+    events.record(db, [event(None, "north"), event(7, "north")])
+    db.commit()
+    assert [event["id"] for event in published] == [7]
+
+
+def test_rolled_back_events_are_discarded(db, monkeypatch):
+    published = []
+    monkeypatch.setattr(events.broadcaster, "publish", published.extend)
+    db.execute(select(func.count(models.Dispatch.id)))
+    events.record(db, [event(8, "north")])
+    db.rollback()
+    db.commit()
+    assert published == []
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRESQL_URL"), reason="TEST_POSTGRESQL_URL is not set")
+def test_long_areas_commit_on_postgresql():
+    engine = create_engine(os.environ["TEST_POSTGRESQL_URL"])
+    models.Base.metadata.create_all(bind=engine)
+    area = f"long-{datetime.utcnow().timestamp()}-" + "x" * 9000
+    with Session(engine) as db:
+        user = models.User(username=area[:40], email=f"{area[:40]}@example.com", hashed_password="-")
+        db.add(user)
+        db.commit()
+        rows = [crud.new_dispatch_values(area, datetime.utcnow(), user.id) for _ in range(50)]
+        assert crud.bulk_create_dispatches(db, rows) == 50
+        assert all(row["id"] is not None for row in rows)
+        stored = db.execute(select(func.count()).where(models.Dispatch.area == area)).scalar()
+        assert stored == 50
+    engine.dispose()
@@ -0,0 +1,38 @@
+"""
+The streaming export and its filters.
+"""
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+import models
+
+
+def export_ids(client, headers, **params):
+    response = client.get("/dispatches/export", params=params, headers=headers)
+    assert response.status_code == 200
+    return [json.loads(line)["id"] for line in response.text.splitlines()]
+
+
+def test_export_date_ranges(client, db, make_user, create_dispatches, area):
+    headers, _ = make_user()
+    ids = create_dispatches(headers, area, 3)
+    start = datetime(2025, 3, 1)
+    for offset, dispatch_id in enumerate(ids):
+        db.execute(update(models.Dispatch).where(models.Dispatch.id == dispatch_id).values(
+            date=start + timedelta(days=offset), created_at=start + timedelta(days=offset, hours=12),
+        ))
+    db.commit()
+
+    assert export_ids(client, headers, area=area) == ids
+    assert export_ids(client, headers, area=area, date_from="2025-03-02T00:00:00") == ids[1:]
+    assert export_ids(client, headers, area=area, date_to="2025-03-02T00:00:00") == ids[:1]
+    assert export_ids(client, headers, area=area, created_from="2025-03-01T13:00:00",
+                      created_to="2025-03-03T00:00:00") == ids[1:2]
+
+    response = client.get("/dispatches/export", params={"area": area, "format": "csv",
+                                                         "date_from": "2025-03-03T00:00:00"}, headers=headers)
+    lines = response.text.splitlines()
+    assert lines[0].startswith("id,")
+    assert [int(line.split(",")[0]) for line in lines[1:]] == ids[2:]
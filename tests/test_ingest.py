@@ -0,0 +1,102 @@
+"""
+Bulk creation of dispatches from NDJSON and CSV bodies, with per-row errors.
+"""
+import asyncio
+import io
+
+import ingest
+
+
+def post_bulk(client, headers, body, **params):
+    response = client.post("/dispatches/bulk", params=params, content=body, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_ndjson_rows(client, make_user, area):
+    headers, _ = make_user()
+    body = "\n".join([
+        f'{{"area": "{area}"}}',
+        "{not json",
+        f'{{"area": "{area}", "ignored": true}}',
+        '{"area": 5}',
+        "",
+        "[]",
+    ])
+    result = post_bulk(client, headers, body, format="ndjson")
+    assert result["inserted"] == 2
+    assert result["failed"] == 3
+    assert [error["line"] for error in result["errors"]] == [2, 4, 6]
+
+    total = client.get("/dispatches/filter", params={"area": area, "envelope": True},
+                       headers=headers).json()["total"]
+    assert total == 2
+
+
+def test_csv_rows(client, make_user, area):
+    headers, _ = make_user()
+    body = f'id,area\n1,{area}\n2,"{area}, north"\n3\n'
+    result = post_bulk(client, {**headers, "Content-Type": "text/csv"}, body)
+    assert result["inserted"] == 2
+    assert result["failed"] == 1
+    assert result["errors"][0]["line"] == 4
+
+    areas = [dispatch["area"] for dispatch in client.get(
+        "/dispatches/filter", params={"area": f"{area}, north"}, headers=headers).json()]
+    assert areas == [f"{area}, north"]
+
+
+def test_csv_without_area_column(client, make_user):
+    headers, _ = make_user()
+    result = post_bulk(client, headers, "name\nx\n", format="csv")
+    assert result["inserted"] == 0
+    assert result["failed"] == 1
+    assert result["errors"][0]["line"] == 2
+
+
+def test_small_batches(client, make_user, area):
+    headers, _ = make_user()
+    body = "\n".join(f'{{"area": "{area}"}}' for _ in range(7))
+    result = post_bulk(client, headers, body, format="ndjson", batch_size=3)
+    assert result == {"inserted": 7, "failed": 0, "errors": []}
+
+
+def test_csv_multiline_fields(client, make_user, area):
+    headers, _ = make_user()
+    body = f'area,notes\n"{area}","first\nsecond ""quoted""\nthird"\n{area},x\n"{area}\n'
+    result = post_bulk(client, headers, body, format="csv")
+    assert result["inserted"] == 2
+    assert result["errors"] == [{"line": 6, "error": "unterminated quoted field"}]
+
+
+def test_overlong_line(client, make_user, area):
+    headers, _ = make_user()
+    body = "\n".join([
+        f'{{"area": "{area}"}}',
+        '{"area": "' + "x" * (ingest.MAX_LINE_BYTES + 10) + '"}',
+        f'{{"area": "{area}"}}',
+    ])
+    result = post_bulk(client, headers, body, format="ndjson")
+    assert result["inserted"] == 2
+    assert [error["line"] for error in result["errors"]] == [2]
+
+
+def test_aiter_lines_caps_buffer():
+    async def chunks():
+        yield b"a\nb"
+        for _ in range(3):
+            yield b"x" * (ingest.MAX_LINE_BYTES // 2)
+        yield b"y\nc\r\n"
+        yield b"d"
+
+    async def collect():
+        return [line async for line in ingest.aiter_lines(chunks())]
+
+    assert asyncio.run(collect()) == ["a", None, "c", "d"]
+
+
+def test_ingest_lines_multiline_csv(db, make_user, area):
+    _, user_id = make_user()
+    source = io.StringIO(f'area\n"{area}"\n"{area}\nnorth"\n', newline="")
+    result = ingest.ingest_lines(db, source, "csv", user_id)
+    assert (result.inserted, result.failed) == (2, 0)
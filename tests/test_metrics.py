@@ -0,0 +1,32 @@
+"""
+The Prometheus metrics endpoint and the pool checkout timing.
+"""
+from sqlalchemy import text
+
+import metrics
+from database import engine
+
+
+def checkouts(name):
+    return next(
+        sample.value
+        for sample in metrics.POOL_CHECKOUT_WAIT.collect()[0].samples
+        if sample.name.endswith("_count") and sample.labels["engine"] == name
+    )
+
+
+def test_checkouts_timed_across_dispose(client):
+    before = checkouts("sync")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    engine.dispose()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert checkouts("sync") == before + 2
+
+
+def test_metrics_endpoint(client):
+    client.get("/")
+    body = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/",status="200"}' in body
+    assert "db_pool_checkout_wait_seconds_count" in body
@@ -0,0 +1,40 @@
+"""
+Keyset pagination with the X-Next-Cursor header.
+"""
+
+
+def test_cursor_pages(client, make_user, create_dispatches, area):
+    headers, _ = make_user()
+    ids = create_dispatches(headers, area, 5)
+
+    pages, cursor = [], None
+    while True:
+        params = {"area": area, "limit": 2}
+        if cursor:
+            params["after"] = cursor
+        response = client.get("/dispatches/filter", params=params, headers=headers)
+        assert response.status_code == 200
+        pages.append([dispatch["id"] for dispatch in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert pages == [ids[0:2], ids[2:4], ids[4:5]]
+
+
+def test_envelope_cursor(client, make_user, create_dispatches, area):
+    headers, _ = make_user()
+    ids = create_dispatches(headers, area, 3)
+    body = client.get("/dispatches/filter", params={"area": area, "limit": 2, "envelope": True},
+                      headers=headers).json()
+    assert body["total"] == 3
+    assert [dispatch["id"] for dispatch in body["dispatches"]] == ids[:2]
+    body = client.get("/dispatches/filter", params={"area": area, "after": body["next_cursor"],
+                                                    "envelope": True}, headers=headers).json()
+    assert [dispatch["id"] for dispatch in body["dispatches"]] == ids[2:]
+    assert body["next_cursor"] is None
+
+
+def test_invalid_cursor(client, make_user):
+    headers, _ = make_user()
+    response = client.get("/dispatches", params={"after": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
@@ -0,0 +1,60 @@
+"""
+Creation of the monthly dispatches partitions (PostgreSQL).
+
+Set TEST_POSTGRESQL_URL to a scratch database to run these tests. They work in
+a schema of their own and roll everything back.
+"""
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import partitions
+import search
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("TEST_POSTGRESQL_URL"), reason="TEST_POSTGRESQL_URL is not set"
+)
+
+
+@pytest.fixture
+def conn():
+    engine = create_engine(os.environ["TEST_POSTGRESQL_URL"])
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        connection.execute(text("CREATE SCHEMA test_partitions"))
+        connection.execute(text("SET LOCAL search_path TO test_partitions"))
+        connection.execute(text(
+            "CREATE TABLE dispatches (id serial, description varchar, notes varchar, "
+            "recipient_name varchar, created_at timestamp NOT NULL, PRIMARY KEY (id, created_at)) "
+            "PARTITION BY RANGE (created_at)"
+        ))
+        partitions.create_default_partition(connection)
+        yield connection
+        transaction.rollback()
+    engine.dispose()
+
+
+def test_ensure_after_search_install(conn):
+    this_month = partitions.month_start(datetime.utcnow())
+    next_month = partitions.add_months(this_month, 1)
+    conn.execute(text(
+        "INSERT INTO dispatches (description, notes, created_at) "
+        "VALUES ('fragile parcel', 'back door', :created_at)"
+    ), {"created_at": datetime.combine(next_month, datetime.min.time())})
+    search.install(conn)
+
+    created = partitions.ensure_partitions(conn, this_month, months_ahead=2)
+    assert created == [partitions.partition_name(partitions.add_months(this_month, offset))
+                       for offset in range(3)]
+
+    moved = conn.execute(text(
+        f"SELECT description, search_vector IS NOT NULL "
+        f"FROM {partitions.partition_name(next_month)}"
+    )).all()
+    assert moved == [("fragile parcel", True)]
+    assert conn.execute(text(f"SELECT count(*) FROM {partitions.DEFAULT_PARTITION}")).scalar() == 0
+    assert conn.execute(text(
+        "SELECT count(*) FROM dispatches WHERE search_vector @@ to_tsquery('simple', 'door')"
+    )).scalar() == 1
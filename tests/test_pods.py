@@ -0,0 +1,78 @@
+"""
+Proof of delivery uploads: streamed into the blob store with size and format limits.
+"""
+import os
+
+import blobstore
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"0" * 100
+
+
+def multipart_body(data: bytes, boundary: str = "pod-boundary") -> bytes:
+    return (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nhello\r\n"
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.png\"\r\n"
+        f"Content-Type: image/png\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+
+
+def leftover_uploads():
+    return [name for name in os.listdir(blobstore.BLOB_DIR) if name.startswith(".upload-")]
+
+
+def test_upload_and_download(client, make_user):
+    headers, _ = make_user()
+    response = client.post("/pods", files={"file": ("a.png", PNG, "image/png")}, headers=headers)
+    assert response.status_code == 200
+    key = response.json()["key"]
+    assert response.json()["size"] == len(PNG)
+    again = client.post("/pods", files={"file": ("b.png", PNG, "image/png")}, headers=headers)
+    assert again.json()["key"] == key
+
+    response = client.get(f"/pods/{key}", headers={**headers, "Range": "bytes=0-7"})
+    assert response.status_code == 206
+    assert response.content == PNG[:8]
+
+
+def test_rejected_uploads(client, make_user):
+    headers, _ = make_user()
+    response = client.post("/pods", files={"file": ("a.txt", b"plain text", "text/plain")}, headers=headers)
+    assert response.status_code == 415
+    response = client.post("/pods", files={"other": ("a.png", PNG, "image/png")}, headers=headers)
+    assert response.status_code == 422
+    response = client.post("/pods", content=PNG, headers={**headers, "Content-Type": "image/png"})
+    assert response.status_code == 422
+    assert leftover_uploads() == []
+
+
+def test_content_length_over_limit(client, make_user, monkeypatch):
+    headers, _ = make_user()
+    monkeypatch.setattr(blobstore, "MAX_POD_BYTES", 1024)
+    body = multipart_body(PNG + b"0" * 64 * 1024)
+    response = client.post("/pods", content=body, headers={
+        **headers, "Content-Type": "multipart/form-data; boundary=pod-boundary",
+    })
+    assert response.status_code == 413
+
+
+def test_streamed_body_over_limit(client, make_user, monkeypatch):
+    headers, _ = make_user()
+    monkeypatch.setattr(blobstore, "MAX_POD_BYTES", 1024)
+    body = multipart_body(PNG + b"0" * 4096)
+
+    def chunks():
+        for start in range(0, len(body), 256):
+            yield body[start:start + 256]
+
+    response = client.post("/pods", content=chunks(), headers={
+        **headers, "Content-Type": "multipart/form-data; boundary=pod-boundary",
+    })
+    assert response.status_code == 413
+    assert leftover_uploads() == []
+
+    small = multipart_body(PNG)
+    response = client.post("/pods", content=iter([small[:50], small[50:]]), headers={
+        **headers, "Content-Type": "multipart/form-data; boundary=pod-boundary",
+    })
+    assert response.status_code == 200
+    assert response.json()["size"] == len(PNG)
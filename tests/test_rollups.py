@@ -0,0 +1,20 @@
+"""
+The daily dispatch rollups and the analytics endpoint they serve.
+"""
+import rollups
+from database import engine
+
+
+def test_rollups_match_table(client, make_user, create_dispatches, drive, area):
+    creator, _ = make_user()
+    driver, _ = make_user()
+    ids = create_dispatches(creator, area, 4)
+    drive(driver, ids[:3])
+
+    with engine.connect() as conn:
+        assert {key: counts for key, counts in rollups.drift(conn).items() if key[1] == area} == {}
+
+    rows = client.get("/analytics/dispatches", params={"area": area}, headers=creator).json()
+    assert {row["status"]: row["count"] for row in rows} == {"pending": 1, "completed": 3}
+    assert client.get("/analytics/dispatches", params={"date_from": "2024-02-01", "date_to": "2024-01-01"},
+                      headers=creator).status_code == 400
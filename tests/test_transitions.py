@@ -0,0 +1,105 @@
+"""
+The dispatch status transitions: pending -> in progress (accept) -> started ->
+completed, with 404 for missing or foreign dispatches and 409 for a dispatch
+in the wrong status.
+"""
+from collections import Counter
+
+from sqlalchemy import select
+
+import crud
+import models
+
+
+def status_count(db, area, status):
+    counter = db.get(models.DispatchCount, (status, area))
+    return counter.count if counter else 0
+
+
+def test_single_transitions(client, make_user, create_dispatches, area):
+    owner, _ = make_user()
+    other, _ = make_user()
+    dispatch_id, = create_dispatches(owner, area)
+
+    response = client.post(f"/dispatches/{dispatch_id}/accept", headers=owner)
+    assert response.status_code == 200
+    assert response.json()["status"] == "in_progress"
+    assert client.post(f"/dispatches/{dispatch_id}/accept", headers=other).status_code == 409
+
+    assert client.post(f"/dispatches/{dispatch_id}/start", headers=other).status_code == 404
+    assert client.post(f"/dispatches/{dispatch_id}/complete", params={"notes": "x"},
+                       headers=owner).status_code == 409
+    response = client.post(f"/dispatches/{dispatch_id}/start", headers=owner)
+    assert response.status_code == 200
+    assert response.json()["status"] == "started"
+    assert client.post(f"/dispatches/{dispatch_id}/start", headers=owner).status_code == 409
+
+    assert client.post(f"/dispatches/{dispatch_id}/complete", headers=owner).status_code == 400
+    response = client.post(f"/dispatches/{dispatch_id}/complete",
+                           params={"notes": "left at door", "recipientName": "Ann"}, headers=owner)
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert response.json()["recipient_name"] == "Ann"
+    assert client.post(f"/dispatches/{dispatch_id}/complete", params={"notes": "x"},
+                       headers=owner).status_code == 409
+
+
+def test_missing_dispatch(client, make_user):
+    headers, _ = make_user()
+    assert client.post("/dispatches/999999/accept", headers=headers).status_code == 404
+    assert client.post("/dispatches/999999/start", headers=headers).status_code == 404
+    assert client.post("/dispatches/999999/complete", params={"notes": "x"},
+                       headers=headers).status_code == 404
+
+
+def test_bulk_outcomes(client, make_user, create_dispatches, area):
+    owner, _ = make_user()
+    other, _ = make_user()
+    ids = create_dispatches(owner, area, 3)
+    client.post(f"/dispatches/{ids[2]}/accept", headers=other)
+
+    response = client.post("/dispatches/bulk/accept", json={"ids": ids + [999999]}, headers=owner)
+    assert response.status_code == 200
+    assert response.json()["updated"] == 2
+    assert [result["outcome"] for result in response.json()["results"]] == [
+        "ok", "ok", "conflict", "not_found"
+    ]
+
+    response = client.post("/dispatches/bulk/start", json={"ids": ids}, headers=owner)
+    assert [result["outcome"] for result in response.json()["results"]] == [
+        "ok", "ok", "not_authorized"
+    ]
+
+    response = client.post("/dispatches/bulk/complete", json={"ids": ids[:2]}, headers=owner)
+    assert response.status_code == 400
+    response = client.post("/dispatches/bulk/complete", json={"ids": ids, "notes": "x"}, headers=owner)
+    assert response.json()["updated"] == 2
+    assert [result["outcome"] for result in response.json()["results"]] == [
+        "ok", "ok", "not_authorized"
+    ]
+    response = client.post("/dispatches/bulk/complete", json={"ids": ids[:1], "notes": "x"}, headers=owner)
+    assert [result["outcome"] for result in response.json()["results"]] == ["conflict"]
+
+
+def test_start_from_either_status_updates_counters(client, db, make_user, create_dispatches, area):
+    headers, _ = make_user()
+    ids = create_dispatches(headers, area, 2)
+    client.post("/dispatches/bulk/accept", json={"ids": ids}, headers=headers)
+    # A dispatch accepted before the in_progress status was introduced
+    legacy = db.get(models.Dispatch, ids[0])
+    legacy.status = models.DispatchStatusEnum.ACCEPTED
+    status = models.DispatchStatusEnum
+    crud.bump_dispatch_counts(db, Counter({(status.IN_PROGRESS, area): -1, (status.ACCEPTED, area): 1}))
+    day = crud.day_of(legacy.date)
+    crud.bump_daily_counts(db, Counter({(day, area, status.IN_PROGRESS): -1, (day, area, status.ACCEPTED): 1}))
+    db.commit()
+
+    response = client.post("/dispatches/bulk/start", json={"ids": ids}, headers=headers)
+    assert response.json()["updated"] == 2
+
+    db.expire_all()
+    statuses = db.execute(select(models.Dispatch.status).where(models.Dispatch.id.in_(ids))).scalars()
+    assert set(statuses) == {models.DispatchStatusEnum.STARTED}
+    assert status_count(db, area, models.DispatchStatusEnum.ACCEPTED) == 0
+    assert status_count(db, area, models.DispatchStatusEnum.IN_PROGRESS) == 0
+    assert status_count(db, area, models.DispatchStatusEnum.STARTED) == 2